@@ -1,28 +1,31 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
-from database import init_db, DatabaseManager, get_engine, db_manager
-from scraper import Scraper
-from utils import format_caratula, generate_report, load_juzgados_data
+from database import connection_type, get_db_manager
+from utils import format_caratula, load_juzgados_data
 import time
 
 st.set_page_config(page_title="Panel CAYT", layout="wide")
 
 st.title("⚖️ Panel de Gestión - Fuero CAYT")
 
-# Inicializar DB (ya está hecho en database.py, pero aseguramos)
-_engine = get_engine()
-init_db(_engine)
+# Motor y esquema: una sola vez por proceso (compartido con app2.py)
+db_manager = get_db_manager()
+st.session_state['db_connection_type'] = connection_type(db_manager.engine)
 
-# Instanciar scraper
-scraper = Scraper()
+def get_scraper():
+    """Scraper de la sesión; Selenium se importa recién al usarlo."""
+    if 'scraper' not in st.session_state:
+        from scraper import Scraper
+        st.session_state.scraper = Scraper()
+    return st.session_state.scraper
 
 menu = st.sidebar.radio("Menú", ["Inicio", "Expedientes", "Jurisprudencia", "Tareas", "Notas"])
 
 if menu == "Inicio":
     st.subheader("Bienvenido al Panel de Gestión de Juicios CAYT")
     if st.button("🔄 Sincronizar expedientes"):
-        scraper.login_and_sync()
+        get_scraper().login_and_sync()
     if 'last_sync' in st.session_state:
         st.info(f"Última sincronización: {st.session_state['last_sync']}")
 
@@ -35,7 +38,7 @@ elif menu == "Jurisprudencia":
     st.subheader("📚 Búsqueda de Jurisprudencia")
     query = st.text_input("Buscar por palabra clave:")
     if st.button("Buscar") and query:
-        results = scraper.search_on_portal(query)
+        results = get_scraper().search_on_portal(query)
         st.dataframe(results)
 
 elif menu == "Tareas":
@@ -1,46 +1,86 @@
+import time
+_inicio_imports = time.perf_counter()
+
 import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
-from database import init_db, db_manager
-from scraper import Scraper
-from utils import format_caratula, create_expediente_link, generate_report
-import time
+# El scraper (Selenium) se importa recién cuando se usa: ver las búsquedas y jobs.py
+from database import connection_type, get_db_manager
+from browser_pool import get_driver_pool
+from jobs import SYNC_INTERVALS, get_sync_runner
+from data_cache import get_data_cache
+from utils import format_caratula, generate_report, get_juzgados_directory
+from reports import REPORT_FORMATS, report_bytes
+from dossiers import DOSSIER_FORMATS, build_dossiers, export_dossiers
+from deadlines import BUCKETS as DEADLINE_BUCKETS, anios_cubiertos, compute_deadlines
+from timing import PhaseTimer, startup_profile_enabled
+
+# Tiempos de arranque (se muestran con GESTOR_PROFILE_STARTUP=1)
+arranque = PhaseTimer("arranque app2")
+arranque.phases.append(("imports", time.perf_counter() - _inicio_imports))
 
 # --- INICIALIZACIÓN Y CONFIGURACIÓN DE LA PÁGINA ---
-init_db()
 st.set_page_config(
     layout="wide", 
     page_title="Gestor de Expedientes CAYT",
     page_icon="⚖️"
 )
+# Motor y esquema: una sola vez por proceso
+with arranque.phase("base de datos"):
+    db_manager = get_db_manager()
+# Fuera del cache_resource: cada sesión guarda su propio valor
+st.session_state['db_connection_type'] = connection_type(db_manager.engine)
+
+# --- SINCRONIZACIÓN EN SEGUNDO PLANO ---
+with arranque.phase("sincronización"):
+    sync_runner = get_sync_runner()
+ultimo_job = sync_runner.current
+# Expedientes con novedades en la última sincronización completada
+novedades_sync = ultimo_job.novedades if ultimo_job and not ultimo_job.running else set()
+
+# Caché por tabla compartida entre sesiones; las escrituras pasan por ella
+with arranque.phase("caché"):
+    data = get_data_cache()
 
-# --- ESTADOS DE SESIÓN ---
-if 'last_sync' not in st.session_state:
-    st.session_state.last_sync = "Nunca"
-if 'sync_in_progress' not in st.session_state:
-    st.session_state.sync_in_progress = False
+# Expedientes que se muestran en la vista previa de un reporte
+PREVIEW_EXPEDIENTES = 5
 
 # --- FUNCIONES AUXILIARES ---
-@st.cache_data(ttl=300)  # Cache por 5 minutos
-def load_data():
-    """Carga todos los datos de la base de datos con caché"""
-    return db_manager.get_all_data()
+def query(method, **params):
+    """Ejecuta una consulta puntual de db_manager con caché (se invalida por tabla al escribir)"""
+    return data.query(method, **params)
+
+def elementos_por_pagina():
+    """Expedientes por página en 'Mis Expedientes' (configurable en Configuración)"""
+    if 'elementos_por_pagina' not in st.session_state:
+        st.session_state.elementos_por_pagina = db_manager.get_setting("elementos_por_pagina", 10)
+    return st.session_state.elementos_por_pagina
 
 def sync_with_portal():
-    """Función para sincronizar con el portal"""
-    st.session_state.sync_in_progress = True
-    try:
-        with st.spinner("Iniciando sesión y sincronizando..."):
-            scraper_instance = Scraper()
-            scraper_instance.login_and_sync()
-        st.session_state.last_sync = datetime.now().strftime("%d/%m/%Y %H:%M")
-        st.success("¡Sincronización completa!")
-        # Limpiar caché para forzar recarga de datos
-        st.cache_data.clear()
-    except Exception as e:
-        st.error(f"Error durante la sincronización: {str(e)}")
-    finally:
-        st.session_state.sync_in_progress = False
+    """Lanza la sincronización con el portal en un hilo de fondo"""
+    if sync_runner.start("manual"):
+        st.toast("Sincronización iniciada en segundo plano.")
+    else:
+        st.warning("Ya hay una sincronización en curso.")
+
+@st.fragment(run_every=2)
+def sync_status():
+    """Muestra el progreso de la sincronización y recarga la app cuando termina"""
+    job = sync_runner.current
+    if job is None:
+        return
+    if job.running:
+        if job.harvest_total:
+            st.info(f"🔄 Buscando movimientos... {job.harvested}/{job.harvest_total} expedientes")
+        else:
+            st.info(f"🔄 Sincronizando... {job.pages} páginas, {job.rows} expedientes")
+    elif st.session_state.get('sync_job_visto') != job.id:
+        st.session_state.sync_job_visto = job.id
+        st.rerun()
+    elif job.status == "completada":
+        st.success(job.message)
+    else:
+        st.error(f"Error durante la sincronización: {job.message}")
 
 # --- BARRA LATERAL ---
 with st.sidebar:
@@ -56,52 +96,55 @@ with st.sidebar:
     # Botón de sincronización con estado deshabilitado durante la sincronización
     if st.button(
         "🔄 Sincronizar con Portal", 
-        disabled=st.session_state.sync_in_progress,
+        disabled=sync_runner.is_running(),
         help="Actualiza los datos desde el portal judicial"
     ):
         sync_with_portal()
-        time.sleep(1)  # Pequeña pausa para mostrar el mensaje de éxito
-        st.rerun()
+    sync_status()
     
-    # Estado del navegador
-    if 'driver' in st.session_state and st.session_state.driver:
+    # Estado del navegador (pool compartido por todas las sesiones)
+    if get_driver_pool().has_logged_in():
         if st.button("❌ Cerrar Navegador"):
+            from scraper import Scraper
             Scraper().close()
             st.rerun()
     
     st.markdown("---")
-    st.caption(f"Última sincronización: {st.session_state.last_sync}")
+    ultima_sync = sync_runner.last_finished()
+    st.caption(f"Última sincronización: {ultima_sync.strftime('%d/%m/%Y %H:%M') if ultima_sync else 'Nunca'}")
 
 # --- CARGA DE DATOS ---
+# Cada vista pide solo las filas y columnas que muestra
 try:
-    expedientes_df, tareas_df, notas_df, movimientos_df = load_data()
+    with arranque.phase("carga de datos"):
+        # numero -> carátula abreviada, calculada una vez por versión de la tabla (ver data_cache.py)
+        etiquetas = data.labels()
 except Exception as e:
     st.error(f"Error cargando datos: {str(e)}")
     st.stop()
 
+def etiqueta(numero, caratula=None):
+    """Carátula abreviada del expediente; `caratula` se formatea solo si no está en el mapa."""
+    return etiquetas.get(numero) or format_caratula(caratula)
+
+if startup_profile_enabled():
+    st.sidebar.caption(f"⏱️ {arranque.summary()}")
+
 # --- PANEL DE CONTENIDO PRINCIPAL ---
 if opcion_menu == "📈 Dashboard":
     st.title("📈 Panel de Control")
     
-    if expedientes_df.empty:
+    if not etiquetas:
         st.info("Aún no se han cargado expedientes. Use 'Sincronizar con Portal' para comenzar.")
     else:
         # Métricas
-        tareas_pendientes = tareas_df[~tareas_df['completada']]
-        vencen_7_dias = len(tareas_pendientes[
-            (tareas_pendientes['fecha_vencimiento'] <= (date.today() + timedelta(days=7))) &
-            (tareas_pendientes['fecha_vencimiento'] >= date.today())
-        ]) if not tareas_pendientes.empty else 0
-        
-        vencidas = len(tareas_pendientes[
-            tareas_pendientes['fecha_vencimiento'] < date.today()
-        ]) if not tareas_pendientes.empty else 0
+        metricas = query("get_dashboard_metrics", hoy=date.today(), dias=7)
         
         col1, col2, col3, col4 = st.columns(4)
-        col1.metric("Expedientes Activos", len(expedientes_df))
-        col2.metric("Tareas Pendientes", len(tareas_pendientes))
-        col3.metric("Vencen en 7 días", vencen_7_dias)
-        col4.metric("Tareas Vencidas", vencidas, delta_color="inverse")
+        col1.metric("Expedientes Activos", metricas['expedientes'])
+        col2.metric("Tareas Pendientes", metricas['pendientes'])
+        col3.metric("Vencen en 7 días", metricas['proximas'])
+        col4.metric("Tareas Vencidas", metricas['vencidas'], delta_color="inverse")
         
         st.markdown("---")
         
@@ -111,43 +154,38 @@ if opcion_menu == "📈 Dashboard":
         
         with col_mov:
             st.write("**Novedades Recientes del Portal**")
-            expedientes_df['fecha_novedad_dt'] = pd.to_datetime(
-                expedientes_df['fecha_novedad_portal'], 
-                format='%d/%m/%Y', 
-                errors='coerce'
+            # assign() devuelve una copia: el DataFrame cacheado se comparte entre sesiones
+            ultimos_movimientos = query("get_novedades_recientes", limit=5).assign(
+                fecha_novedad_dt=lambda df: pd.to_datetime(
+                    df['fecha_novedad_portal'], 
+                    format='%d/%m/%Y', 
+                    errors='coerce'
+                )
             )
-            ultimos_movimientos = expedientes_df.sort_values(by='fecha_novedad_dt', ascending=False).head(5)
             
             for _, exp in ultimos_movimientos.iterrows():
                 with st.container(border=True):
-                    link = create_expediente_link(exp['numero'])
-                    caratula_simple = format_caratula(exp['caratula'])
+                    link = exp['link_portal']  # calculado al sincronizar
+                    caratula_simple = etiqueta(exp['numero'], exp['caratula'])
                     
                     # Determinar color según antigüedad de la novedad
                     dias_desde_novedad = (datetime.now() - exp['fecha_novedad_dt']).days
                     color = "red" if dias_desde_novedad <= 1 else "orange" if dias_desde_novedad <= 3 else "blue"
                     
-                    st.markdown(f":{color}[**{caratula_simple}**]")
+                    nuevo = " 🆕" if exp['numero'] in novedades_sync else ""
+                    st.markdown(f":{color}[**{caratula_simple}**]{nuevo}")
                     st.caption(f"{exp['ultima_novedad_portal']} ({exp['fecha_novedad_portal']})")
                     
-                    if link:
+                    if pd.notna(link):
                         st.markdown(f"[Abrir expediente ↗]({link})", help="Abrir en el portal oficial")
         
         with col_notas:
             st.write("**Últimas Notas Agregadas**")
-            if not notas_df.empty:
-                ultimas_notas = notas_df.sort_values(by='fecha_creacion', ascending=False).head(5)
-                notas_con_caratula = pd.merge(
-                    ultimas_notas, 
-                    expedientes_df[['numero', 'caratula']], 
-                    left_on='expediente_numero', 
-                    right_on='numero', 
-                    how='left'
-                ).fillna({'caratula': 'N/A'})
-                
+            notas_con_caratula = query("get_ultimas_notas", limit=5)
+            if not notas_con_caratula.empty:
                 for _, nota in notas_con_caratula.iterrows():
                     with st.container(border=True):
-                        st.markdown(f"**Nota en:** {format_caratula(nota['caratula'])}")
+                        st.markdown(f"**Nota en:** {etiqueta(nota['expediente_numero'], nota['caratula'])}")
                         st.caption(f"{nota['contenido'][:100]}{'...' if len(nota['contenido']) > 100 else ''}")
                         st.caption(f"Añadida el {nota['fecha_creacion'].strftime('%d/%m/%Y %H:%M')}")
             else:
@@ -161,30 +199,68 @@ elif opcion_menu == "🗂️ Mis Expedientes":
     with col1:
         filtro_juzgado = st.selectbox(
             "Filtrar por juzgado",
-            options=["Todos"] + sorted(expedientes_df['juzgado'].dropna().unique().tolist())
+            options=["Todos"] + query("get_juzgados")
         )
     
     with col2:
         filtro_busqueda = st.text_input("Buscar en carátula", placeholder="Texto en carátula...")
     
-    # Aplicar filtros
-    expedientes_filtrados = expedientes_df.copy()
-    if filtro_juzgado != "Todos":
-        expedientes_filtrados = expedientes_filtrados[expedientes_filtrados['juzgado'] == filtro_juzgado]
-    if filtro_busqueda:
-        expedientes_filtrados = expedientes_filtrados[
-            expedientes_filtrados['caratula'].str.contains(filtro_busqueda, case=False, na=False)
-        ]
+    col3, col4, col5 = st.columns(3)
+    with col3:
+        filtro_anio = st.selectbox("Año", options=["Todos"] + query("get_anios"))
+    with col4:
+        filtro_demandado = st.selectbox("Demandado", options=["Todos"] + query("get_demandados"))
+    with col5:
+        orden = st.selectbox(
+            "Ordenar por",
+            options=["numero", "anio", "demandado"],
+            format_func=lambda o: {"numero": "Número", "anio": "Año (más reciente)", "demandado": "Demandado"}[o]
+        )
+    
+    # Aplicar filtros (en SQL) y traer solo la página actual
+    filtros = {
+        "caratula": filtro_busqueda or None,
+        "juzgado": None if filtro_juzgado == "Todos" else filtro_juzgado,
+        "anio": None if filtro_anio == "Todos" else filtro_anio,
+        "demandado": None if filtro_demandado == "Todos" else filtro_demandado,
+    }
+    total_expedientes = query("count_expedientes", **filtros)
+    por_pagina = elementos_por_pagina()
+    total_paginas = max(1, -(-total_expedientes // por_pagina))
+    
+    # Al cambiar los filtros se vuelve a la primera página
+    if st.session_state.get('filtros_expedientes') != filtros:
+        st.session_state.filtros_expedientes = filtros
+        st.session_state.pagina_expedientes = 1
+    pagina = min(st.session_state.get('pagina_expedientes', 1), total_paginas)
+    st.session_state.pagina_expedientes = pagina
+    
+    expedientes_filtrados = query(
+        "get_expedientes",
+        **filtros,
+        orden=orden,
+        limit=por_pagina,
+        offset=(pagina - 1) * por_pagina
+    )
     
     if expedientes_filtrados.empty:
         st.info("No hay expedientes que coincidan con los filtros aplicados.")
     else:
+        if total_paginas > 1:
+            col_pag, col_info = st.columns([1, 3])
+            # El valor del widget ya está en session_state al comenzar el rerun
+            col_pag.number_input("Página", min_value=1, max_value=total_paginas, key="pagina_expedientes")
+            col_info.caption(
+                f"Mostrando {(pagina - 1) * por_pagina + 1}–{min(pagina * por_pagina, total_expedientes)} "
+                f"de {total_expedientes} expedientes"
+            )
+        
+        # Tareas, movimientos y notas de la página, agrupados por expediente
+        indice = data.expediente_index(expedientes_filtrados['numero'])
+        
         for _, exp in expedientes_filtrados.iterrows():
             exp_numero = exp['numero']
-            tareas_pendientes_count = len(tareas_df[
-                (tareas_df['expediente_numero'] == exp_numero) & 
-                (~tareas_df['completada'])
-            ])
+            tareas_pendientes_count = indice.tareas_pendientes(exp_numero)
             
             # Determinar color según estado de la medida cautelar
             caratula_display = exp['caratula']
@@ -199,17 +275,54 @@ elif opcion_menu == "🗂️ Mis Expedientes":
             
             # Badge para tareas pendientes
             badge = f" 🚨 `{tareas_pendientes_count} Tareas`" if tareas_pendientes_count > 0 else ""
+            if exp_numero in novedades_sync:
+                badge += " 🆕"
             
             expander_title = f"**{exp_numero}** - {caratula_display}{badge}"
             
-            with st.expander(expander_title):
+            # Las pestañas y formularios se arman solo para el expediente abierto
+            abierto = st.session_state.get('expediente_abierto') == exp_numero
+            with st.container(border=True):
+                col_titulo, col_boton = st.columns([0.85, 0.15])
+                col_titulo.markdown(expander_title)
+                if col_boton.button("Cerrar" if abierto else "Abrir", key=f"abrir_{exp_numero}", use_container_width=True):
+                    st.session_state.expediente_abierto = None if abierto else exp_numero
+                    st.rerun()
+                if not abierto:
+                    continue
+                
                 tab_ficha, tab_historial, tab_tareas, tab_notas = st.tabs(
                     ["Ficha Técnica", "Historial de Movimientos", "Tareas", "Notas"]
                 )
                 
                 with tab_ficha:
                     with st.form(key=f"form_ficha_{exp_numero}"):
-                        juzgado = st.text_input("Juzgado", value=exp.get('juzgado', ''), key=f"juzgado_{exp_numero}")
+                        # Los nombres del directorio coinciden con los que resuelve la sincronización
+                        juzgado_actual = exp.get('juzgado_nombre') or ''
+                        directorio = get_juzgados_directory()
+                        opciones_juzgado = [''] + list(directorio.por_nombre)
+                        if juzgado_actual not in opciones_juzgado:
+                            opciones_juzgado.append(juzgado_actual)
+                        juzgado = st.selectbox(
+                            "Juzgado",
+                            options=opciones_juzgado,
+                            index=opciones_juzgado.index(juzgado_actual),
+                            format_func=lambda j: j or "Sin asignar",
+                            key=f"juzgado_{exp_numero}"
+                        )
+                        # El formulario no se recarga al cambiar el juzgado: las opciones son las del juzgado guardado
+                        secretaria_actual = exp.get('secretaria_nombre') or ''
+                        opciones_secretaria = [''] + directorio.secretarias_de(juzgado_actual)
+                        if secretaria_actual not in opciones_secretaria:
+                            opciones_secretaria.append(secretaria_actual)
+                        secretaria = st.selectbox(
+                            "Secretaría",
+                            options=opciones_secretaria,
+                            index=opciones_secretaria.index(secretaria_actual),
+                            format_func=lambda s: s or "Sin asignar",
+                            help="Si cambia el juzgado, guarde y elija después la secretaría del juzgado nuevo.",
+                            key=f"secretaria_{exp_numero}"
+                        )
                         medida_cautelar = st.text_input(
                             "Estado Medida Cautelar", 
                             value=exp.get('medida_cautelar_status', ''), 
@@ -222,21 +335,21 @@ elif opcion_menu == "🗂️ Mis Expedientes":
                         )
                         
                         if st.form_submit_button("Guardar Ficha"):
-                            db_manager.update_ficha_expediente(exp_numero, {
-                                'juzgado': juzgado,
+                            # Con otro juzgado, la secretaría se conserva solo si es de ese juzgado
+                            if juzgado != juzgado_actual and secretaria not in directorio.secretarias_de(juzgado):
+                                secretaria = ''
+                            data.update_ficha_expediente(exp_numero, {
+                                'juzgado_nombre': juzgado or None,
+                                'secretaria_nombre': secretaria or None,
                                 'medida_cautelar_status': medida_cautelar,
                                 'observaciones': observaciones
                             })
                             st.success("Ficha actualizada.")
-                            st.cache_data.clear()
                             time.sleep(0.5)
                             st.rerun()
                 
                 with tab_historial:
-                    movs = movimientos_df[movimientos_df['expediente_numero'] == exp_numero].sort_values(
-                        by='fecha', 
-                        ascending=False
-                    )
+                    movs = indice.movimientos(exp_numero)  # del más nuevo al más viejo
                     
                     if movs.empty:
                         st.info("No hay movimientos registrados para este expediente.")
@@ -251,19 +364,18 @@ elif opcion_menu == "🗂️ Mis Expedientes":
                         desc_mov = c2.text_input("Descripción", key=f"desc_mov_{exp_numero}")
                         
                         if st.form_submit_button("Guardar Movimiento"):
-                            db_manager.add_item('movimientos', {
+                            data.add_item('movimientos', {
                                 "expediente_numero": exp_numero, 
                                 "fecha": fecha_mov, 
                                 "descripcion": desc_mov
                             })
-                            st.cache_data.clear()
                             time.sleep(0.5)
                             st.rerun()
                 
                 with tab_tareas:
-                    tareas_exp = tareas_df[tareas_df['expediente_numero'] == exp_numero].sort_values(
-                        by='fecha_vencimiento'
-                    )
+                    tareas_exp = indice.tareas(exp_numero)  # por fecha de vencimiento
+                    if not tareas_exp.empty:
+                        tareas_exp = compute_deadlines(tareas_exp)
                     
                     if tareas_exp.empty:
                         st.info("No hay tareas para este expediente.")
@@ -272,22 +384,26 @@ elif opcion_menu == "🗂️ Mis Expedientes":
                             col1, col2 = st.columns([0.9, 0.1])
                             with col1:
                                 estado_actual = bool(t['completada'])
-                                dias_restantes = (t['fecha_vencimiento'] - date.today()).days
                                 
-                                # Color según estado y proximidad de vencimiento
+                                # Color según estado y proximidad de vencimiento (en días hábiles)
                                 if estado_actual:
                                     estado_texto = f"~~{t['descripcion']}~~ ✅"
                                     color = "gray"
-                                elif dias_restantes < 0:
+                                elif t['bucket'] == "sin_fecha":
+                                    estado_texto = t['descripcion']
+                                    color = "blue"
+                                elif t['bucket'] == "vencida":
                                     estado_texto = f"{t['descripcion']} 🚨 (Vencida)"
                                     color = "red"
-                                elif dias_restantes <= 3:
+                                elif t['bucket'] in ("hoy", "proxima"):
                                     estado_texto = f"{t['descripcion']} ⚠️ (Vence: {t['fecha_vencimiento'].strftime('%d/%m/%Y')})"
                                     color = "orange"
                                 else:
                                     estado_texto = f"{t['descripcion']} (Vence: {t['fecha_vencimiento'].strftime('%d/%m/%Y')})"
                                     color = "blue"
                                 
+                                if not estado_actual and t['fuera_de_calendario']:
+                                    estado_texto += " ⚠️ (sin feriados cargados para ese año)"
                                 st.markdown(f":{color}[{estado_texto}]")
                             
                             with col2:
@@ -298,8 +414,7 @@ elif opcion_menu == "🗂️ Mis Expedientes":
                                     label_visibility="collapsed"
                                 )
                                 if nuevo_estado != estado_actual:
-                                    db_manager.update_tarea_status(t['id'], nuevo_estado)
-                                    st.cache_data.clear()
+                                    data.update_tarea_status(t['id'], nuevo_estado)
                                     time.sleep(0.5)
                                     st.rerun()
                     
@@ -311,22 +426,18 @@ elif opcion_menu == "🗂️ Mis Expedientes":
                         nueva_prioridad = c2.selectbox("Prioridad", ["Alta", "Media", "Baja"])
                         
                         if st.form_submit_button("Guardar Tarea"):
-                            db_manager.add_item('tareas', {
+                            data.add_item('tareas', {
                                 "expediente_numero": exp_numero, 
                                 "descripcion": nueva_desc, 
                                 "fecha_vencimiento": nueva_fecha, 
                                 "prioridad": nueva_prioridad.lower(),
                                 "completada": False
                             })
-                            st.cache_data.clear()
                             time.sleep(0.5)
                             st.rerun()
                 
                 with tab_notas:
-                    notas_exp = notas_df[notas_df['expediente_numero'] == exp_numero].sort_values(
-                        by='fecha_creacion', 
-                        ascending=False
-                    )
+                    notas_exp = indice.notas(exp_numero)  # de la más nueva a la más vieja
                     
                     if notas_exp.empty:
                         st.info("No hay notas para este expediente.")
@@ -340,12 +451,11 @@ elif opcion_menu == "🗂️ Mis Expedientes":
                         nuevo_contenido = st.text_area("Nueva Nota:", height=100)
                         
                         if st.form_submit_button("Guardar Nota"):
-                            db_manager.add_item('notas', {
+                            data.add_item('notas', {
                                 "expediente_numero": exp_numero, 
                                 "contenido": nuevo_contenido, 
                                 "fecha_creacion": datetime.now()
                             })
-                            st.cache_data.clear()
                             time.sleep(0.5)
                             st.rerun()
 
@@ -368,58 +478,53 @@ elif opcion_menu == "🗓️ Agenda":
             value=7
         )
     
-    # Aplicar filtros
-    tareas_pendientes = tareas_df[~tareas_df['completada']].sort_values(by='fecha_vencimiento')
-    
-    if filtro_prioridad != "Todas":
-        tareas_pendientes = tareas_pendientes[tareas_pendientes['prioridad'] == filtro_prioridad.lower()]
-    
+    # Aplicar filtros (en SQL, con la carátula ya unida)
     fecha_limite = date.today() + timedelta(days=filtro_dias)
-    tareas_pendientes = tareas_pendientes[tareas_pendientes['fecha_vencimiento'] <= fecha_limite]
+    tareas_pendientes = query(
+        "get_tareas_pendientes",
+        hasta=fecha_limite,
+        prioridad=None if filtro_prioridad == "Todas" else filtro_prioridad.lower()
+    )
     
     if tareas_pendientes.empty: 
         st.success("¡No hay tareas pendientes para los criterios seleccionados! 🎉")
     else:
-        # Agrupar por fecha de vencimiento
-        tareas_por_fecha = tareas_pendientes.groupby('fecha_vencimiento')
-        
-        for fecha, grupo in tareas_por_fecha:
-            dias_restantes = (fecha - date.today()).days
-            
-            if dias_restantes < 0:
-                titulo = f"### ❌ Vencidas ({fecha.strftime('%d/%m/%Y')})"
-                color_borde = "red"
-            elif dias_restantes == 0:
-                titulo = f"### ⚠️ Vencen hoy ({fecha.strftime('%d/%m/%Y')})"
-                color_borde = "orange"
-            elif dias_restantes <= 3:
-                titulo = f"### 🔥 Vencen en {dias_restantes} días ({fecha.strftime('%d/%m/%Y')})"
-                color_borde = "orange"
-            else:
-                titulo = f"### 📅 Vencen en {dias_restantes} días ({fecha.strftime('%d/%m/%Y')})"
-                color_borde = "blue"
-            
-            st.markdown(titulo)
-            
-            for _, t in grupo.iterrows():
+        # Días corridos/hábiles y grupo de vencimiento de todas las tareas en una sola pasada
+        tareas_pendientes = compute_deadlines(tareas_pendientes)
+        prioridad_emoji = {"alta": "🔴", "media": "🟡", "baja": "🔵"}
+        if tareas_pendientes['fuera_de_calendario'].any():
+            cobertura = anios_cubiertos()
+            rango = f"{cobertura[0]}-{cobertura[1]}" if cobertura else "ninguno"
+            st.warning(
+                f"Hay vencimientos fuera de los años con feriados cargados ({rango}): sus días hábiles solo "
+                "descuentan fines de semana. Actualizá data/feriados_judiciales.json."
+            )
+
+        for bucket, grupo in tareas_pendientes.groupby('bucket', observed=True, sort=True):
+            titulo, color_borde = DEADLINE_BUCKETS[bucket]
+            st.markdown(f"### {titulo} ({len(grupo)})")
+
+            for t in grupo.itertuples(index=False):
                 with st.container(border=True):
-                    # Obtener información del expediente asociado
-                    exp_asociado_df = expedientes_df[expedientes_df['numero'] == t['expediente_numero']]
-                    
-                    if not exp_asociado_df.empty:
-                        exp_asociado = exp_asociado_df.iloc[0]
-                        caratula = format_caratula(exp_asociado['caratula'])
-                        st.markdown(f"**{t['descripcion']}**")
-                        st.markdown(f"**Expediente:** {caratula}")
-                        
-                        # Prioridad
-                        prioridad_emoji = {"alta": "🔴", "media": "🟡", "baja": "🔵"}
-                        st.markdown(f"**Prioridad:** {prioridad_emoji.get(t['prioridad'], '⚪')} {t['prioridad'].capitalize()}")
+                    st.markdown(f"**{t.descripcion}**")
+                    # Información del expediente asociado (unida en la consulta)
+                    if pd.notna(t.caratula):
+                        st.markdown(f"**Expediente:** {etiqueta(t.expediente_numero, t.caratula)}")
+                        st.markdown(f"**Prioridad:** {prioridad_emoji.get(t.prioridad, '⚪')} {str(t.prioridad).capitalize()}")
                     else:
-                        st.markdown(f"**{t['descripcion']}**")
-                        st.markdown(f"**Expediente:** {t['expediente_numero']}")
-                    
-                    st.markdown(f"**Vence:** {t['fecha_vencimiento'].strftime('%d/%m/%Y')}")
+                        st.markdown(f"**Expediente:** {t.expediente_numero}")
+
+                    if pd.isna(t.dias_habiles):
+                        continue
+                    if t.dias_corridos < 0:
+                        plazo = f"vencida hace {-t.dias_corridos} días ({-t.dias_habiles} hábiles)"
+                    elif t.dias_corridos == 0:
+                        plazo = "vence hoy"
+                    else:
+                        plazo = f"faltan {t.dias_habiles} días hábiles ({t.dias_corridos} corridos)"
+                    if t.fuera_de_calendario:
+                        plazo += " ⚠️ sin feriados cargados"
+                    st.markdown(f"**Vence:** {t.fecha_vencimiento.strftime('%d/%m/%Y')} — :{color_borde}[{plazo}]")
 
 elif opcion_menu == "📝 Notas":
     st.title("📝 Resumen de Notas")
@@ -427,97 +532,128 @@ elif opcion_menu == "📝 Notas":
     # Filtros para notas
     filtro_expediente = st.selectbox(
         "Filtrar por expediente",
-        options=["Todos"] + sorted(expedientes_df['numero'].unique().tolist()),
-        format_func=lambda x: format_caratula(
-            expedientes_df[expedientes_df['numero'] == x].iloc[0]['caratula']
-        ) if x != "Todos" else "Todos"
+        options=["Todos"] + sorted(etiquetas),
+        format_func=lambda x: etiquetas.get(x, x) if x != "Todos" else "Todos"
     )
     
-    if notas_df.empty: 
+    notas_con_caratula = query(
+        "get_ultimas_notas",
+        expediente_numero=None if filtro_expediente == "Todos" else filtro_expediente
+    )
+    
+    if notas_con_caratula.empty and filtro_expediente == "Todos": 
         st.info("Aún no has añadido ninguna nota.")
     else:
-        # Aplicar filtro
-        notas_filtradas = notas_df.copy()
-        if filtro_expediente != "Todos":
-            notas_filtradas = notas_filtradas[notas_filtradas['expediente_numero'] == filtro_expediente]
-        
-        notas_filtradas = notas_filtradas.sort_values(by='fecha_creacion', ascending=False)
-        
-        if notas_filtradas.empty:
+        if notas_con_caratula.empty:
             st.info("No hay notas para el expediente seleccionado.")
         else:
-            notas_con_caratula = pd.merge(
-                notas_filtradas, 
-                expedientes_df[['numero', 'caratula']], 
-                left_on='expediente_numero', 
-                right_on='numero', 
-                how='left'
-            )
-            
             for _, n in notas_con_caratula.iterrows():
                 with st.container(border=True):
-                    st.markdown(f"**Nota en:** {format_caratula(n.get('caratula', n['expediente_numero']))}")
+                    st.markdown(f"**Nota en:** {etiqueta(n['expediente_numero'], n.get('caratula'))}")
                     st.write(n['contenido'])
                     st.caption(f"Añadido el {n['fecha_creacion'].strftime('%d/%m/%Y %H:%M')}")
 
 elif opcion_menu == "🔍 Búsqueda":
     st.title("🔍 Búsqueda General en Portal CAYT")
     
-    if 'driver' not in st.session_state or st.session_state.driver is None:
-        st.warning("⚠️ Para buscar, primero debe 'Iniciar Sesión y Sincronizar' desde la barra lateral.")
-    else:
-        query = st.text_input("Ingrese su búsqueda", key="search_query", placeholder="Número de expediente, carátula, etc.")
-        
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            tipo_busqueda = st.selectbox(
-                "Tipo de búsqueda",
-                options=["General", "Por número", "Por carátula"]
-            )
-        
-        if st.button("Buscar en Portal", type="primary"):
-            with st.spinner(f"Buscando '{query}'..."):
-                try:
-                    if tipo_busqueda == "Por número":
-                        search_results = Scraper().search_by_number(query)
-                    elif tipo_busqueda == "Por carátula":
-                        search_results = Scraper().search_by_caratula(query)
-                    else:
-                        search_results = Scraper().search_on_portal(query)
-                    
-                    if not search_results.empty:
-                        st.dataframe(
-                            search_results, 
-                            column_config={
-                                "Enlace": st.column_config.LinkColumn("Abrir", display_text="↗️")
-                            }, 
-                            hide_index=True,
-                            use_container_width=True
-                        )
-                    else:
-                        st.info("No se encontraron resultados.")
-                except Exception as e:
-                    st.error(f"Error en la búsqueda: {str(e)}")
+    # Búsqueda local (índice de texto completo): no requiere sesión en el portal
+    st.subheader("En mis expedientes")
+    col_texto, col_tipos = st.columns([3, 2])
+    texto_local = col_texto.text_input(
+        "Buscar en carátulas, observaciones, notas y movimientos",
+        key="busqueda_local",
+        placeholder="Ej.: cautelar pérez"
+    )
+    tipos_local = col_tipos.multiselect(
+        "Buscar en",
+        options=["expediente", "nota", "movimiento"],
+        default=["expediente", "nota", "movimiento"],
+        format_func=lambda t: {"expediente": "Expedientes", "nota": "Notas", "movimiento": "Movimientos"}[t]
+    )
+    if texto_local and tipos_local:
+        resultados_locales = data.query("search", texto=texto_local, tipos=tuple(tipos_local))
+        if resultados_locales.empty:
+            st.info("No hay coincidencias en sus datos.")
+        else:
+            iconos = {"expediente": "🗂️", "nota": "📝", "movimiento": "📜"}
+            for _, r in resultados_locales.iterrows():
+                with st.container(border=True):
+                    st.markdown(f"{iconos[r['tipo']]} **{r['expediente_numero']}** - {etiqueta(r['expediente_numero'], r['caratula'])}")
+                    st.markdown(r['fragmento'])
+    
+    # Jurisprudencia de búsquedas anteriores en el portal, disponible sin conexión
+    if texto_local:
+        jurisprudencia_local = query("search_jurisprudencia", texto=texto_local)
+        if not jurisprudencia_local.empty:
+            with st.expander(f"Jurisprudencia guardada ({len(jurisprudencia_local)})"):
+                st.dataframe(
+                    jurisprudencia_local[["Resultado", "fragmento", "CUIJ", "Enlace"]],
+                    column_config={
+                        "fragmento": "Coincidencia",
+                        "Enlace": st.column_config.LinkColumn("Abrir", display_text="↗️")
+                    },
+                    hide_index=True,
+                    use_container_width=True
+                )
+    
+    st.markdown("---")
+    st.subheader("En el portal")
+    # La jurisprudencia es pública y las búsquedas por número o carátula responden primero
+    # desde la base local: no hace falta haber iniciado sesión
+    texto_busqueda = st.text_input("Ingrese su búsqueda", key="search_query", placeholder="Número de expediente, carátula, etc.")
+    
+    col1, col2 = st.columns([1, 3])
+    with col1:
+        tipo_busqueda = st.selectbox(
+            "Tipo de búsqueda",
+            options=["General", "Por número", "Por carátula"],
+            help="General busca jurisprudencia. Por número y por carátula buscan primero en sus expedientes."
+        )
+    
+    if st.button("Buscar en Portal", type="primary"):
+        from scraper import Scraper
+        with st.spinner(f"Buscando '{texto_busqueda}'..."):
+            try:
+                if tipo_busqueda == "Por número":
+                    search_results = Scraper().search_by_number(texto_busqueda)
+                elif tipo_busqueda == "Por carátula":
+                    search_results = Scraper().search_by_caratula(texto_busqueda)
+                else:
+                    search_results = Scraper().search_on_portal(texto_busqueda)
+                    # Los resultados nuevos se guardan en la caché local de jurisprudencia
+                    data.bump("jurisprudencia")
+                
+                if not search_results.empty:
+                    st.dataframe(
+                        search_results, 
+                        column_config={
+                            "Enlace": st.column_config.LinkColumn("Abrir", display_text="↗️")
+                        }, 
+                        hide_index=True,
+                        use_container_width=True
+                    )
+                else:
+                    st.info("No se encontraron resultados.")
+            except Exception as e:
+                st.error(f"Error en la búsqueda: {str(e)}")
 
 elif opcion_menu == "📄 Reportes":
     st.title("📄 Generador de Informes")
     
-    if expedientes_df.empty:
+    if not etiquetas:
         st.info("No hay expedientes para generar reportes.")
     else:
         # Selección de expedientes
         selected_expedientes = st.multiselect(
             "Seleccione los expedientes para incluir en el reporte:",
-            options=expedientes_df['numero'],
-            format_func=lambda x: format_caratula(
-                expedientes_df[expedientes_df['numero'] == x].iloc[0]['caratula']
-            )
+            options=list(etiquetas),
+            format_func=etiquetas.get
         )
         
         # Opciones de formato
         formato_reporte = st.selectbox(
             "Formato del reporte",
-            options=["Markdown", "HTML", "Texto plano"]
+            options=list(REPORT_FORMATS)
         )
         
         if st.button("Generar Reporte", type="primary"):
@@ -525,40 +661,70 @@ elif opcion_menu == "📄 Reportes":
                 st.warning("Debe seleccionar al menos un expediente.")
             else:
                 with st.spinner("Generando reporte..."):
-                    reporte = generate_report(
-                        expedientes_df, 
-                        tareas_df, 
-                        notas_df, 
-                        movimientos_df, 
-                        selected_expedientes,
-                        formato=formato_reporte
+                    seleccion = tuple(selected_expedientes)
+                    datos_reporte = (
+                        query("get_expedientes", numeros=seleccion), 
+                        query("get_tareas", numeros=seleccion), 
+                        query("get_movimientos", numeros=seleccion)
                     )
+                    # Un único buffer con el reporte completo para la descarga
+                    reporte = report_bytes(*datos_reporte, selected_expedientes, formato=formato_reporte)
                 
-                # Mostrar previsualización
+                # Mostrar previsualización (solo los primeros expedientes)
                 with st.expander("Vista previa del reporte"):
+                    vista_previa = generate_report(
+                        *datos_reporte,
+                        selected_expedientes[:PREVIEW_EXPEDIENTES],
+                        formato=formato_reporte
+                    )
+                    if len(selected_expedientes) > PREVIEW_EXPEDIENTES:
+                        st.caption(f"Se muestran {PREVIEW_EXPEDIENTES} de {len(selected_expedientes)} expedientes.")
                     if formato_reporte == "Markdown":
-                        st.markdown(reporte)
+                        st.markdown(vista_previa)
                     elif formato_reporte == "HTML":
-                        st.components.v1.html(reporte, height=400, scrolling=True)
+                        st.components.v1.html(vista_previa, height=400, scrolling=True)
                     else:
-                        st.text(reporte)
+                        st.text(vista_previa)
                 
                 # Descargar reporte
-                extension = {
-                    "Markdown": "md",
-                    "HTML": "html",
-                    "Texto plano": "txt"
-                }[formato_reporte]
+                extension, mime = REPORT_FORMATS[formato_reporte]
                 
                 st.download_button(
                     f"Descargar Reporte (.{extension})",
                     reporte,
                     file_name=f"Reporte_Expedientes_{datetime.now().strftime('%Y%m%d_%H%M')}.{extension}",
-                    mime={
-                        "Markdown": "text/markdown",
-                        "HTML": "text/html",
-                        "Texto plano": "text/plain"
-                    }[formato_reporte]
+                    mime=mime
+                )
+        
+        # Legajos completos (un archivo por expediente), renderizados en paralelo
+        st.markdown("---")
+        st.subheader("Exportar legajos")
+        formato_legajo = st.radio("Formato de los legajos", options=list(DOSSIER_FORMATS), horizontal=True)
+        
+        if st.button("Exportar Legajos"):
+            if not selected_expedientes:
+                st.warning("Debe seleccionar al menos un expediente.")
+            else:
+                seleccion = tuple(selected_expedientes)
+                legajos = build_dossiers(
+                    query("get_expedientes", numeros=seleccion),
+                    query("get_tareas", numeros=seleccion),
+                    query("get_movimientos", numeros=seleccion),
+                    query("get_notas", numeros=seleccion),
+                    selected_expedientes,
+                    get_juzgados_directory()
+                )
+                barra = st.progress(0.0, text="Generando legajos...")
+                archivo_zip = export_dossiers(
+                    legajos,
+                    formato_legajo,
+                    progress=lambda hechos, total: barra.progress(hechos / total, text=f"Legajos generados: {hechos}/{total}")
+                )
+                st.download_button(
+                    f"Descargar {len(legajos)} legajos (.zip)",
+                    archivo_zip,
+                    file_name=f"Legajos_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                    mime="application/zip"
                 )
 
 elif opcion_menu == "⚙️ Configuración":
@@ -571,15 +737,24 @@ elif opcion_menu == "⚙️ Configuración":
         modo_oscuro = st.toggle("Modo oscuro", value=False)
     
     with col2:
-        elementos_por_pagina = st.slider("Elementos por página", 5, 50, 10)
+        por_pagina = st.slider("Elementos por página", 5, 50, elementos_por_pagina())
     
     st.subheader("Configuración de sincronización")
-    sincronizacion_automatica = st.toggle("Sincronización automática al iniciar", value=False)
+    sincronizacion_automatica = st.toggle(
+        "Sincronización automática al iniciar",
+        value=db_manager.get_setting("sincronizacion_al_iniciar", False)
+    )
+    opciones_intervalo = list(SYNC_INTERVALS)
     intervalo_sincronizacion = st.selectbox(
         "Intervalo de sincronización automática",
-        options=["Desactivada", "Cada hora", "Cada 6 horas", "Diariamente"]
+        options=opciones_intervalo,
+        index=opciones_intervalo.index(db_manager.get_setting("intervalo_sincronizacion", "Desactivada"))
     )
     
     if st.button("Guardar configuración"):
-        # Aquí iría la lógica para guardar la configuración
+        db_manager.set_setting("sincronizacion_al_iniciar", sincronizacion_automatica)
+        db_manager.set_setting("intervalo_sincronizacion", intervalo_sincronizacion)
+        db_manager.set_setting("elementos_por_pagina", por_pagina)
+        st.session_state.elementos_por_pagina = por_pagina
+        sync_runner.set_interval(SYNC_INTERVALS[intervalo_sincronizacion])
         st.success("Configuración guardada correctamente")
\ No newline at end of file
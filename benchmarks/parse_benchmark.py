@@ -0,0 +1,140 @@
+"""Compara los backends de parseo de tarjetas sobre páginas guardadas del portal.
+
+Uso:
+    python benchmarks/parse_benchmark.py [--repeat 5] [--number 20]
+
+Cada archivo de benchmarks/fixtures se parsea con cada backend de parsing.py, tanto
+como página completa (`page_source`) como solo con las tarjetas (lo que devuelve
+`cards_html`). La salida se compara contra reference_parser.py (copia congelada
+del parser original con BeautifulSoup) sobre la página completa: si algún backend
+difiere, el script termina con error. La fila "referencia" mide ese parser original.
+La memoria es el pico de RSS de un proceso aparte que solo parsea ese archivo.
+"""
+import argparse
+import functools
+import multiprocessing
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+
+import reference_parser  # noqa: E402
+from parsing import (  # noqa: E402
+    ACTUACION_CARD, EXPEDIENTE_CARD, PARSER_BACKENDS, lxml_available,
+    parse_actuacion_rows, parse_expediente_cards, parse_jurisprudencia_cards,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+REFERENCE = "referencia"
+
+# Prefijo del archivo -> (función de parseo, función de referencia, tarjeta)
+PARSERS = {
+    "mis_causas": (parse_expediente_cards, reference_parser.parse_expediente_cards, EXPEDIENTE_CARD),
+    "actuaciones": (parse_actuacion_rows, reference_parser.parse_actuacion_rows, ACTUACION_CARD),
+    "jurisprudencia": (parse_jurisprudencia_cards, reference_parser.parse_jurisprudencia_cards, ACTUACION_CARD),
+}
+
+
+def parser_for(filename):
+    for prefix, parser in PARSERS.items():
+        if filename.startswith(prefix):
+            return parser
+    return None
+
+
+def only_cards(html, tag):
+    """Lo mismo que devolvería el navegador con cards_html: el outerHTML de cada tarjeta."""
+    from bs4 import BeautifulSoup
+
+    return "".join(str(card) for card in BeautifulSoup(html, "html.parser").find_all(tag))
+
+
+def as_frame(result):
+    return result if isinstance(result, pd.DataFrame) else pd.DataFrame(result)
+
+
+def _status_kb(campo):
+    # VmHWM es el pico de este proceso (ru_maxrss hereda el del padre a través del exec)
+    with open("/proc/self/status") as f:
+        for linea in f:
+            if linea.startswith(campo + ":"):
+                return int(linea.split()[1])
+    return 0
+
+
+def _peak_rss(parse, html, queue):
+    parse("<p></p>")  # importa bs4/lxml y pandas antes de tomar la base
+    base = _status_kb("VmRSS")
+    parse(html)
+    queue.put(max(_status_kb("VmHWM") - base, 0))
+
+
+def peak_rss_kb(parse, html):
+    """Cuánto supera el pico de RSS (KB) a la memoria en uso antes de parsear, en un proceso nuevo (Linux)."""
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=_peak_rss, args=(parse, html, queue))
+    process.start()
+    delta = queue.get()
+    process.join()
+    return delta
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--repeat", type=int, default=5, help="mediciones por caso (se toma la mejor)")
+    ap.add_argument("--number", type=int, default=20, help="parseos por medición")
+    ap.add_argument("--no-memory", action="store_true", help="no medir memoria (más rápido)")
+    args = ap.parse_args(argv)
+    medir_memoria = not args.no_memory and os.path.exists("/proc/self/status")
+
+    if not lxml_available():
+        print("lxml no está instalado: el backend 'lxml' cae a html.parser.")
+
+    rows, errores = [], []
+    for filename in sorted(os.listdir(FIXTURES_DIR)):
+        parser = parser_for(filename)
+        if parser is None:
+            continue
+        parse_backend, parse_reference, tag = parser
+        with open(os.path.join(FIXTURES_DIR, filename), "r", encoding="utf-8") as f:
+            page = f.read()
+        reference = as_frame(parse_reference(page))
+        inputs = {"page_source": page, "cards_html": only_cards(page, tag)}
+
+        for modo, html in inputs.items():
+            # El parser original solo se mide sobre la página completa, que es lo que leía
+            casos = [(REFERENCE, parse_reference)] if modo == "page_source" else []
+            casos += [(b, functools.partial(parse_backend, backend=b)) for b in PARSER_BACKENDS]
+            for backend, parse in casos:
+                ok = as_frame(parse(html)).equals(reference)
+                if not ok:
+                    errores.append(f"{filename} [{modo}/{backend}]")
+                tiempos = timeit.repeat(lambda: parse(html), repeat=args.repeat, number=args.number)
+                rows.append({
+                    "archivo": filename,
+                    "entrada": modo,
+                    "KB": round(len(html.encode("utf-8")) / 1024, 1),
+                    "backend": backend,
+                    "filas": len(reference),
+                    "ms": round(min(tiempos) / args.number * 1000, 2),
+                    "pico_rss_KB": peak_rss_kb(parse, html) if medir_memoria else None,
+                    "igual": "sí" if ok else "NO",
+                })
+
+    df = pd.DataFrame(rows)
+    base = df[(df["entrada"] == "page_source") & (df["backend"] == REFERENCE)].set_index("archivo")["ms"]
+    df["vs_original"] = (base.reindex(df["archivo"]).to_numpy() / df["ms"]).round(1).astype(str) + "x"
+    print(df.to_string(index=False))
+
+    if errores:
+        print("\nSalida distinta de la referencia en: " + ", ".join(errores))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
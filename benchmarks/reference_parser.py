@@ -0,0 +1,108 @@
+"""Parser de referencia del benchmark: copia congelada del parseo con BeautifulSoup.
+
+Es el código de scraper.py anterior a parsing.py (commit b37e15c), copiado tal
+cual para que una regresión de parsing.py no pase inadvertida aunque afecte a
+todos sus backends. No importa nada de parsing.py. Los únicos cambios son los
+de comportamiento que se hicieron a propósito después, marcados con
+"CAMBIO POSTERIOR":
+  - Link: se arma desde el número como en la API (utils.expediente_link) y el
+    href de la tarjeta queda solo si el número no es un CUIJ.
+  - Radicación: si el texto está en un <span> (u otra etiqueta en línea) se
+    toma el bloque que lo contiene, con el juzgado y la secretaría juntos.
+No modificar por otros motivos: si parsing.py cambia el resultado a propósito,
+el cambio se agrega acá de la misma forma.
+"""
+import re
+from datetime import datetime
+
+import pandas as pd
+from bs4 import BeautifulSoup
+
+from utils import BASE_URL, JURISPRUDENCIA_COLUMNS, create_expediente_link
+
+EXPEDIENTE_CARD = "iol-expediente-tarjeta"
+ACTUACION_CARD = "iol-actuacion-tarjeta"
+FECHA_RE = re.compile(r"\d{2}/\d{2}/\d{4}")
+RADICACION_RE = re.compile(r"juzgado|secretar[ií]a", re.IGNORECASE)
+# CAMBIO POSTERIOR (radicación)
+INLINE = {"span", "b", "i", "em", "small", "a"}
+
+
+def parse_expediente_cards(html):
+    """Parsea las tarjetas de 'Mis Causas' y devuelve un DataFrame."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    exp_data = []
+    for t in soup.find_all(EXPEDIENTE_CARD):
+        n = t.find('p', class_='fontSizeEncabezadoCuij')
+        c = t.find('strong')
+        e = t.find('p', class_='badge')
+        fn, un, link = None, None, None
+
+        link_tag = t.find('a', class_='textColorEncabezado')
+        if link_tag and 'href' in link_tag.attrs:
+            link = link_tag['href']
+            if link.startswith('/'):
+                link = BASE_URL + link
+        # CAMBIO POSTERIOR (Link): el del número tiene prioridad sobre el href
+        link = create_expediente_link(n.text.strip() if n else "N/D") or link
+
+        # Juzgado y secretaría, si la tarjeta los muestra (se resuelven al sincronizar)
+        rad = next((x for x in t.find_all(string=RADICACION_RE) if x.parent is not c), None)
+        # CAMBIO POSTERIOR (radicación)
+        bloque = rad.parent if rad else None
+        while bloque is not None and bloque.name in INLINE and bloque.parent is not t:
+            bloque = bloque.parent
+
+        nov = t.find('p', class_='fontSizePie')
+        if nov:
+            parts = " ".join(nov.text.strip().split()).split('|', 1)
+            fn, un = (parts[0].strip(), parts[1].strip()) if len(parts) > 1 else (parts[0].strip(), "")
+
+        exp_data.append({
+            "Numero": n.text.strip() if n else "N/D",
+            "Caratula": c.text.strip() if c else "N/D",
+            "Estado": e.text.strip() if e else "N/D",
+            "Fecha Novedad": fn,
+            "Última Novedad": un,
+            "Link": link,
+            "Radicación": bloque.get_text(" ", strip=True) if bloque else None,
+        })
+    return pd.DataFrame(exp_data)
+
+
+def parse_actuacion_rows(html):
+    """Parsea las tarjetas de actuaciones de un expediente como filas de movimientos."""
+    soup = BeautifulSoup(html, 'html.parser')
+    rows = []
+    for card in soup.find_all(ACTUACION_CARD):
+        titulo = card.find('strong')
+        match = FECHA_RE.search(card.get_text(" "))
+        if titulo and match:
+            rows.append({
+                "fecha": datetime.strptime(match.group(0), "%d/%m/%Y").date(),
+                "descripcion": titulo.text.strip(),
+            })
+    return rows
+
+
+def parse_jurisprudencia_cards(html):
+    """Resultados de la búsqueda de jurisprudencia (antes dentro de Scraper.search_on_portal)."""
+    soup = BeautifulSoup(html, 'html.parser')
+
+    results = []
+    for card in soup.find_all(ACTUACION_CARD):
+        c_elem = card.find('strong')
+        n_elem = card.find('p', class_='fontSizeEncabezadoCuij')
+        c_text = c_elem.text.strip() if c_elem else "N/D"
+        n_text = n_elem.text.strip() if n_elem else None
+        link = create_expediente_link(n_text) if n_text else "#"
+        details = card.find('p', class_='actuacion-texto')
+        results.append({
+            "Resultado": c_text,
+            "Detalles": details.text.strip() if details else "",
+            "CUIJ": n_text,
+            "Enlace": link
+        })
+
+    return pd.DataFrame(results, columns=JURISPRUDENCIA_COLUMNS)
@@ -0,0 +1,225 @@
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+from utils import get_secret
+
+# Selenium y webdriver_manager se importan al crear el primer navegador,
+# para que abrir la app no cargue todo el stack de scraping
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 2
+# Segundos sin uso tras los cuales se cierra un navegador ocioso
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+# Cada cuántos segundos, como máximo, se buscan navegadores ociosos vencidos
+REAP_INTERVAL = 60
+
+
+@functools.lru_cache(maxsize=1)
+def chromedriver_path():
+    """Resuelve (y descarga si hace falta) el binario de chromedriver una sola vez por proceso."""
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    return ChromeDriverManager().install()
+
+
+def new_chrome_driver():
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    return webdriver.Chrome(service=Service(chromedriver_path()), options=options)
+
+
+class PooledDriver:
+    """Un navegador del pool más el estado de su sesión en el portal."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.logged_in = False
+        self.api = None  # PortalAPIClient autenticado con las cookies de este navegador
+        self.retired = False  # se cierra al devolverse al pool
+
+    def is_healthy(self):
+        from selenium.common.exceptions import WebDriverException
+
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def quit(self):
+        from selenium.common.exceptions import WebDriverException
+
+        if self.driver is None:
+            return
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+
+class DriverPool:
+    """Pool de navegadores headless compartido por todas las sesiones del proceso."""
+
+    def __init__(self, max_size=DEFAULT_POOL_SIZE, idle_timeout=DEFAULT_IDLE_TIMEOUT, factory=new_chrome_driver,
+                 reap_interval=None):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.factory = factory
+        # Sin uso durante idle_timeout, un navegador se cierra a más tardar un intervalo después
+        self.reap_interval = reap_interval or max(1, min(idle_timeout, REAP_INTERVAL))
+        self._idle = []
+        self._in_use = set()
+        self._cond = threading.Condition()
+        self._reaper = None
+        self._stopped = threading.Event()
+
+    def checkout(self, timeout=120, prefer_logged_in=True):
+        """Toma un navegador del pool, creando uno si hay lugar o esperando si está lleno.
+
+        Bajo el lock solo se elige y se reserva el navegador; revisar que responda,
+        crearlo o cerrarlo habla con WebDriver y se hace afuera, para que uno
+        colgado no frene a las demás sesiones.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            expired = []
+            try:
+                with self._cond:
+                    expired += self._evict_idle()
+                    while not self._idle and len(self._in_use) >= self.max_size:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise TimeoutError("No hay navegadores libres en el pool.")
+                        self._cond.wait(remaining)
+                        expired += self._evict_idle()
+                    if self._idle:
+                        pooled = min(self._idle, key=lambda p: (p.logged_in != prefer_logged_in, -p.last_used))
+                        self._idle.remove(pooled)
+                    else:
+                        pooled = PooledDriver(None)
+                    # El lugar queda reservado mientras se revisa o se crea el navegador
+                    self._in_use.add(pooled)
+            finally:
+                for old in expired:
+                    old.quit()
+
+            if pooled.driver is None:
+                try:
+                    pooled.driver = self.factory()
+                except Exception:
+                    self._release(pooled)
+                    raise
+                return pooled
+            if pooled.is_healthy():
+                return pooled
+            logger.info("Navegador del pool sin respuesta; se descarta.")
+            pooled.quit()
+            self._release(pooled)
+
+    def _release(self, pooled):
+        """Libera el lugar de un navegador reservado que no se llegó a usar."""
+        with self._cond:
+            self._in_use.discard(pooled)
+            self._cond.notify()
+
+    def checkin(self, pooled, discard=False):
+        """Devuelve un navegador al pool; si no responde (o `discard`) se cierra."""
+        keep = not (discard or pooled.retired) and pooled.driver is not None and pooled.is_healthy()
+        if not keep:
+            pooled.quit()
+        with self._cond:
+            self._in_use.discard(pooled)
+            if keep:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+                self._start_reaper()
+            expired = self._evict_idle()
+            self._cond.notify()
+        for old in expired:
+            old.quit()
+
+    @contextmanager
+    def lease(self, **kwargs):
+        pooled = self.checkout(**kwargs)
+        try:
+            yield pooled
+        finally:
+            self.checkin(pooled)
+
+    def _evict_idle(self):
+        """Saca del pool los navegadores ociosos vencidos y los devuelve (se cierran fuera del lock)."""
+        now = time.monotonic()
+        expired = [p for p in self._idle if now - p.last_used > self.idle_timeout]
+        for pooled in expired:
+            self._idle.remove(pooled)
+        return expired
+
+    def reap(self):
+        """Cierra los navegadores ociosos vencidos. Devuelve cuántos cerró."""
+        with self._cond:
+            expired = self._evict_idle()
+        for pooled in expired:
+            pooled.quit()
+        return len(expired)
+
+    def _start_reaper(self):
+        """Hilo que cierra los ociosos aunque nadie vuelva a pedir un navegador (se llama con el lock)."""
+        if self._reaper is None and not self._stopped.is_set():
+            self._reaper = threading.Thread(target=self._reap_loop, name="browser-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap_loop(self):
+        while not self._stopped.wait(self.reap_interval):
+            try:
+                self.reap()
+            except Exception:
+                logger.exception("Error al cerrar navegadores ociosos del pool.")
+
+    def authenticated_api(self):
+        """Cliente de la API de algún navegador con sesión iniciada, si lo hay."""
+        with self._cond:
+            for pooled in list(self._idle) + list(self._in_use):
+                if pooled.logged_in and pooled.api is not None:
+                    return pooled.api
+        return None
+
+    def has_logged_in(self):
+        with self._cond:
+            return any(p.logged_in for p in list(self._idle) + list(self._in_use))
+
+    def stats(self):
+        with self._cond:
+            return {"idle": len(self._idle), "in_use": len(self._in_use), "max_size": self.max_size}
+
+    def shutdown(self):
+        """Cierra los navegadores ociosos; los que están en uso se cierran al devolverse."""
+        self._stopped.set()
+        with self._cond:
+            idle, self._idle = self._idle, []
+            for pooled in self._in_use:
+                pooled.retired = True
+        for pooled in idle:
+            pooled.quit()
+
+
+@st.cache_resource
+def get_driver_pool():
+    """Pool único por proceso (compartido entre sesiones y reruns)."""
+    return DriverPool(
+        max_size=int(get_secret("BROWSER_POOL_SIZE", DEFAULT_POOL_SIZE)),
+        idle_timeout=int(get_secret("BROWSER_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT)),
+    )
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import defaultdict
+
+import pandas as pd
+import streamlit as st
+
+from database import get_db_manager
+from utils import ExpedienteIndex, caratula_labels
+
+# Tablas de las que depende cada consulta de DatabaseManager
+QUERY_TABLES = {
+    "get_expedientes": ("expedientes",),
+    "count_expedientes": ("expedientes",),
+    "get_juzgados": ("expedientes",),
+    "get_anios": ("expedientes",),
+    "get_demandados": ("expedientes",),
+    "get_dashboard_metrics": ("expedientes", "tareas"),
+    "get_novedades_recientes": ("expedientes",),
+    "get_tareas_pendientes": ("tareas", "expedientes"),
+    "get_tareas": ("tareas",),
+    "get_movimientos": ("movimientos",),
+    "get_notas": ("notas",),
+    "get_ultimas_notas": ("notas", "expedientes"),
+    "search": ("expedientes", "notas", "movimientos"),
+    "search_jurisprudencia": ("jurisprudencia",),
+}
+# Consultas de una sola tabla filtradas por `numeros`: se pueden parchear al insertar
+ITEM_QUERIES = {
+    "tareas": ("get_tareas", "fecha_vencimiento", True),
+    "movimientos": ("get_movimientos", "fecha", False),
+    "notas": ("get_notas", "fecha_creacion", False),
+}
+DEFAULT_TTL = 300  # por si otra instancia escribe en la misma base
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+class _Entry:
+    __slots__ = ("versions", "loaded_at", "value")
+
+    def __init__(self, versions, value):
+        self.versions = versions
+        self.loaded_at = time.monotonic()
+        self.value = value
+
+
+class CachedDatabase:
+    """Caché con versión por tabla alrededor de DatabaseManager.
+
+    Una consulta se vuelve a ejecutar solo si cambió la versión de alguna de
+    las tablas que lee. Las escrituras suben la versión de su tabla y, cuando
+    es posible, parchean (sobre una copia) los resultados cacheados de esa tabla.
+    Los DataFrames devueltos se comparten: no deben modificarse.
+    """
+
+    def __init__(self, manager, ttl=DEFAULT_TTL):
+        self.manager = manager
+        self.ttl = ttl
+        self.versions = defaultdict(int)
+        self._entries = {}
+        self._indexes = {}
+        self._labels = (None, {})
+        self._lock = threading.RLock()
+
+    def _current(self, method):
+        return tuple(self.versions[t] for t in QUERY_TABLES[method])
+
+    def query(self, method, **params):
+        key = (method, tuple(sorted((k, _freeze(v)) for k, v in params.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            current = self._current(method)
+            if entry and entry.versions == current and time.monotonic() - entry.loaded_at < self.ttl:
+                return entry.value
+        value = getattr(self.manager, method)(**params)
+        with self._lock:
+            # Si una escritura subió la versión mientras se leía, no se guarda un dato viejo
+            if self._current(method) == current:
+                self._entries[key] = _Entry(current, value)
+        return value
+
+    def expediente_index(self, numeros):
+        """ExpedienteIndex de `numeros`; se reconstruye solo si cambió alguna de sus consultas."""
+        numeros = tuple(numeros)
+        frames = tuple(self.query(m, numeros=numeros) for m in ("get_tareas", "get_movimientos", "get_notas"))
+        with self._lock:
+            cached = self._indexes.get(numeros)
+            # Consultas recalculadas o parcheadas devuelven objetos nuevos
+            if cached and all(a is b for a, b in zip(cached[0], frames)):
+                return cached[1]
+        index = ExpedienteIndex(*frames)
+        with self._lock:
+            self._indexes = {numeros: (frames, index)}  # solo el del último filtro
+        return index
+
+    def labels(self):
+        """numero -> carátula abreviada de todos los expedientes; se recalcula solo si cambió la tabla."""
+        frame = self.query("get_expedientes", columns=("numero", "caratula", "caratula_corta"))
+        with self._lock:
+            if self._labels[0] is frame:
+                return self._labels[1]
+        labels = caratula_labels(frame)
+        with self._lock:
+            self._labels = (frame, labels)
+        return labels
+
+    def bump(self, *tables):
+        """Invalida todo lo que dependa de `tables` (p. ej. al terminar una sincronización)."""
+        with self._lock:
+            for table in tables:
+                self.versions[table] += 1
+
+    def _patch(self, table, method, patch):
+        """Sube la versión de `table` y aplica `patch(params, df)` a las entradas de `method`.
+
+        Las entradas parcheadas quedan al día con la nueva versión; el resto de
+        las consultas que leen la tabla se recalculan en el próximo acceso.
+        """
+        with self._lock:
+            self.versions[table] += 1
+            for (name, params), entry in list(self._entries.items()):
+                if name != method:
+                    continue
+                patched = patch(dict(params), entry.value)
+                if patched is None:
+                    continue
+                entry.value = patched
+                entry.versions = self._current(method)
+
+    # ------------------------------------------------------------------
+    # Escrituras
+    # ------------------------------------------------------------------
+    def add_item(self, table, data):
+        item_id = self.manager.add_item(table, data)
+        method, sort_col, ascending = ITEM_QUERIES[table]
+
+        def patch(params, df):
+            if data.get("expediente_numero") not in params.get("numeros", ()):
+                return df
+            row = pd.DataFrame([{**data, "id": item_id}])
+            if sort_col in ("fecha", "fecha_vencimiento"):
+                row[sort_col] = pd.to_datetime(row[sort_col]).dt.date
+            else:
+                row[sort_col] = pd.to_datetime(row[sort_col])
+            row = row.reindex(columns=df.columns)
+            merged = pd.concat([df, row], ignore_index=True).infer_objects()
+            return merged.sort_values(sort_col, ascending=ascending, kind="stable", ignore_index=True)
+
+        self._patch(table, method, patch)
+        return item_id
+
+    def update_tarea_status(self, tarea_id, completada):
+        self.manager.update_tarea_status(tarea_id, completada)
+
+        def patch(params, df):
+            df = df.copy()  # otra sesión puede estar recorriendo el DataFrame cacheado
+            df.loc[df["id"] == tarea_id, "completada"] = bool(completada)
+            return df
+
+        self._patch("tareas", "get_tareas", patch)
+
+    def update_ficha_expediente(self, numero, fields):
+        self.manager.update_ficha_expediente(numero, fields)
+
+        def patch(params, df):
+            # Solo los listados completos o por números; los filtrados por texto/juzgado se recalculan
+            if params.get("caratula") or params.get("juzgado"):
+                return None
+            columns = [c for c in fields if c in df.columns]
+            if columns:
+                df = df.copy()
+                df.loc[df["numero"] == numero, columns] = [fields[c] for c in columns]
+            return df
+
+        self._patch("expedientes", "get_expedientes", patch)
+
+
+@st.cache_resource
+def get_data_cache():
+    """Caché único por proceso (compartido por todas las sesiones)."""
+    return CachedDatabase(get_db_manager())
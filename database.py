@@ -1,114 +1,366 @@
 import streamlit as st
 import sqlalchemy as db
 import pandas as pd
-from datetime import datetime
+import json
+from datetime import date, datetime, timedelta
+import functools
+import hashlib
+import random
+import re
+import time
+from migrations import JURISPRUDENCIA_FTS, SEARCH_TABLE, run_migrations
+from timing import PhaseTimer
+from utils import DERIVED_COLUMNS, JURISPRUDENCIA_COLUMNS, get_juzgados_directory, get_secret, parse_expedientes
 
 # ----------------------------------------------------------------------
 # Motor de base de datos (Turso primero, si falla usa SQLite local)
 # ----------------------------------------------------------------------
+# Pool de conexiones compartido por todas las sesiones del proceso;
+# cada valor se puede ajustar en secrets.toml (DB_POOL_SIZE, etc.)
+POOL_DEFAULTS = {
+    "DB_POOL_SIZE": 5,
+    "DB_MAX_OVERFLOW": 10,
+    "DB_POOL_TIMEOUT": 30,
+    # Turso corta las conexiones ociosas: se renuevan antes de que caduquen
+    "DB_POOL_RECYCLE": 1800,
+}
+# PRAGMAs de cada conexión a la base SQLite local
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",      # lectores y escritor no se bloquean entre sí
+    "synchronous": "NORMAL",    # seguro con WAL y mucho más rápido que FULL
+    "busy_timeout": 5000,       # ms de espera si otra conexión está escribiendo
+    "temp_store": "MEMORY",
+    "cache_size": -20000,       # ~20 MB por conexión
+}
+LOCAL_DB_FILE = "gestor_definitivo.db"
+
+
+def _pool_options():
+    opts = {name: int(get_secret(name, default)) for name, default in POOL_DEFAULTS.items()}
+    return {
+        "poolclass": db.pool.QueuePool,
+        "pool_size": opts["DB_POOL_SIZE"],
+        "max_overflow": opts["DB_MAX_OVERFLOW"],
+        "pool_timeout": opts["DB_POOL_TIMEOUT"],
+        "pool_recycle": opts["DB_POOL_RECYCLE"],
+        # Descarta conexiones muertas antes de entregarlas (sin esperar al error de la consulta)
+        "pool_pre_ping": True,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_conn, _record):
+    cursor = dbapi_conn.cursor()
+    for pragma, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {pragma}={value}")
+    cursor.close()
+
+
+def _remote_engine(conn_url):
+    # La URL de libsql no tiene archivo y SQLAlchemy la trataría como base en memoria
+    # (un SingletonThreadPool por hilo): se fuerza un QueuePool de verdad
+    return db.create_engine(conn_url, echo=False, **_pool_options())
+
+
 def get_engine():
+    """Motor de Turso si hay credenciales en secrets.toml; si no (o si falla), SQLite local.
+
+    Se llama dentro de un cache_resource: no usa st.* (ver `connection_type`).
+    """
     try:
-        url = st.secrets["TURSO_DATABASE_URL"]
-        token = st.secrets["TURSO_AUTH_TOKEN"]
+        url = get_secret("TURSO_DATABASE_URL")
+        token = get_secret("TURSO_AUTH_TOKEN")
+        if not url or not token:
+            raise KeyError("TURSO_DATABASE_URL / TURSO_AUTH_TOKEN")
 
         # Intentar con sqlalchemy-libsql
         try:
             conn_url = f"sqlite+libsql:///?authToken={token}&url={url}"
-            engine = db.create_engine(conn_url, echo=False)
-            st.session_state['db_connection_type'] = "☁️ Turso Cloud (libsql)"
-            return engine
+            return _remote_engine(conn_url)
         except Exception:
             # Fallback a libsql-experimental
             conn_url = f"libsql://{url}?authToken={token}"
-            engine = db.create_engine(conn_url, echo=False)
-            st.session_state['db_connection_type'] = "☁️ Turso Cloud (experimental)"
-            return engine
+            return _remote_engine(conn_url)
 
     except Exception:
         # Fallback final a SQLite local
-        DB_FILE = "gestor_definitivo.db"
-        engine = db.create_engine(f"sqlite:///{DB_FILE}")
-        st.session_state['db_connection_type'] = "💾 Local"
+        engine = db.create_engine(
+            f"sqlite:///{LOCAL_DB_FILE}",
+            connect_args={"check_same_thread": False, "timeout": SQLITE_PRAGMAS["busy_timeout"] / 1000},
+            **_pool_options(),
+        )
+        db.event.listen(engine, "connect", _set_sqlite_pragmas)
         return engine
 
 
+# Driver del motor -> tipo de conexión que se muestra en la app
+CONNECTION_TYPES = {
+    "sqlite+libsql": "☁️ Turso Cloud (libsql)",
+    "libsql": "☁️ Turso Cloud (experimental)",
+}
+
+
+def connection_type(engine):
+    return CONNECTION_TYPES.get(engine.url.drivername, "💾 Local")
+
+
+# ----------------------------------------------------------------------
+# Reintentos ante errores transitorios (solo sentencias idempotentes)
+# ----------------------------------------------------------------------
+DB_RETRIES = 3
+DB_RETRY_BASE_DELAY = 0.2  # segundos; se duplica en cada intento
+DB_RETRY_MAX_DELAY = 3.0
+# Mensajes de error que indican un problema pasajero y no un error de la consulta
+TRANSIENT_ERRORS = re.compile(
+    r"locked|busy|timed? ?out|connection|reset|broken pipe|closed|unavailable|stream|hrana|502|503|504",
+    re.IGNORECASE,
+)
+
+
+def is_transient(error):
+    """True si vale la pena reintentar: conexión caída, base ocupada o corte de red."""
+    if isinstance(error, db.exc.DBAPIError) and error.connection_invalidated:
+        return True
+    if isinstance(error, (db.exc.OperationalError, db.exc.InterfaceError, db.exc.TimeoutError)):
+        return bool(TRANSIENT_ERRORS.search(str(getattr(error, "orig", None) or error)))
+    return False
+
+
+def retry_transient(func):
+    """Reintenta el método con espera exponencial (y algo de azar) ante errores transitorios.
+
+    Solo para lecturas y escrituras idempotentes (upserts, UPDATE por clave):
+    repetir un INSERT simple podría duplicar filas.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for intento in range(DB_RETRIES + 1):
+            try:
+                return func(*args, **kwargs)
+            except (db.exc.DBAPIError, db.exc.TimeoutError) as e:
+                if intento == DB_RETRIES or not is_transient(e):
+                    raise
+                delay = min(DB_RETRY_BASE_DELAY * 2 ** intento, DB_RETRY_MAX_DELAY)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+    return wrapper
+
+
 # ----------------------------------------------------------------------
 # Inicialización de tablas
 # ----------------------------------------------------------------------
 def init_db(engine):
+    """Crea las tablas que falten y aplica las migraciones pendientes."""
     metadata = db.MetaData()
-    if not engine.dialect.has_table(engine.connect(), "expedientes"):
-        db.Table('expedientes', metadata,
-            db.Column('numero', db.String, primary_key=True),
-            db.Column('caratula', db.String),
-            db.Column('estado', db.String),
-            db.Column('juzgado_nombre', db.String),
-            db.Column('secretaria_nombre', db.String),
-            db.Column('medida_cautelar_status', db.String),
-            db.Column('observaciones', db.Text),
-            db.Column('ultima_novedad_portal', db.String),
-            db.Column('fecha_novedad_portal', db.String),
-            db.Column('link_portal', db.String)
-        )
-        db.Table('movimientos', metadata,
-            db.Column('id', db.Integer, primary_key=True, autoincrement=True),
-            db.Column('expediente_numero', db.String, db.ForeignKey('expedientes.numero')),
-            db.Column('fecha', db.Date, nullable=False),
-            db.Column('descripcion', db.String, nullable=False)
-        )
-        db.Table('tareas', metadata,
-            db.Column('id', db.Integer, primary_key=True, autoincrement=True),
-            db.Column('expediente_numero', db.String, db.ForeignKey('expedientes.numero')),
-            db.Column('descripcion', db.String, nullable=False),
-            db.Column('fecha_vencimiento', db.Date),
-            db.Column('prioridad', db.String),
-            db.Column('completada', db.Boolean, default=False)
-        )
-        db.Table('notas', metadata,
-            db.Column('id', db.Integer, primary_key=True, autoincrement=True),
-            db.Column('expediente_numero', db.String, db.ForeignKey('expedientes.numero')),
-            db.Column('contenido', db.Text, nullable=False),
-            db.Column('fecha_creacion', db.DateTime, default=datetime.now)
-        )
-        metadata.create_all(engine)
+    db.Table('expedientes', metadata,
+        db.Column('numero', db.String, primary_key=True),
+        db.Column('caratula', db.String),
+        db.Column('estado', db.String),
+        db.Column('juzgado_nombre', db.String),
+        db.Column('secretaria_nombre', db.String),
+        db.Column('medida_cautelar_status', db.String),
+        db.Column('observaciones', db.Text),
+        db.Column('ultima_novedad_portal', db.String),
+        db.Column('fecha_novedad_portal', db.String),
+        db.Column('link_portal', db.String)
+    )
+    db.Table('movimientos', metadata,
+        db.Column('id', db.Integer, primary_key=True, autoincrement=True),
+        db.Column('expediente_numero', db.String, db.ForeignKey('expedientes.numero')),
+        db.Column('fecha', db.Date, nullable=False),
+        db.Column('descripcion', db.String, nullable=False)
+    )
+    db.Table('tareas', metadata,
+        db.Column('id', db.Integer, primary_key=True, autoincrement=True),
+        db.Column('expediente_numero', db.String, db.ForeignKey('expedientes.numero')),
+        db.Column('descripcion', db.String, nullable=False),
+        db.Column('fecha_vencimiento', db.Date),
+        db.Column('prioridad', db.String),
+        db.Column('completada', db.Boolean, default=False)
+    )
+    db.Table('notas', metadata,
+        db.Column('id', db.Integer, primary_key=True, autoincrement=True),
+        db.Column('expediente_numero', db.String, db.ForeignKey('expedientes.numero')),
+        db.Column('contenido', db.Text, nullable=False),
+        db.Column('fecha_creacion', db.DateTime, default=datetime.now)
+    )
+    db.Table('configuracion', metadata,
+        db.Column('clave', db.String, primary_key=True),
+        db.Column('valor', db.Text)
+    )
+    # create_all no toca las tablas existentes; los cambios van en migrations.py
+    metadata.create_all(engine)
+    run_migrations(engine)
 
 
 # ----------------------------------------------------------------------
 # Gestor de base de datos
 # ----------------------------------------------------------------------
+# Columnas del DataFrame del scraper -> columnas de la tabla expedientes
+SYNC_COLUMNS = {
+    "Numero": "numero",
+    "Caratula": "caratula",
+    "Estado": "estado",
+    "Última Novedad": "ultima_novedad_portal",
+    "Fecha Novedad": "fecha_novedad_portal",
+    "Link": "link_portal",
+}
+# Columna del scraper con el texto del juzgado/secretaría (ver JuzgadosDirectory.resolve)
+RADICACION_COLUMN = "Radicación"
+# Columnas que se resuelven con el directorio; si el portal no las trae se conserva lo guardado
+RESOLVED_COLUMNS = ["juzgado_nombre", "secretaria_nombre"]
+SYNC_FIELDS = list(SYNC_COLUMNS.values()) + RESOLVED_COLUMNS
+# Filas por sentencia (queda holgado bajo el límite de parámetros de SQLite)
+SYNC_CHUNK_SIZE = 500
+# Columnas cuyo cambio se considera una novedad del portal
+NOVEDAD_COLUMNS = ["ultima_novedad_portal", "fecha_novedad_portal"]
+
+
+def _normalize_sync_frame(df):
+    """Renombra las columnas del scraper a las de la tabla, resuelve el juzgado y elimina duplicados.
+
+    Si el scraper no trajo el enlace se usa el del número, para no marcar cambios en cada sincronización.
+    """
+    radicacion = df[RADICACION_COLUMN] if RADICACION_COLUMN in df.columns else [None] * len(df)
+    resolved = get_juzgados_directory().resolve(radicacion).set_axis(df.index)
+    frame = df.rename(columns=SYNC_COLUMNS)[list(SYNC_COLUMNS.values())]
+    sin_link = frame["link_portal"].isna()
+    if sin_link.any():
+        links = parse_expedientes(frame.loc[sin_link, "numero"], frame.loc[sin_link, "caratula"])["link"]
+        frame = frame.assign(link_portal=frame["link_portal"].where(~sin_link, links.set_axis(frame.index[sin_link])))
+    return (
+        pd.concat([frame, resolved], axis=1)
+        .drop_duplicates(subset="numero", keep="last")
+        .astype(object)
+        .where(lambda d: d.notna(), None)
+        .reset_index(drop=True)
+    )
+
+
+def _with_derived_columns(df):
+    """Agrega las columnas derivadas del número y la carátula (ver utils.parse_expedientes)."""
+    derived = parse_expedientes(df["numero"], df["caratula"]).set_axis(df.index)
+    return (
+        df.assign(**{c: derived[c] for c in DERIVED_COLUMNS})
+        .astype(object)
+        .where(lambda d: d.notna(), None)
+    )
+
+
+# Columnas de la ficha que se pueden editar a mano desde la app
+FICHA_COLUMNS = {"juzgado_nombre", "secretaria_nombre", "medida_cautelar_status", "observaciones"}
+# Tablas que admiten altas desde los formularios de la app
+ITEM_TABLES = {"tareas", "notas", "movimientos"}
+# Valores de movimientos.origen (migración 8); NULL = anterior a la migración
+ORIGEN_PORTAL = "portal"
+ORIGEN_MANUAL = "manual"
+
+
+# Criterios de orden del listado de expedientes (usan los índices de la migración 6)
+EXPEDIENTES_ORDER = {
+    "numero": "numero",
+    "anio": "anio DESC, numero",
+    "demandado": "demandado, numero",
+}
+# Resultados por defecto de la búsqueda de texto completo
+SEARCH_LIMIT = 50
+# Vigencia de una búsqueda de jurisprudencia guardada (segundos)
+JURISPRUDENCIA_TTL = 24 * 60 * 60
+
+
+def _fts_query(texto):
+    """Convierte lo que escribe el usuario en una consulta FTS5 segura (todas las palabras, por prefijo)."""
+    palabras = re.findall(r"\w+", texto or "")
+    return " ".join(f'"{p}"*' for p in palabras) or None
+
+
 class DatabaseManager:
     def __init__(self, engine):
         self.engine = engine
+        self._tables = {}
+        self._search_index = None
+
+    def _table(self, name):
+        """Tabla reflejada (una sola vez) para insertar con los tipos correctos."""
+        if name not in self._tables:
+            self._tables[name] = db.Table(name, db.MetaData(), autoload_with=self.engine)
+        return self._tables[name]
+
+    def _load_sync_snapshot(self, conn, numeros):
+        """Lee el estado actual de los expedientes indicados, en bloques."""
+        stmt = db.text(
+            f"SELECT {', '.join(SYNC_FIELDS)} FROM expedientes WHERE numero IN :numeros"
+        ).bindparams(db.bindparam("numeros", expanding=True))
+        frames = [
+            pd.read_sql(stmt, conn, params={"numeros": numeros[i:i + SYNC_CHUNK_SIZE]})
+            for i in range(0, len(numeros), SYNC_CHUNK_SIZE)
+        ]
+        if not frames:
+            return pd.DataFrame(columns=SYNC_FIELDS)
+        return pd.concat(frames, ignore_index=True)
 
+    def _diff(self, conn, scraped):
+        """Compara columna a columna lo scrapeado contra la tabla (vectorizado).
+
+        Devuelve solo las filas nuevas o modificadas, con las columnas extra
+        '_cambio' ('nuevo' / 'actualizado') y '_novedad' (cambió la novedad del portal).
+        """
+        current = self._load_sync_snapshot(conn, scraped["numero"].tolist())
+        merged = scraped.merge(current, on="numero", how="left", suffixes=("", "_db"), indicator=True)
+        is_new = merged["_merge"] == "left_only"
+
+        data_cols = [c for c in SYNC_COLUMNS.values() if c != "numero"]
+        differs = pd.DataFrame({
+            c: merged[c].fillna("").astype(str) != merged[f"{c}_db"].fillna("").astype(str)
+            for c in data_cols
+        })
+        # Juzgado y secretaría: un valor vacío del portal no pisa lo guardado
+        for c in RESOLVED_COLUMNS:
+            differs[c] = merged[c].notna() & (merged[c].astype(str) != merged[f"{c}_db"].fillna("").astype(str))
+        changed = is_new | differs.any(axis=1)
+
+        result = merged.loc[changed, SYNC_FIELDS].copy()
+        result["_cambio"] = is_new[changed].map({True: "nuevo", False: "actualizado"})
+        result["_novedad"] = (is_new | differs[NOVEDAD_COLUMNS].any(axis=1))[changed]
+        return result
+
+    @retry_transient
     def sync_expedientes(self, df):
-        with self.engine.connect() as conn:
-            for _, row in df.iterrows():
-                stmt = db.text("SELECT * FROM expedientes WHERE numero = :numero")
-                if conn.execute(stmt, {"numero": row['Numero']}).fetchone():
-                    update_stmt = db.text("""
-                        UPDATE expedientes
-                        SET caratula=:c, estado=:e, ultima_novedad_portal=:un,
-                            fecha_novedad_portal=:fn, link_portal=:lp
-                        WHERE numero=:n
-                    """)
-                    conn.execute(update_stmt, {
-                        "c": row['Caratula'], "e": row['Estado'],
-                        "un": row['Última Novedad'], "fn": row['Fecha Novedad'],
-                        "lp": row['Link'], "n": row['Numero']
-                    })
-                else:
-                    insert_stmt = db.text("""
-                        INSERT INTO expedientes (numero, caratula, estado,
-                            ultima_novedad_portal, fecha_novedad_portal, link_portal)
-                        VALUES (:n, :c, :e, :un, :fn, :lp)
-                    """)
-                    conn.execute(insert_stmt, {
-                        "n": row['Numero'], "c": row['Caratula'],
-                        "e": row['Estado'], "un": row['Última Novedad'],
-                        "fn": row['Fecha Novedad'], "lp": row['Link']
-                    })
-            conn.commit()
+        """Upsert masivo de los expedientes que cambiaron, en una sola transacción.
 
+        Devuelve un dict con los conteos 'inserted', 'updated' y 'unchanged', más
+        'changed' (números escritos), 'nuevos' (los insertados) y 'novedades'
+        (números con novedad nueva).
+        """
+        result = {"inserted": 0, "updated": 0, "unchanged": 0, "changed": [], "nuevos": [], "novedades": []}
+        if df.empty:
+            return result
+
+        scraped = _normalize_sync_frame(df)
+        data_cols = [c for c in SYNC_FIELDS if c != "numero"] + DERIVED_COLUMNS
+        upsert_stmt = db.text(f"""
+            INSERT INTO expedientes (numero, {', '.join(data_cols)})
+            VALUES (:numero, {', '.join(':' + c for c in data_cols)})
+            ON CONFLICT(numero) DO UPDATE SET
+                {', '.join(
+                    f'{c}=COALESCE(excluded.{c}, expedientes.{c})' if c in RESOLVED_COLUMNS else f'{c}=excluded.{c}'
+                    for c in data_cols
+                )}
+        """)
+
+        with self.engine.begin() as conn:
+            changed = self._diff(conn, scraped)
+            rows = _with_derived_columns(changed[SYNC_FIELDS]).to_dict("records")
+            for start in range(0, len(rows), SYNC_CHUNK_SIZE):
+                conn.execute(upsert_stmt, rows[start:start + SYNC_CHUNK_SIZE])
+
+        result["inserted"] = int((changed["_cambio"] == "nuevo").sum())
+        result["updated"] = len(changed) - result["inserted"]
+        result["unchanged"] = len(scraped) - len(changed)
+        result["changed"] = changed["numero"].tolist()
+        result["nuevos"] = changed.loc[changed["_cambio"] == "nuevo", "numero"].tolist()
+        result["novedades"] = changed.loc[changed["_novedad"], "numero"].tolist()
+        return result
+
+    @retry_transient
     def get_all_data(self):
         with self.engine.connect() as conn:
             expedientes = pd.read_sql_table('expedientes', conn, coerce_float=False)
@@ -117,6 +369,433 @@ class DatabaseManager:
             movimientos = pd.read_sql_table('movimientos', conn, coerce_float=False)
         return expedientes, tareas, notas, movimientos
 
+    # ------------------------------------------------------------------
+    # Consultas puntuales: filtran en SQL y traen solo lo que cada vista usa
+    # ------------------------------------------------------------------
+    @retry_transient
+    def _read(self, sql, params=None, expanding=(), dates=(), datetimes=()):
+        """Ejecuta `sql` y devuelve un DataFrame; `dates` quedan como datetime.date."""
+        stmt = db.text(sql)
+        if expanding:
+            stmt = stmt.bindparams(*(db.bindparam(name, expanding=True) for name in expanding))
+        with self.engine.connect() as conn:
+            df = pd.read_sql(stmt, conn, params=params or {})
+        for col in dates:
+            df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce').dt.date
+        for col in datetimes:
+            df[col] = pd.to_datetime(df[col], format='ISO8601', errors='coerce')
+        return df
+
+    def _expedientes_filter(self, caratula=None, juzgado=None, numeros=None, anio=None, demandado=None):
+        where, params, expanding = [], {}, []
+        fts = _fts_query(caratula) if caratula and self.has_search_index() else None
+        if fts:
+            where.append(f"""numero IN (
+                SELECT expediente_numero FROM {SEARCH_TABLE}
+                WHERE {SEARCH_TABLE} MATCH :caratula AND tipo = 'expediente'
+            )""")
+            params["caratula"] = f"titulo : ({fts})"
+        elif caratula:
+            where.append("caratula LIKE :caratula")
+            params["caratula"] = f"%{caratula}%"
+        if juzgado:
+            where.append("juzgado_nombre = :juzgado")
+            params["juzgado"] = juzgado
+        if anio:
+            where.append("anio = :anio")
+            params["anio"] = int(anio)
+        if demandado:
+            where.append("demandado = :demandado")
+            params["demandado"] = demandado
+        if numeros is not None:
+            where.append("numero IN :numeros")
+            params["numeros"] = list(numeros)
+            expanding.append("numeros")
+        return (" WHERE " + " AND ".join(where) if where else ""), params, expanding
+
+    def get_expedientes(self, columns=None, caratula=None, juzgado=None, numeros=None, limit=None, offset=0,
+                        anio=None, demandado=None, orden="numero"):
+        """Expedientes filtrados por texto en carátula, juzgado, año, demandado y/o lista de números.
+
+        `orden` es una clave de EXPEDIENTES_ORDER; con `limit` se devuelve solo esa página.
+        """
+        cols = ", ".join(columns) if columns else "*"
+        where, params, expanding = self._expedientes_filter(caratula, juzgado, numeros, anio, demandado)
+        sql = f"SELECT {cols} FROM expedientes{where} ORDER BY {EXPEDIENTES_ORDER[orden]}"
+        if limit is not None:
+            sql += " LIMIT :limit OFFSET :offset"
+            params.update(limit=limit, offset=offset)
+        return self._read(sql, params, expanding)
+
+    def find_expediente_by_numero(self, numero):
+        """Expediente con ese número (búsqueda exacta por clave; si no, el número contenido en otro texto)."""
+        df = self._read("SELECT * FROM expedientes WHERE numero = :n", {"n": numero})
+        if df.empty:
+            df = self._read("SELECT * FROM expedientes WHERE numero LIKE :like LIMIT 1", {"like": f"%{numero}%"})
+        return df
+
+    @retry_transient
+    def count_expedientes(self, caratula=None, juzgado=None, anio=None, demandado=None):
+        """Cantidad de expedientes que cumplen los filtros (para paginar)."""
+        where, params, _ = self._expedientes_filter(caratula, juzgado, anio=anio, demandado=demandado)
+        with self.engine.connect() as conn:
+            return conn.execute(db.text(f"SELECT COUNT(*) FROM expedientes{where}"), params).scalar()
+
+    # ------------------------------------------------------------------
+    # Búsqueda de texto completo (FTS5, ver migrations.py)
+    # ------------------------------------------------------------------
+    @retry_transient
+    def has_search_index(self):
+        """True si la base tiene el índice FTS5 (si no, la búsqueda usa LIKE)."""
+        if self._search_index is None:
+            with self.engine.connect() as conn:
+                self._search_index = conn.execute(
+                    db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": SEARCH_TABLE},
+                ).first() is not None
+        return self._search_index
+
+    def search(self, texto, tipos=None, limit=SEARCH_LIMIT):
+        """Busca en carátulas, observaciones, notas y movimientos.
+
+        Ignora acentos y mayúsculas, y busca cada palabra por prefijo. Devuelve
+        tipo ('expediente', 'nota' o 'movimiento'), ref (número del expediente o id de la nota/movimiento),
+        expediente_numero, caratula y fragmento (con las coincidencias en **negrita**),
+        de la coincidencia más relevante a la menos relevante.
+        """
+        fts = _fts_query(texto)
+        if not fts:
+            return pd.DataFrame(columns=["tipo", "ref", "expediente_numero", "caratula", "fragmento"])
+        params, expanding = {"limit": limit}, []
+        tipo_filter = ""
+        if tipos:
+            tipo_filter = " AND tipo IN :tipos"
+            params["tipos"] = list(tipos)
+            expanding.append("tipos")
+
+        if self.has_search_index():
+            params["q"] = fts
+            sql = f"""
+                SELECT b.tipo, b.ref, b.expediente_numero, e.caratula, b.fragmento
+                FROM (
+                    SELECT tipo, ref, expediente_numero,
+                           snippet({SEARCH_TABLE}, -1, '**', '**', '…', 12) AS fragmento,
+                           bm25({SEARCH_TABLE}) AS relevancia
+                    FROM {SEARCH_TABLE}
+                    WHERE {SEARCH_TABLE} MATCH :q{tipo_filter}
+                    ORDER BY relevancia LIMIT :limit
+                ) b LEFT JOIN expedientes e ON e.numero = b.expediente_numero
+                ORDER BY b.relevancia
+            """
+        else:
+            params["q"] = f"%{texto.strip()}%"
+            sql = f"""
+                SELECT * FROM (
+                    SELECT 'expediente' AS tipo, numero AS ref, numero AS expediente_numero, caratula,
+                           COALESCE(observaciones, caratula) AS fragmento
+                    FROM expedientes WHERE caratula LIKE :q OR observaciones LIKE :q
+                    UNION ALL
+                    SELECT 'nota', n.id, n.expediente_numero, e.caratula, n.contenido
+                    FROM notas n LEFT JOIN expedientes e ON e.numero = n.expediente_numero
+                    WHERE n.contenido LIKE :q
+                    UNION ALL
+                    SELECT 'movimiento', m.id, m.expediente_numero, e.caratula, m.descripcion
+                    FROM movimientos m LEFT JOIN expedientes e ON e.numero = m.expediente_numero
+                    WHERE m.descripcion LIKE :q
+                ) WHERE 1 = 1{tipo_filter} LIMIT :limit
+            """
+        return self._read(sql, params, expanding)
+
+    # ------------------------------------------------------------------
+    # Caché local de jurisprudencia del portal
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _jurisprudencia_clave(row):
+        """El CUIJ identifica el resultado; si la tarjeta no lo trae se usa un hash del texto."""
+        if row.get("CUIJ"):
+            return row["CUIJ"]
+        texto = f"{row.get('Resultado', '')}\n{row.get('Detalles', '')}"
+        return "h:" + hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+    def get_cached_jurisprudencia(self, consulta, max_age=JURISPRUDENCIA_TTL):
+        """Resultados guardados de `consulta` (ya normalizada), o None si no hay o vencieron."""
+        guardada = self._read(
+            "SELECT claves, consultada_en FROM jurisprudencia_busquedas WHERE consulta = :c", {"c": consulta}
+        )
+        if guardada.empty:
+            return None
+        row = guardada.iloc[0]
+        if datetime.now() - datetime.fromisoformat(row.consultada_en) > timedelta(seconds=max_age):
+            return None
+        claves = json.loads(row.claves)
+        if not claves:
+            return pd.DataFrame(columns=JURISPRUDENCIA_COLUMNS)
+        df = self._read(
+            """SELECT clave, resultado AS "Resultado", detalles AS "Detalles", cuij AS "CUIJ", enlace AS "Enlace"
+               FROM jurisprudencia WHERE clave IN :claves""",
+            {"claves": claves}, ["claves"],
+        )
+        # Mismo orden que devolvió el portal
+        orden = {clave: i for i, clave in enumerate(claves)}
+        df = df.sort_values("clave", key=lambda c: c.map(orden), ignore_index=True)
+        return df[JURISPRUDENCIA_COLUMNS]
+
+    @retry_transient
+    def save_jurisprudencia(self, consulta, df):
+        """Guarda los resultados de `consulta` (deduplicados por CUIJ) y los devuelve deduplicados."""
+        df = df.reindex(columns=JURISPRUDENCIA_COLUMNS).astype(object).where(lambda d: d.notna(), None)
+        claves = [self._jurisprudencia_clave(row) for row in df.to_dict("records")]
+        df = df.assign(clave=claves).drop_duplicates("clave", keep="first")
+        ahora = datetime.now().isoformat(timespec="seconds")
+        rows = [
+            {"clave": r["clave"], "cuij": r["CUIJ"], "resultado": r["Resultado"],
+             "detalles": r["Detalles"], "enlace": r["Enlace"], "ahora": ahora}
+            for r in df.to_dict("records")
+        ]
+        with self.engine.begin() as conn:
+            if rows:
+                conn.execute(db.text("""
+                    INSERT INTO jurisprudencia (clave, cuij, resultado, detalles, enlace, actualizado_en)
+                    VALUES (:clave, :cuij, :resultado, :detalles, :enlace, :ahora)
+                    ON CONFLICT(clave) DO UPDATE SET
+                        cuij = excluded.cuij, resultado = excluded.resultado, detalles = excluded.detalles,
+                        enlace = excluded.enlace, actualizado_en = excluded.actualizado_en
+                """), rows)
+            conn.execute(db.text("""
+                INSERT INTO jurisprudencia_busquedas (consulta, claves, consultada_en) VALUES (:c, :k, :t)
+                ON CONFLICT(consulta) DO UPDATE SET claves = excluded.claves, consultada_en = excluded.consultada_en
+            """), {"c": consulta, "k": json.dumps(df["clave"].tolist()), "t": ahora})
+        return df[JURISPRUDENCIA_COLUMNS].reset_index(drop=True)
+
+    def search_jurisprudencia(self, texto, limit=SEARCH_LIMIT):
+        """Busca sin conexión en toda la jurisprudencia guardada (con fragmento resaltado)."""
+        fts = _fts_query(texto)
+        if not fts:
+            return pd.DataFrame(columns=JURISPRUDENCIA_COLUMNS + ["fragmento"])
+        if self.has_search_index():
+            sql = f"""
+                SELECT j.resultado AS "Resultado", j.detalles AS "Detalles", j.cuij AS "CUIJ", j.enlace AS "Enlace",
+                       snippet({JURISPRUDENCIA_FTS}, -1, '**', '**', '…', 16) AS fragmento
+                FROM {JURISPRUDENCIA_FTS} JOIN jurisprudencia j ON j.rowid = {JURISPRUDENCIA_FTS}.rowid
+                WHERE {JURISPRUDENCIA_FTS} MATCH :q
+                ORDER BY bm25({JURISPRUDENCIA_FTS}) LIMIT :limit
+            """
+            params = {"q": fts, "limit": limit}
+        else:
+            sql = """
+                SELECT resultado AS "Resultado", detalles AS "Detalles", cuij AS "CUIJ", enlace AS "Enlace",
+                       detalles AS fragmento
+                FROM jurisprudencia WHERE resultado LIKE :q OR detalles LIKE :q
+                ORDER BY actualizado_en DESC LIMIT :limit
+            """
+            params = {"q": f"%{texto.strip()}%", "limit": limit}
+        return self._read(sql, params)
+
+    def get_juzgados(self):
+        """Juzgados distintos cargados en los expedientes."""
+        df = self._read("""
+            SELECT DISTINCT juzgado_nombre FROM expedientes
+            WHERE juzgado_nombre IS NOT NULL AND juzgado_nombre != ''
+            ORDER BY juzgado_nombre
+        """)
+        return df['juzgado_nombre'].tolist()
+
+    def get_anios(self):
+        """Años distintos de los expedientes, del más reciente al más antiguo."""
+        df = self._read("SELECT DISTINCT anio FROM expedientes WHERE anio IS NOT NULL ORDER BY anio DESC")
+        return df['anio'].astype(int).tolist()
+
+    def get_demandados(self):
+        """Demandados distintos de los expedientes."""
+        df = self._read("""
+            SELECT DISTINCT demandado FROM expedientes
+            WHERE demandado IS NOT NULL AND demandado != ''
+            ORDER BY demandado
+        """)
+        return df['demandado'].tolist()
+
+    def get_dashboard_metrics(self, hoy, dias=7):
+        """Conteos del panel de control en una sola consulta."""
+        row = self._read("""
+            SELECT
+                (SELECT COUNT(*) FROM expedientes) AS expedientes,
+                COUNT(*) AS pendientes,
+                COALESCE(SUM(fecha_vencimiento >= :hoy AND fecha_vencimiento <= :limite), 0) AS proximas,
+                COALESCE(SUM(fecha_vencimiento < :hoy), 0) AS vencidas
+            FROM tareas WHERE completada = 0
+        """, {"hoy": hoy.isoformat(), "limite": (hoy + timedelta(days=dias)).isoformat()}).iloc[0]
+        return {k: int(v) for k, v in row.items()}
+
+    def get_novedades_recientes(self, limit=5):
+        """Expedientes con la novedad del portal más reciente (fecha guardada como dd/mm/aaaa)."""
+        return self._read("""
+            SELECT numero, caratula, caratula_corta, link_portal, ultima_novedad_portal, fecha_novedad_portal
+            FROM expedientes
+            WHERE fecha_novedad_portal IS NOT NULL
+            ORDER BY substr(fecha_novedad_portal, 7, 4) || substr(fecha_novedad_portal, 4, 2)
+                     || substr(fecha_novedad_portal, 1, 2) DESC
+            LIMIT :limit
+        """, {"limit": limit})
+
+    def get_tareas_pendientes(self, hasta=None, prioridad=None):
+        """Tareas no completadas que vencen hasta `hasta` (más las sin fecha), con la carátula del expediente."""
+        sql = """
+            SELECT t.id, t.expediente_numero, t.descripcion, t.fecha_vencimiento,
+                   t.prioridad, e.caratula, e.caratula_corta
+            FROM tareas t LEFT JOIN expedientes e ON e.numero = t.expediente_numero
+            WHERE t.completada = 0
+        """
+        params = {}
+        if hasta is not None:
+            sql += " AND (t.fecha_vencimiento IS NULL OR t.fecha_vencimiento <= :hasta)"
+            params["hasta"] = hasta.isoformat()
+        if prioridad:
+            sql += " AND t.prioridad = :prioridad"
+            params["prioridad"] = prioridad
+        return self._read(sql + " ORDER BY t.fecha_vencimiento", params, dates=["fecha_vencimiento"])
+
+    def get_tareas(self, numeros):
+        """Todas las tareas de los expedientes indicados."""
+        return self._read(
+            "SELECT * FROM tareas WHERE expediente_numero IN :numeros ORDER BY fecha_vencimiento",
+            {"numeros": list(numeros)}, ["numeros"], dates=["fecha_vencimiento"],
+        ).astype({"completada": bool})
+
+    def get_movimientos(self, numeros):
+        """Movimientos de los expedientes indicados, del más nuevo al más viejo."""
+        return self._read(
+            "SELECT * FROM movimientos WHERE expediente_numero IN :numeros ORDER BY fecha DESC",
+            {"numeros": list(numeros)}, ["numeros"], dates=["fecha"],
+        )
+
+    def get_notas(self, numeros):
+        """Notas de los expedientes indicados, de la más nueva a la más vieja."""
+        return self._read(
+            "SELECT * FROM notas WHERE expediente_numero IN :numeros ORDER BY fecha_creacion DESC",
+            {"numeros": list(numeros)}, ["numeros"], datetimes=["fecha_creacion"],
+        )
+
+    def get_ultimas_notas(self, limit=None, expediente_numero=None):
+        """Últimas notas (todas o de un expediente) con la carátula del expediente."""
+        sql = """
+            SELECT n.id, n.expediente_numero, n.contenido, n.fecha_creacion,
+                   COALESCE(e.caratula, n.expediente_numero) AS caratula
+            FROM notas n LEFT JOIN expedientes e ON e.numero = n.expediente_numero
+        """
+        params = {}
+        if expediente_numero is not None:
+            sql += " WHERE n.expediente_numero = :numero"
+            params["numero"] = expediente_numero
+        sql += " ORDER BY n.fecha_creacion DESC"
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        return self._read(sql, params, datetimes=["fecha_creacion"])
+
+    @retry_transient
+    def get_latest_movimientos(self):
+        """Por expediente: (fecha más reciente, descripciones de esa fecha) ya traídas del portal.
+
+        Solo cuentan los movimientos del portal: uno manual más nuevo no debe
+        cortar la búsqueda de actuaciones que todavía no se trajeron.
+        """
+        query = db.text("""
+            SELECT m.expediente_numero, m.fecha, m.descripcion
+            FROM movimientos m
+            JOIN (SELECT expediente_numero, MAX(fecha) AS fecha
+                  FROM movimientos WHERE origen = :portal GROUP BY expediente_numero) u
+              ON m.expediente_numero = u.expediente_numero AND m.fecha = u.fecha
+            WHERE m.origen = :portal
+        """)
+        latest = {}
+        with self.engine.connect() as conn:
+            for numero, fecha, descripcion in conn.execute(query, {"portal": ORIGEN_PORTAL}):
+                fecha = date.fromisoformat(str(fecha)[:10])
+                latest.setdefault(numero, (fecha, set()))[1].add(descripcion)
+        return latest
+
+    @retry_transient
+    def get_harvest_targets(self, numeros=()):
+        """Expedientes a los que hay que buscarles movimientos: los indicados y los que nunca se revisaron."""
+        query = db.text("""
+            SELECT numero, link_portal FROM expedientes
+            WHERE numero IN :numeros OR movimientos_revisados_en IS NULL
+        """).bindparams(db.bindparam("numeros", expanding=True))
+        with self.engine.connect() as conn:
+            return [tuple(r) for r in conn.execute(query, {"numeros": list(numeros)})]
+
+    def add_movimientos_bulk(self, rows, revisados=()):
+        """Guarda movimientos traídos del portal en una sola transacción (executemany).
+
+        Los que ya están guardados sin origen (anteriores a la migración 8) se
+        marcan como del portal en lugar de duplicarse; los repetidos no se insertan.
+        Los expedientes de `revisados` (consultados sin error, tengan o no
+        actuaciones) se marcan para no volver a pedirlos en cada sincronización.
+        Devuelve la cantidad de movimientos nuevos.
+        """
+        rows = [{**r, "fecha": r["fecha"].isoformat(), "origen": ORIGEN_PORTAL} for r in rows]
+        same = "expediente_numero = :expediente_numero AND fecha = :fecha AND descripcion = :descripcion"
+        claim = db.text(f"UPDATE movimientos SET origen = :origen WHERE origen IS NULL AND {same}")
+        insert = db.text(f"""
+            INSERT INTO movimientos (expediente_numero, fecha, descripcion, origen)
+            SELECT :expediente_numero, :fecha, :descripcion, :origen
+            WHERE NOT EXISTS (SELECT 1 FROM movimientos WHERE {same})
+        """)
+        revisados = [{"numero": n, "ahora": datetime.now().isoformat(timespec="seconds")} for n in revisados]
+        inserted = 0
+        with self.engine.begin() as conn:
+            for start in range(0, len(rows), SYNC_CHUNK_SIZE):
+                chunk = rows[start:start + SYNC_CHUNK_SIZE]
+                conn.execute(claim, chunk)
+                inserted += max(conn.execute(insert, chunk).rowcount, 0)
+            if revisados:
+                conn.execute(
+                    db.text("UPDATE expedientes SET movimientos_revisados_en = :ahora WHERE numero = :numero"),
+                    revisados,
+                )
+        return inserted
+
+    @retry_transient
+    def get_setting(self, clave, default=None):
+        """Valor guardado en la tabla configuracion (JSON), o `default`."""
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                db.text("SELECT valor FROM configuracion WHERE clave = :c"), {"c": clave}
+            ).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else default
+
+    @retry_transient
+    def set_setting(self, clave, valor):
+        with self.engine.begin() as conn:
+            conn.execute(db.text("""
+                INSERT INTO configuracion (clave, valor) VALUES (:c, :v)
+                ON CONFLICT(clave) DO UPDATE SET valor = excluded.valor
+            """), {"c": clave, "v": json.dumps(valor)})
+
+    def add_item(self, table, data):
+        """Inserta una tarea, nota o movimiento y devuelve su id."""
+        if table not in ITEM_TABLES:
+            raise ValueError(f"Tabla no admitida: {table}")
+        if table == "movimientos":
+            data = {"origen": ORIGEN_MANUAL, **data}
+        with self.engine.begin() as conn:
+            result = conn.execute(self._table(table).insert().values(**data))
+            return result.inserted_primary_key[0]
+
+    @retry_transient
+    def update_ficha_expediente(self, numero, fields):
+        """Actualiza los datos de la ficha técnica cargados a mano."""
+        fields = {k: v for k, v in fields.items() if k in FICHA_COLUMNS}
+        if not fields:
+            return
+        assignments = ", ".join(f"{k}=:{k}" for k in fields)
+        with self.engine.begin() as conn:
+            conn.execute(
+                db.text(f"UPDATE expedientes SET {assignments} WHERE numero=:numero"),
+                {**fields, "numero": numero},
+            )
+
+    @retry_transient
     def update_tarea_status(self, tarea_id, completada):
         with self.engine.connect() as conn:
             stmt = db.text("UPDATE tareas SET completada=:c WHERE id=:i")
@@ -125,8 +804,21 @@ class DatabaseManager:
 
 
 # ----------------------------------------------------------------------
-# Instancia global de db_manager
+# Instancia única por proceso (se crea al primer uso, no al importar)
 # ----------------------------------------------------------------------
-_engine = get_engine()
-init_db(_engine)
-db_manager = DatabaseManager(_engine)
+@st.cache_resource(show_spinner=False)
+def get_db_manager():
+    """Motor, esquema y DatabaseManager compartidos por todas las sesiones del proceso."""
+    timer = PhaseTimer("inicio base de datos")
+    with timer.phase("motor"):
+        engine = get_engine()
+    with timer.phase("esquema y migraciones"):
+        init_db(engine)
+    return DatabaseManager(engine)
+
+
+def __getattr__(name):
+    # Compatibilidad: `from database import db_manager` sigue funcionando, sin conectar al importar
+    if name == "db_manager":
+        return get_db_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,109 @@
+import json
+import logging
+import os
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------------------------
+# Motor de vencimientos: días corridos y días hábiles judiciales que faltan
+# para cada tarea, calculados de una sola vez sobre toda la columna de fechas.
+# Los días inhábiles (feriados y ferias) salen de data/feriados_judiciales.json.
+# ----------------------------------------------------------------------
+
+FERIADOS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "feriados_judiciales.json")
+# Lunes a viernes
+WEEKMASK = "1111100"
+# Hasta cuántos días hábiles un vencimiento se considera próximo
+DIAS_PROXIMOS = 3
+
+# Grupo -> (título, color del borde), en el orden en que se muestran
+BUCKETS = {
+    "vencida": ("❌ Vencidas", "red"),
+    "hoy": ("⚠️ Vencen hoy", "orange"),
+    "proxima": (f"🔥 Vencen en {DIAS_PROXIMOS} días hábiles o menos", "orange"),
+    "posterior": ("📅 Más adelante", "blue"),
+    "sin_fecha": ("❔ Sin fecha de vencimiento", "gray"),
+}
+
+
+@lru_cache(maxsize=None)
+def _load_feriados(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+@lru_cache(maxsize=None)
+def load_calendario(path=FERIADOS_FILE):
+    """Calendario de días hábiles judiciales (feriados sueltos más los rangos de feria)."""
+    data = _load_feriados(path)
+    dias = [np.datetime64(d, "D") for d in data.get("feriados", [])]
+    for feria in data.get("ferias", []):
+        desde = np.datetime64(feria["desde"], "D")
+        hasta = np.datetime64(feria["hasta"], "D")
+        dias.extend(np.arange(desde, hasta + 1, dtype="datetime64[D]"))
+    return np.busdaycalendar(weekmask=WEEKMASK, holidays=np.array(dias, dtype="datetime64[D]"))
+
+
+@lru_cache(maxsize=None)
+def anios_cubiertos(path=FERIADOS_FILE):
+    """(primer año, último año) que cubre el archivo de feriados, o None si está vacío.
+
+    Fuera de ese rango los días hábiles solo descuentan fines de semana.
+    """
+    data = _load_feriados(path)
+    fechas = data.get("feriados", []) + [f[k] for f in data.get("ferias", []) for k in ("desde", "hasta")]
+    anios = [int(str(d)[:4]) for d in fechas]
+    return (min(anios), max(anios)) if anios else None
+
+
+def compute_deadlines(tareas_df, hoy=None, calendario=None, cobertura=None):
+    """Agrega a las tareas los días que faltan y el grupo de vencimiento.
+
+    Columnas nuevas: 'dias_corridos', 'dias_habiles' (enteros, vacíos si la tarea no
+    tiene fecha), 'bucket' (una clave de BUCKETS) y 'fuera_de_calendario' (el plazo
+    pasa por años sin feriados cargados, ver `anios_cubiertos`). Todo se calcula vectorizado.
+    """
+    hoy = np.datetime64(hoy or date.today(), "D")
+    if calendario is None:
+        calendario = load_calendario()
+    if cobertura is None:
+        cobertura = anios_cubiertos()
+    fechas = pd.to_datetime(tareas_df["fecha_vencimiento"], errors="coerce").to_numpy(dtype="datetime64[D]")
+    con_fecha = ~np.isnat(fechas)
+    # np.busday_count no acepta NaT: las filas sin fecha se calculan contra hoy y se descartan
+    validas = np.where(con_fecha, fechas, hoy)
+
+    corridos = (validas - hoy).astype(int)
+    habiles = np.busday_count(hoy + 1, validas + 1, busdaycal=calendario)
+    bucket = np.select(
+        [~con_fecha, corridos < 0, corridos == 0, habiles <= DIAS_PROXIMOS],
+        ["sin_fecha", "vencida", "hoy", "proxima"],
+        default="posterior",
+    )
+    # El plazo va de hoy a la fecha (o al revés si ya venció): los dos extremos deben estar cubiertos
+    anios = validas.astype("datetime64[Y]").astype(int) + 1970
+    anio_hoy = hoy.astype("datetime64[Y]").astype(int) + 1970
+    if cobertura is None:
+        fuera = con_fecha
+    else:
+        primero, ultimo = cobertura
+        fuera = con_fecha & ((np.minimum(anios, anio_hoy) < primero) | (np.maximum(anios, anio_hoy) > ultimo))
+    if fuera.any():
+        logger.warning(
+            "%d vencimientos caen fuera de los años de %s (%s): sus días hábiles no descuentan feriados ni ferias.",
+            int(fuera.sum()), os.path.basename(FERIADOS_FILE), "-".join(map(str, cobertura or ())) or "vacío",
+        )
+    return tareas_df.assign(
+        dias_corridos=pd.Series(corridos, index=tareas_df.index, dtype="Int64").where(con_fecha),
+        dias_habiles=pd.Series(habiles, index=tareas_df.index, dtype="Int64").where(con_fecha),
+        bucket=pd.Categorical(bucket, categories=list(BUCKETS), ordered=True),
+        fuera_de_calendario=pd.Series(fuera, index=tareas_df.index),
+    )
@@ -0,0 +1,205 @@
+import html
+import io
+import os
+import re
+import zipfile
+
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# Exportación masiva de legajos (un archivo PDF o DOCX por expediente).
+# Los datos se arman una sola vez en el proceso de la app como diccionarios
+# simples y cada legajo se renderiza en un proceso aparte; el resultado se
+# empaqueta en un ZIP. Todo es local: no se descarga nada para renderizar.
+# ----------------------------------------------------------------------
+
+# Formato -> extensión
+DOSSIER_FORMATS = {"PDF": "pdf", "DOCX": "docx"}
+# Con pocos legajos no conviene pagar el arranque de los procesos
+MIN_PARALLEL = 4
+
+
+def escape(texto):
+    """Escapa el texto para los Paragraph de reportlab (marcado tipo XML)."""
+    return html.escape(texto, quote=False)
+
+
+def _texto(value, default=""):
+    return default if value is None or (not isinstance(value, str) and pd.isna(value)) else str(value)
+
+
+def _fechas(series, formato="%d/%m/%Y"):
+    return pd.to_datetime(series, errors="coerce").dt.strftime(formato).fillna("")
+
+
+def build_dossiers(expedientes_df, tareas_df, movimientos_df, notas_df, numeros, directorio):
+    """Arma los datos de cada legajo agrupando cada DataFrame una sola vez.
+
+    `directorio` es el JuzgadosDirectory de utils (datos del juzgado y del secretario).
+    """
+    expedientes = expedientes_df.drop_duplicates("numero").set_index("numero")
+    tareas = tareas_df.assign(vence=_fechas(tareas_df["fecha_vencimiento"])) if not tareas_df.empty else tareas_df
+    movimientos = movimientos_df.sort_values("fecha", ascending=False, kind="stable") if not movimientos_df.empty else movimientos_df
+    movimientos = movimientos.assign(fecha_txt=_fechas(movimientos["fecha"])) if not movimientos.empty else movimientos
+    notas = notas_df.sort_values("fecha_creacion", ascending=False, kind="stable") if not notas_df.empty else notas_df
+    notas = notas.assign(fecha_txt=_fechas(notas["fecha_creacion"], "%d/%m/%Y %H:%M")) if not notas.empty else notas
+
+    def por_expediente(df):
+        return df.groupby("expediente_numero", sort=False).indices if not df.empty else {}
+
+    tareas_idx, movs_idx, notas_idx = por_expediente(tareas), por_expediente(movimientos), por_expediente(notas)
+
+    def filas(df, index, numero, columnas):
+        positions = index.get(numero)
+        if positions is None:
+            return []
+        grupo = df.iloc[positions]
+        return list(zip(*(grupo[c].map(_texto) for c in columnas)))
+
+    dossiers = []
+    for numero in numeros:
+        if numero not in expedientes.index:
+            continue
+        exp = expedientes.loc[numero]
+        juzgado_nombre = _texto(exp.get("juzgado_nombre"))
+        secretaria_nombre = _texto(exp.get("secretaria_nombre"))
+        dossiers.append({
+            "numero": numero,
+            "caratula": _texto(exp.get("caratula")),
+            "estado": _texto(exp.get("estado")),
+            "juzgado": juzgado_nombre,
+            "secretaria": secretaria_nombre,
+            "cautelar": _texto(exp.get("medida_cautelar_status")),
+            "observaciones": _texto(exp.get("observaciones")),
+            "juzgado_info": directorio.info(juzgado_nombre, secretaria_nombre),
+            "tareas": [
+                (d, v, p, "Completada" if c == "True" else "Pendiente")
+                for d, v, p, c in filas(tareas, tareas_idx, numero, ["descripcion", "vence", "prioridad", "completada"])
+            ],
+            "movimientos": filas(movimientos, movs_idx, numero, ["fecha_txt", "descripcion"]),
+            "notas": filas(notas, notas_idx, numero, ["fecha_txt", "contenido"]),
+        })
+    return dossiers
+
+
+def _ficha(dossier):
+    """Pares (etiqueta, valor) del encabezado del legajo, sin los vacíos."""
+    info = dossier["juzgado_info"]
+    pares = [
+        ("Número", dossier["numero"]),
+        ("Estado", dossier["estado"]),
+        ("Juzgado", dossier["juzgado"] or "No especificado"),
+        ("Juez/a", info.get("juez")),
+        ("Dirección", info.get("direccion")),
+        ("Email", info.get("email")),
+        ("Secretaría", dossier["secretaria"]),
+        ("Secretario/a", info.get("secretario")),
+        ("Estado Cautelar", dossier["cautelar"] or "No especificado"),
+        ("Observaciones", dossier["observaciones"]),
+    ]
+    return [(k, v) for k, v in pares if v]
+
+
+def _secciones(dossier):
+    """(título, líneas, mensaje si no hay líneas) de cada sección del legajo."""
+    return [
+        ("Tareas", [f"{d} — Vence: {v} — Prioridad: {p} — {c}" for d, v, p, c in dossier["tareas"]], "No hay tareas."),
+        ("Historial de Movimientos", [f"{f}: {d}" for f, d in dossier["movimientos"]], "No hay movimientos registrados."),
+        ("Notas", [f"{f}: {c}" for f, c in dossier["notas"]], "No hay notas."),
+    ]
+
+
+def render_pdf(dossier):
+    # reportlab y python-docx se importan en los procesos que renderizan, no al abrir la app
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import cm
+    from reportlab.platypus import ListFlowable, Paragraph, SimpleDocTemplate, Spacer
+
+    styles = getSampleStyleSheet()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, title=dossier["caratula"] or dossier["numero"],
+        leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm,
+    )
+    story = [Paragraph(escape(dossier["caratula"] or dossier["numero"]), styles["Title"])]
+    story += [Paragraph(f"<b>{escape(k)}:</b> {escape(v)}", styles["Normal"]) for k, v in _ficha(dossier)]
+    for titulo, lineas, vacio in _secciones(dossier):
+        story += [Spacer(1, 0.4 * cm), Paragraph(escape(titulo), styles["Heading2"])]
+        if lineas:
+            story.append(ListFlowable(
+                [Paragraph(escape(linea), styles["Normal"]) for linea in lineas], bulletType="bullet", start="•",
+            ))
+        else:
+            story.append(Paragraph(f"<i>{escape(vacio)}</i>", styles["Normal"]))
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_docx(dossier):
+    from docx import Document
+
+    document = Document()
+    bullet = document.styles["List Bullet"]  # buscar el estilo por nombre en cada párrafo es lento
+    document.add_heading(dossier["caratula"] or dossier["numero"], level=1)
+    for k, v in _ficha(dossier):
+        paragraph = document.add_paragraph()
+        paragraph.add_run(f"{k}: ").bold = True
+        paragraph.add_run(v)
+    for titulo, lineas, vacio in _secciones(dossier):
+        document.add_heading(titulo, level=2)
+        if lineas:
+            for linea in lineas:
+                document.add_paragraph(linea, style=bullet)
+        else:
+            document.add_paragraph().add_run(vacio).italic = True
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+RENDERERS = {"PDF": render_pdf, "DOCX": render_docx}
+
+
+def dossier_filename(dossier, formato):
+    nombre = re.sub(r"[^\w\-]+", "_", dossier["numero"]).strip("_") or "expediente"
+    return f"{nombre}.{DOSSIER_FORMATS[formato]}"
+
+
+def _render(formato, dossier):
+    """Se ejecuta en los procesos del pool."""
+    return dossier_filename(dossier, formato), RENDERERS[formato](dossier)
+
+
+def export_dossiers(dossiers, formato="PDF", progress=None, max_workers=None):
+    """Renderiza los legajos en paralelo y devuelve un ZIP (BytesIO) con un archivo por expediente.
+
+    `progress(hechos, total)` se llama a medida que termina cada legajo.
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    if formato not in RENDERERS:
+        raise ValueError(f"Formato de legajo no soportado: {formato}")
+    total = len(dossiers)
+    buffer = io.BytesIO()
+    # PDF y DOCX ya vienen comprimidos: se guardan sin volver a comprimir
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zf:
+        if total < MIN_PARALLEL:
+            results = (_render(formato, d) for d in dossiers)
+        else:
+            workers = min(max_workers or os.cpu_count() or 1, total)
+            # "spawn": la app corre con varios hilos y un fork podría heredar locks tomados
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            futures = [executor.submit(_render, formato, d) for d in dossiers]
+            results = (future.result() for future in as_completed(futures))
+        try:
+            for hechos, (nombre, contenido) in enumerate(results, start=1):
+                zf.writestr(nombre, contenido)
+                if progress:
+                    progress(hechos, total)
+        finally:
+            if total >= MIN_PARALLEL:
+                executor.shutdown(cancel_futures=True)
+    buffer.seek(0)
+    return buffer
@@ -0,0 +1,175 @@
+import logging
+import threading
+import time
+from datetime import datetime
+
+import streamlit as st
+
+from data_cache import get_data_cache
+from database import get_db_manager
+
+logger = logging.getLogger(__name__)
+
+# Opciones de "Intervalo de sincronización automática" -> segundos
+SYNC_INTERVALS = {
+    "Desactivada": None,
+    "Cada hora": 60 * 60,
+    "Cada 6 horas": 6 * 60 * 60,
+    "Diariamente": 24 * 60 * 60,
+}
+# Cada cuánto revisa el planificador si toca una sincronización programada
+SCHEDULER_TICK = 30
+
+
+class SyncJob:
+    """Estado de una sincronización; se lee desde los reruns mientras corre."""
+
+    def __init__(self, job_id, trigger):
+        self.id = job_id
+        self.trigger = trigger  # "manual", "programada" o "inicio"
+        self.status = "en curso"  # "en curso", "completada" o "error"
+        self.started_at = datetime.now()
+        self.finished_at = None
+        self.pages = 0
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.harvested = 0  # expedientes revisados en busca de movimientos
+        self.harvest_total = 0
+        self.movimientos = 0  # movimientos nuevos insertados
+        self.novedades = set()
+        self.message = ""
+
+    @property
+    def running(self):
+        return self.status == "en curso"
+
+    def to_dict(self):
+        return {
+            "id": self.id, "trigger": self.trigger, "status": self.status,
+            "started_at": self.started_at.strftime("%d/%m/%Y %H:%M:%S"),
+            "finished_at": self.finished_at.strftime("%d/%m/%Y %H:%M:%S") if self.finished_at else None,
+            "pages": self.pages, "rows": self.rows, "inserted": self.inserted,
+            "updated": self.updated, "movimientos": self.movimientos, "message": self.message,
+        }
+
+
+class SyncJobRunner:
+    """Corre la sincronización en un hilo de fondo, de a una por proceso."""
+
+    def __init__(self, target, on_finished=None):
+        self.target = target  # callable(progress) -> totals, p. ej. Scraper().sync_portfolio
+        self.on_finished = on_finished  # callable(job) si la sincronización escribió en la base
+        self.interval = None
+        self.current = None
+        self._last_finished = None
+        self._next_id = 1
+        self._single_flight = threading.Lock()
+        self._lock = threading.Lock()
+        self._scheduler = None
+
+        last = get_db_manager().get_setting("ultima_sincronizacion")
+        if last and last.get("finished_at"):
+            self._last_finished = datetime.strptime(last["finished_at"], "%d/%m/%Y %H:%M:%S")
+
+    def is_running(self):
+        return self._single_flight.locked()
+
+    def start(self, trigger="manual"):
+        """Lanza una sincronización. Devuelve False si ya había una en curso."""
+        if not self._single_flight.acquire(blocking=False):
+            return False
+        with self._lock:
+            job = SyncJob(self._next_id, trigger)
+            self._next_id += 1
+            self.current = job
+        threading.Thread(target=self._run, args=(job,), name=f"sync-{job.id}", daemon=True).start()
+        return True
+
+    def _run(self, job):
+        def progress(totals):
+            job.pages, job.rows = totals["pages"], totals["synced"]
+            job.inserted, job.updated = totals["inserted"], totals["updated"]
+            job.harvested = totals.get("harvested", job.harvested)
+            job.harvest_total = totals.get("harvest_total", job.harvest_total)
+            job.movimientos = totals.get("movimientos", job.movimientos)
+
+        status = "error"
+        try:
+            totals = self.target(progress)
+            progress(totals)
+            job.novedades = set(totals["novedades"])
+            job.message = (
+                f"Se sincronizaron {job.rows} expedientes: {job.inserted} nuevos, "
+                f"{job.updated} actualizados, {job.movimientos} movimientos nuevos."
+            )
+            status = "completada"
+        except Exception as e:
+            logger.exception("Falló la sincronización %s", job.id)
+            job.message = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                self._last_finished = job.finished_at
+            # Las cachés se invalidan solo al terminar, y solo si hubo escrituras
+            if self.on_finished and (job.inserted or job.updated or job.movimientos):
+                try:
+                    self.on_finished(job)
+                except Exception:
+                    logger.exception("No se pudieron invalidar las cachés tras la sincronización")
+            # El estado final se publica después de invalidar, para que el rerun lea datos nuevos
+            job.status = status
+            try:
+                get_db_manager().set_setting("ultima_sincronizacion", job.to_dict())
+            except Exception:
+                logger.exception("No se pudo guardar el estado de la sincronización")
+            self._single_flight.release()
+
+    def last_finished(self):
+        with self._lock:
+            return self._last_finished
+
+    # ------------------------------------------------------------------
+    # Sincronización programada
+    # ------------------------------------------------------------------
+    def set_interval(self, interval_seconds):
+        """Configura el intervalo (segundos, o None para desactivar) y arranca el planificador."""
+        self.interval = interval_seconds
+        if interval_seconds and self._scheduler is None:
+            self._scheduler = threading.Thread(target=self._schedule_loop, name="sync-scheduler", daemon=True)
+            self._scheduler.start()
+
+    def _schedule_loop(self):
+        while True:
+            time.sleep(SCHEDULER_TICK)
+            interval = self.interval
+            if not interval or self.is_running():
+                continue
+            last = self.last_finished()
+            if last is None or (datetime.now() - last).total_seconds() >= interval:
+                logger.info("Sincronización programada (cada %ss)", interval)
+                self.start("programada")
+
+
+def _run_sync(progress):
+    """Sincroniza 'Mis Causas' y después trae los movimientos de los expedientes con novedades."""
+    from scraper import Scraper  # Selenium se carga recién al sincronizar
+
+    scraper = Scraper()
+    totals = scraper.sync_portfolio(progress)
+    totals["movimientos"] = scraper.harvest_movimientos(
+        totals["novedades"],
+        progress=lambda hechos, total: progress({**totals, "harvested": hechos, "harvest_total": total}),
+    )
+    return totals
+
+
+@st.cache_resource
+def get_sync_runner():
+    """Runner único por proceso, compartido por todas las sesiones."""
+    data = get_data_cache()
+    runner = SyncJobRunner(_run_sync, on_finished=lambda job: data.bump("expedientes", "movimientos"))
+    runner.set_interval(SYNC_INTERVALS.get(get_db_manager().get_setting("intervalo_sincronizacion", "Desactivada")))
+    if get_db_manager().get_setting("sincronizacion_al_iniciar", False):
+        runner.start("inicio")
+    return runner
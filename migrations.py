@@ -0,0 +1,325 @@
+import logging
+
+import sqlalchemy as db
+
+from utils import DERIVED_COLUMNS, parse_expedientes
+
+logger = logging.getLogger(__name__)
+
+
+class MigrationPending(Exception):
+    """La migración no se puede aplicar con este motor: no se registra y se reintenta al iniciar."""
+
+
+# ----------------------------------------------------------------------
+# Índice de texto completo (FTS5) sobre carátulas, observaciones, notas y
+# movimientos. Una fila por registro de origen (la carátula va en su propia
+# columna para poder filtrar solo por ella); el rowid se deriva de una clave
+# entera estable del origen y del tipo (clave * 4 + tipo) para que los
+# triggers actualicen y borren por clave sin recorrer el índice. Notas y
+# movimientos usan su id; expedientes (clave de texto, con un rowid implícito
+# que VACUUM puede renumerar) usan el id de su número en SEARCH_KEYS.
+# ----------------------------------------------------------------------
+SEARCH_TABLE = "busqueda"
+SEARCH_KEYS = "busqueda_claves"
+SEARCH_SOURCES = {
+    # tipo: (código, tabla, clave entera, ref, número de expediente, título, texto, columnas que disparan la actualización)
+    "expediente": (
+        1, "expedientes", f"(SELECT id FROM {SEARCH_KEYS} WHERE numero = {{r}}.numero)", "{r}.numero",
+        "{r}.numero", "{r}.caratula", "{r}.observaciones", "caratula, observaciones",
+    ),
+    "nota": (
+        2, "notas", "{r}.id", "{r}.id",
+        "{r}.expediente_numero", "NULL", "{r}.contenido", "contenido, expediente_numero",
+    ),
+    "movimiento": (
+        3, "movimientos", "{r}.id", "{r}.id",
+        "{r}.expediente_numero", "NULL", "{r}.descripcion", "descripcion, expediente_numero",
+    ),
+}
+
+
+def _index_source(conn, tipo):
+    """Triggers y carga inicial del índice para un tipo de registro."""
+    code, table, clave, ref, numero, titulo, texto, columns = SEARCH_SOURCES[tipo]
+
+    def insert(r):
+        return (
+            f"INSERT INTO {SEARCH_TABLE} (rowid, tipo, ref, expediente_numero, titulo, texto) "
+            f"SELECT {clave.format(r=r)} * 4 + {code}, '{tipo}', {ref.format(r=r)}, "
+            f"{numero.format(r=r)}, {titulo.format(r=r)}, {texto.format(r=r)}"
+        )
+    delete = f"DELETE FROM {SEARCH_TABLE} WHERE rowid = {clave.format(r='old')} * 4 + {code}"
+    # Los expedientes nuevos reciben su clave entera antes de indexarse
+    claim = f"INSERT OR IGNORE INTO {SEARCH_KEYS} (numero) VALUES (new.numero);" if table == "expedientes" else ""
+    conn.execute(db.text(f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_ai AFTER INSERT ON {table} BEGIN
+            {claim}
+            {insert("new")};
+        END
+    """))
+    conn.execute(db.text(f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_au AFTER UPDATE OF {columns} ON {table} BEGIN
+            {delete};
+            {insert("new")};
+        END
+    """))
+    conn.execute(db.text(f"""
+        CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_{table}_ad AFTER DELETE ON {table} BEGIN
+            {delete};
+        END
+    """))
+    # Carga inicial de lo que ya estaba en la base
+    if table == "expedientes":
+        conn.execute(db.text(f"INSERT OR IGNORE INTO {SEARCH_KEYS} (numero) SELECT numero FROM expedientes"))
+    conn.execute(db.text(f"{insert('t')} FROM {table} t"))
+
+
+def _create_search_keys(conn):
+    conn.execute(db.text(f"""
+        CREATE TABLE IF NOT EXISTS {SEARCH_KEYS} (
+            id INTEGER PRIMARY KEY,
+            numero VARCHAR NOT NULL UNIQUE
+        )
+    """))
+
+
+def _create_search_index(conn):
+    try:
+        conn.execute(db.text(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+                tipo UNINDEXED, ref UNINDEXED, expediente_numero UNINDEXED, titulo, texto,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """))
+    except db.exc.DBAPIError as e:
+        # Sin registrar la migración: la búsqueda usa LIKE hasta que el motor traiga FTS5
+        raise MigrationPending(f"FTS5 no disponible; la búsqueda local usará LIKE ({e})") from e
+
+    _create_search_keys(conn)
+    for tipo in SEARCH_SOURCES:
+        _index_source(conn, tipo)
+
+
+def _rekey_search_expedientes(conn):
+    """Vuelve a indexar los expedientes con la clave estable (antes se usaba su rowid implícito)."""
+    exists = conn.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": SEARCH_TABLE}
+    ).first()
+    if exists is None:
+        # Bases en las que la migración 4 se registró sin FTS5: se crea el índice completo
+        _create_search_index(conn)
+        return
+    _create_search_keys(conn)
+    for trigger in ("ai", "au", "ad"):
+        conn.execute(db.text(f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_expedientes_{trigger}"))
+    conn.execute(db.text(f"DELETE FROM {SEARCH_TABLE} WHERE tipo = 'expediente'"))
+    _index_source(conn, "expediente")
+
+
+# ----------------------------------------------------------------------
+# Caché de jurisprudencia del portal: resultados deduplicados por clave
+# (el CUIJ, o un hash del texto si la tarjeta no lo trae), las búsquedas ya
+# hechas (consulta normalizada -> claves, con fecha para el vencimiento) y
+# un índice FTS5 para buscar sin conexión en todo lo acumulado.
+# ----------------------------------------------------------------------
+JURISPRUDENCIA_FTS = "jurisprudencia_fts"
+
+
+def _create_jurisprudencia_cache(conn):
+    conn.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS jurisprudencia (
+            clave VARCHAR PRIMARY KEY,
+            cuij VARCHAR,
+            resultado VARCHAR,
+            detalles TEXT,
+            enlace VARCHAR,
+            actualizado_en VARCHAR
+        )
+    """))
+    conn.execute(db.text("""
+        CREATE TABLE IF NOT EXISTS jurisprudencia_busquedas (
+            consulta VARCHAR PRIMARY KEY,
+            claves TEXT,
+            consultada_en VARCHAR
+        )
+    """))
+    try:
+        with conn.begin_nested():
+            conn.execute(db.text(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS {JURISPRUDENCIA_FTS} USING fts5(
+                    resultado, detalles, tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """))
+    except db.exc.DBAPIError as e:
+        logger.warning("FTS5 no disponible; la jurisprudencia guardada se buscará con LIKE (%s)", e)
+        return
+
+    insert = f"INSERT INTO {JURISPRUDENCIA_FTS} (rowid, resultado, detalles) VALUES (new.rowid, new.resultado, new.detalles)"
+    delete = f"DELETE FROM {JURISPRUDENCIA_FTS} WHERE rowid = old.rowid"
+    for name, event, body in [
+        ("ai", "AFTER INSERT", insert),
+        ("au", "AFTER UPDATE OF resultado, detalles", f"{delete}; {insert}"),
+        ("ad", "AFTER DELETE", delete),
+    ]:
+        conn.execute(db.text(f"""
+            CREATE TRIGGER IF NOT EXISTS {JURISPRUDENCIA_FTS}_{name} {event} ON jurisprudencia BEGIN
+                {body};
+            END
+        """))
+
+
+# ----------------------------------------------------------------------
+# Columnas derivadas de expedientes (CUIJ, año, partes, carátula abreviada),
+# calculadas al sincronizar para no parsear número y carátula al mostrar.
+# El enlace al portal va en la columna link_portal que ya existía.
+# ----------------------------------------------------------------------
+DERIVED_COLUMN_TYPES = {
+    "cuij": "VARCHAR",
+    "anio": "INTEGER",
+    "actor": "VARCHAR",
+    "demandado": "VARCHAR",
+    "caratula_corta": "VARCHAR",
+}
+
+
+def _add_derived_columns(conn):
+    existentes = {row[1] for row in conn.execute(db.text("PRAGMA table_info(expedientes)"))}
+    for column in DERIVED_COLUMNS:
+        if column not in existentes:
+            conn.execute(db.text(f"ALTER TABLE expedientes ADD COLUMN {column} {DERIVED_COLUMN_TYPES[column]}"))
+    for column in ("anio", "demandado", "cuij"):
+        conn.execute(db.text(f"CREATE INDEX IF NOT EXISTS ix_expedientes_{column} ON expedientes ({column})"))
+
+    # Completar los expedientes ya guardados
+    rows = conn.execute(db.text("SELECT numero, caratula, link_portal FROM expedientes")).fetchall()
+    if not rows:
+        return
+    numeros, caratulas, links = zip(*rows)
+    derived = parse_expedientes(list(numeros), list(caratulas))
+    derived["link_portal"] = [link or nuevo for link, nuevo in zip(links, derived["link"])]
+    derived["numero"] = list(numeros)
+    records = derived[["numero", "link_portal", *DERIVED_COLUMNS]].astype(object).where(lambda d: d.notna(), None)
+    conn.execute(
+        db.text(f"""UPDATE expedientes SET link_portal = :link_portal,
+                    {', '.join(f'{c} = :{c}' for c in DERIVED_COLUMNS)} WHERE numero = :numero"""),
+        records.to_dict("records"),
+    )
+
+
+# ----------------------------------------------------------------------
+# Origen de cada movimiento: "portal" (traído por harvest_movimientos) o
+# "manual" (cargado en la app). Los anteriores a esta migración quedan en
+# NULL: no se sabe de dónde vinieron y el harvest los reclama como del
+# portal cuando los vuelve a encontrar.
+# ----------------------------------------------------------------------
+def _add_movimiento_origen(conn):
+    existentes = {row[1] for row in conn.execute(db.text("PRAGMA table_info(movimientos)"))}
+    if "origen" not in existentes:
+        conn.execute(db.text("ALTER TABLE movimientos ADD COLUMN origen VARCHAR"))
+    conn.execute(db.text(
+        "CREATE INDEX IF NOT EXISTS ix_movimientos_origen ON movimientos (origen, expediente_numero, fecha)"
+    ))
+
+
+# ----------------------------------------------------------------------
+# Última vez que harvest_movimientos consultó las actuaciones de cada
+# expediente. Los que nunca se consultaron (NULL) se revisan en la próxima
+# sincronización; los demás, solo cuando el portal informa una novedad.
+# Los que ya tienen movimientos del portal cuentan como revisados.
+# ----------------------------------------------------------------------
+def _add_movimientos_revisados(conn):
+    existentes = {row[1] for row in conn.execute(db.text("PRAGMA table_info(expedientes)"))}
+    if "movimientos_revisados_en" not in existentes:
+        conn.execute(db.text("ALTER TABLE expedientes ADD COLUMN movimientos_revisados_en VARCHAR"))
+    conn.execute(db.text("""
+        UPDATE expedientes SET movimientos_revisados_en = strftime('%Y-%m-%dT%H:%M:%S', 'now', 'localtime')
+        WHERE movimientos_revisados_en IS NULL
+          AND EXISTS (SELECT 1 FROM movimientos m WHERE m.origen = 'portal' AND m.expediente_numero = expedientes.numero)
+    """))
+
+
+# ----------------------------------------------------------------------
+# Migraciones versionadas del esquema.
+# Cada una es (versión, descripción, pasos); un paso es una sentencia SQL
+# o una función que recibe la conexión. Se aplican en orden, una sola vez,
+# y cada una en su propia transacción junto con el registro en schema_version.
+# Si un paso lanza MigrationPending la migración se descarta sin registrarse
+# y se vuelve a intentar en el próximo inicio; las siguientes se aplican igual.
+# ----------------------------------------------------------------------
+MIGRATIONS = [
+    (1, "Índices por expediente en movimientos, tareas y notas", [
+        "CREATE INDEX IF NOT EXISTS ix_movimientos_expediente_fecha ON movimientos (expediente_numero, fecha)",
+        "CREATE INDEX IF NOT EXISTS ix_tareas_expediente ON tareas (expediente_numero)",
+        "CREATE INDEX IF NOT EXISTS ix_notas_expediente ON notas (expediente_numero)",
+    ]),
+    (2, "Índice de la agenda de tareas pendientes", [
+        "CREATE INDEX IF NOT EXISTS ix_tareas_completada_vencimiento ON tareas (completada, fecha_vencimiento)",
+    ]),
+    (3, "Índice de notas por fecha de creación", [
+        "CREATE INDEX IF NOT EXISTS ix_notas_fecha_creacion ON notas (fecha_creacion)",
+    ]),
+    (4, "Índice de texto completo (FTS5) de expedientes, notas y movimientos", [
+        _create_search_index,
+    ]),
+    (5, "Caché de jurisprudencia del portal con índice de texto completo", [
+        _create_jurisprudencia_cache,
+    ]),
+    (6, "Columnas derivadas de expedientes (CUIJ, año, actor, demandado, carátula abreviada)", [
+        _add_derived_columns,
+    ]),
+    (7, "Índice de expedientes por juzgado y secretaría", [
+        "CREATE INDEX IF NOT EXISTS ix_expedientes_juzgado ON expedientes (juzgado_nombre, secretaria_nombre)",
+    ]),
+    (8, "Origen de los movimientos (portal o manual)", [
+        _add_movimiento_origen,
+    ]),
+    (9, "Fecha de la última consulta de movimientos de cada expediente", [
+        _add_movimientos_revisados,
+    ]),
+    (10, "Clave estable de los expedientes en el índice de texto completo", [
+        _rekey_search_expedientes,
+    ]),
+]
+
+
+def current_version(conn):
+    return conn.execute(db.text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def applied_versions(conn):
+    return {row[0] for row in conn.execute(db.text("SELECT version FROM schema_version"))}
+
+
+def run_migrations(engine):
+    """Aplica las migraciones pendientes. Devuelve la versión final del esquema."""
+    with engine.begin() as conn:
+        conn.execute(db.text("""
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                descripcion VARCHAR,
+                aplicada_en VARCHAR DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        applied = applied_versions(conn)
+
+    for number, descripcion, steps in MIGRATIONS:
+        if number in applied:
+            continue
+        try:
+            with engine.begin() as conn:
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(db.text(step))
+                conn.execute(
+                    db.text("INSERT INTO schema_version (version, descripcion) VALUES (:v, :d)"),
+                    {"v": number, "d": descripcion},
+                )
+        except MigrationPending as e:
+            logger.warning("Migración %s pendiente (%s): %s", number, descripcion, e)
+            continue
+        logger.info("Migración %s aplicada: %s", number, descripcion)
+    with engine.connect() as conn:
+        return current_version(conn)
@@ -0,0 +1,218 @@
+import logging
+import re
+from datetime import datetime
+
+import pandas as pd
+
+from utils import JURISPRUDENCIA_COLUMNS, create_expediente_link, expediente_link
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------------------------
+# Parseo de las tarjetas del portal (expedientes, actuaciones, jurisprudencia).
+# La extracción de cada tarjeta es una sola y se apoya en un "backend" que
+# sabe buscar nodos y textos:
+#   - "lxml": libxml2 (C) sobre el HTML y búsqueda directa de las tarjetas.
+#   - "strainer": BeautifulSoup con SoupStrainer, que solo arma el árbol de
+#     las tarjetas (con el parser lxml si está instalado).
+#   - "html.parser": BeautifulSoup sobre todo el documento (el parser original;
+#     queda como referencia y como respaldo si falta lxml).
+# Con `cards_html` el navegador devuelve solo el outerHTML de las tarjetas y
+# no hace falta parsear el resto de la aplicación Angular.
+# Ver benchmarks/parse_benchmark.py para comparar los backends.
+# ----------------------------------------------------------------------
+
+EXPEDIENTE_CARD = "iol-expediente-tarjeta"
+ACTUACION_CARD = "iol-actuacion-tarjeta"
+FECHA_RE = re.compile(r"\d{2}/\d{2}/\d{4}")
+RADICACION_RE = re.compile(r"juzgado|secretar[ií]a", re.IGNORECASE)
+# Etiquetas en línea: la radicación se toma del bloque que las contiene
+INLINE_TAGS = {"span", "b", "i", "em", "small", "a"}
+
+PARSER_BACKENDS = ("lxml", "strainer", "html.parser")
+DEFAULT_BACKEND = "lxml"
+
+# outerHTML de todas las tarjetas, concatenado, en el orden del documento
+CARDS_SCRIPT = "return Array.from(document.getElementsByTagName(arguments[0]), e => e.outerHTML).join('');"
+
+
+def lxml_available():
+    try:
+        import lxml.html  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _SoupBackend:
+    """BeautifulSoup; con `strain` solo se construyen los subárboles de las tarjetas."""
+
+    def __init__(self, strain=False):
+        self.strain = strain
+        self.parser = "lxml" if strain and lxml_available() else "html.parser"
+
+    def cards(self, html, tag):
+        from bs4 import BeautifulSoup, SoupStrainer
+
+        only = SoupStrainer(tag) if self.strain else None
+        return BeautifulSoup(html, self.parser, parse_only=only).find_all(tag)
+
+    def find(self, node, tag, cls=None):
+        return node.find(tag, class_=cls) if cls else node.find(tag)
+
+    def text(self, node):
+        return node.text
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def tag(self, node):
+        return node.name
+
+    def parent(self, node):
+        return node.parent
+
+    def strings(self, node):
+        """(texto, elemento que lo contiene) de cada texto del subárbol, en orden."""
+        return ((s, s.parent) for s in node.find_all(string=True))
+
+    def get_text(self, node, separator="", strip=False):
+        return node.get_text(separator, strip=strip)
+
+
+class _LxmlBackend:
+    """lxml.html: el documento se arma en C y las tarjetas se recorren con iter()."""
+
+    def cards(self, html, tag):
+        import lxml.html
+
+        if not html or not html.strip():
+            return []
+        # document_fromstring acepta tanto la página completa como solo las tarjetas
+        return list(lxml.html.document_fromstring(html).iter(tag))
+
+    def find(self, node, tag, cls=None):
+        for element in node.iterdescendants(tag):
+            if cls is None or cls in (element.get("class") or "").split():
+                return element
+        return None
+
+    def text(self, node):
+        return node.text_content()
+
+    def attr(self, node, name):
+        return node.get(name)
+
+    def tag(self, node):
+        return node.tag
+
+    def parent(self, node):
+        return node.getparent()
+
+    def strings(self, node):
+        for s in node.xpath(".//text()"):
+            parent = s.getparent()
+            yield s, (parent.getparent() if s.is_tail else parent)
+
+    def get_text(self, node, separator="", strip=False):
+        strings = (str(s) for s in node.xpath(".//text()"))
+        if strip:
+            strings = (s.strip() for s in strings)
+            strings = (s for s in strings if s)
+        return separator.join(strings)
+
+
+_BACKENDS = {}
+
+
+def get_backend(name=None):
+    """Backend de parseo por nombre (por defecto DEFAULT_BACKEND; sin lxml se usa html.parser)."""
+    name = name or DEFAULT_BACKEND
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Backend de parseo desconocido: {name}")
+    if name == "lxml" and not lxml_available():
+        logger.warning("lxml no está instalado; se parsea con html.parser.")
+        name = "html.parser"
+    if name not in _BACKENDS:
+        _BACKENDS[name] = _LxmlBackend() if name == "lxml" else _SoupBackend(strain=name == "strainer")
+    return _BACKENDS[name]
+
+
+def cards_html(driver, card_tag):
+    """Solo el HTML de las tarjetas visibles, leído del DOM (mucho menos que `page_source`)."""
+    return driver.execute_script(CARDS_SCRIPT, card_tag)
+
+
+# ----------------------------------------------------------------------
+# Extracción por tipo de tarjeta (igual para todos los backends)
+# ----------------------------------------------------------------------
+def parse_expediente_cards(html, backend=None):
+    """Parsea las tarjetas de 'Mis Causas' y devuelve un DataFrame."""
+    b = get_backend(backend)
+
+    exp_data = []
+    for t in b.cards(html, EXPEDIENTE_CARD):
+        n = b.find(t, 'p', 'fontSizeEncabezadoCuij')
+        c = b.find(t, 'strong')
+        e = b.find(t, 'p', 'badge')
+        fn, un = None, None
+        numero = b.text(n).strip() if n is not None else "N/D"
+
+        # Mismo enlace que arma la API (portal_api.causas_to_frame) para el mismo número
+        link_tag = b.find(t, 'a', 'textColorEncabezado')
+        link = expediente_link(numero, b.attr(link_tag, 'href') if link_tag is not None else None)
+
+        # Juzgado y secretaría, si la tarjeta los muestra (se resuelven al sincronizar)
+        rad = next((p for s, p in b.strings(t) if RADICACION_RE.search(s) and p is not c), None)
+        # "Juzgado N° 5" y "Secretaría N° 9" pueden venir en <span> separados dentro del mismo párrafo
+        while rad is not None and b.tag(rad) in INLINE_TAGS and b.parent(rad) is not t:
+            rad = b.parent(rad)
+
+        nov = b.find(t, 'p', 'fontSizePie')
+        if nov is not None:
+            parts = " ".join(b.text(nov).strip().split()).split('|', 1)
+            fn, un = (parts[0].strip(), parts[1].strip()) if len(parts) > 1 else (parts[0].strip(), "")
+
+        exp_data.append({
+            "Numero": numero,
+            "Caratula": b.text(c).strip() if c is not None else "N/D",
+            "Estado": b.text(e).strip() if e is not None else "N/D",
+            "Fecha Novedad": fn,
+            "Última Novedad": un,
+            "Link": link,
+            "Radicación": b.get_text(rad, " ", strip=True) if rad is not None else None,
+        })
+    return pd.DataFrame(exp_data)
+
+
+def parse_actuacion_rows(html, backend=None):
+    """Parsea las tarjetas de actuaciones de un expediente como filas de movimientos."""
+    b = get_backend(backend)
+    rows = []
+    for card in b.cards(html, ACTUACION_CARD):
+        titulo = b.find(card, 'strong')
+        match = FECHA_RE.search(b.get_text(card, " "))
+        if titulo is not None and match:
+            rows.append({
+                "fecha": datetime.strptime(match.group(0), "%d/%m/%Y").date(),
+                "descripcion": b.text(titulo).strip(),
+            })
+    return rows
+
+
+def parse_jurisprudencia_cards(html, backend=None):
+    """Parsea los resultados de la búsqueda de jurisprudencia (tarjetas de actuación)."""
+    b = get_backend(backend)
+    results = []
+    for card in b.cards(html, ACTUACION_CARD):
+        c_elem = b.find(card, 'strong')
+        n_elem = b.find(card, 'p', 'fontSizeEncabezadoCuij')
+        n_text = b.text(n_elem).strip() if n_elem is not None else None
+        details = b.find(card, 'p', 'actuacion-texto')
+        results.append({
+            "Resultado": b.text(c_elem).strip() if c_elem is not None else "N/D",
+            "Detalles": b.text(details).strip() if details is not None else "",
+            "CUIJ": n_text,
+            "Enlace": create_expediente_link(n_text) if n_text else "#",
+        })
+    return pd.DataFrame(results, columns=JURISPRUDENCIA_COLUMNS)
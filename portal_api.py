@@ -0,0 +1,194 @@
+import json
+from datetime import datetime
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import JURISPRUDENCIA_COLUMNS, create_expediente_link, expediente_link
+
+# ----------------------------------------------------------------------
+# Cliente de la API JSON que consume la interfaz Angular (iol-ui).
+# Reutiliza la sesión del login con Selenium; ante cualquier respuesta
+# inesperada lanza PortalAPIError y el scraper vuelve a usar el navegador.
+# ----------------------------------------------------------------------
+BASE_URL = "https://eje.juscaba.gob.ar"
+API_URL = f"{BASE_URL}/iol-api/api"
+
+# Rutas relativas a API_URL
+ENDPOINTS = {
+    "causas": "/expedientes/lista",
+    "jurisprudencia": "/public/jurisprudencia/lista",
+    "actuaciones": "/public/expedientes/actuaciones",
+}
+PAGE_SIZE = 100
+# La búsqueda del navegador muestra una sola página de 50: la API trae lo mismo
+JURISPRUDENCIA_RESULTS = 50
+# Tope de seguridad para no paginar sin fin si la API no informa la última página
+MAX_PAGES = 200
+REQUEST_TIMEOUT = 20
+
+
+class PortalAPIError(Exception):
+    """La API no respondió lo esperado; el llamador debe usar Selenium."""
+
+
+def _first(item, *keys):
+    """Primer valor no vacío entre varias claves posibles del JSON."""
+    for key in keys:
+        value = item.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _parse_fecha(value):
+    """Fecha ISO o epoch (ms) del JSON como datetime, o None si no se puede leer."""
+    if value in (None, ""):
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value / 1000)
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except (ValueError, OverflowError, OSError):
+        return None
+
+
+def _format_fecha(value):
+    """Normaliza fechas ISO o epoch (ms) al formato de las tarjetas: dd/mm/aaaa."""
+    parsed = _parse_fecha(value)
+    if parsed is None:
+        return str(value) if value not in (None, "") else None
+    return parsed.strftime("%d/%m/%Y")
+
+
+def _radicacion(item):
+    """Texto del juzgado y la secretaría de la causa; las claves varían entre versiones de la API."""
+    partes = []
+    for key in ("radicacion", "organismo", "juzgado", "dependencia", "secretaria"):
+        value = item.get(key)
+        if isinstance(value, dict):
+            # {"radicacion": {"organismo": {...}, "secretaria": {...}}}: se leen las claves de adentro
+            value = _first(value, "descripcion", "nombre") or (_radicacion(value) if key == "radicacion" else None)
+        if value not in (None, ""):
+            partes.append(str(value).strip())
+    return " | ".join(partes) or None
+
+
+def causas_to_frame(items):
+    """Convierte la lista JSON de causas al DataFrame que produce el scraper."""
+    rows = []
+    for item in items:
+        numero = _first(item, "cuij", "numero", "identificador")
+        actuacion = item.get("ultimaActuacion") or {}
+        rows.append({
+            "Numero": str(numero).strip() if numero else "N/D",
+            "Caratula": str(_first(item, "caratula") or "N/D").strip(),
+            "Estado": str(_first(item, "estado", "estadoAdministrativo") or "N/D").strip(),
+            "Fecha Novedad": _format_fecha(_first(actuacion, "fechaFirma", "fecha")),
+            "Última Novedad": _first(actuacion, "titulo", "descripcion") or "",
+            # Mismo enlace que arma parsing.parse_expediente_cards para la tarjeta
+            "Link": expediente_link(str(numero).strip()) if numero else None,
+            "Radicación": _radicacion(item),
+        })
+    return pd.DataFrame(
+        rows, columns=["Numero", "Caratula", "Estado", "Fecha Novedad", "Última Novedad", "Link", "Radicación"]
+    )
+
+
+def jurisprudencia_to_frame(items):
+    """Convierte la lista JSON de jurisprudencia al DataFrame de `search_on_portal`."""
+    rows = []
+    for item in items:
+        numero = _first(item, "cuij", "numero")
+        rows.append({
+            "Resultado": str(_first(item, "caratula", "titulo") or "N/D").strip(),
+            "Detalles": str(_first(item, "texto", "sumario", "descripcion") or "").strip(),
+            "CUIJ": str(numero).strip() if numero else None,
+            "Enlace": create_expediente_link(numero) if numero else "#",
+        })
+    return pd.DataFrame(rows, columns=JURISPRUDENCIA_COLUMNS)
+
+
+def actuaciones_to_rows(items):
+    """Convierte actuaciones del JSON en filas para la tabla movimientos (sin expediente)."""
+    rows = []
+    for item in items:
+        fecha = _parse_fecha(_first(item, "fechaFirma", "fecha"))
+        descripcion = _first(item, "titulo", "descripcion")
+        if fecha and descripcion:
+            rows.append({"fecha": fecha.date(), "descripcion": str(descripcion).strip()})
+    return rows
+
+
+class PortalAPIClient:
+    def __init__(self, token=None, cookies=None):
+        self.session = requests.Session()
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=10, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", "Referer": f"{BASE_URL}/iol-ui/"})
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+        for cookie in cookies or []:
+            self.session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        self.authenticated = bool(token or cookies)
+
+    @classmethod
+    def from_driver(cls, driver):
+        """Crea un cliente con las cookies y el token del navegador ya logueado."""
+        token = driver.execute_script("""
+            for (const store of [window.sessionStorage, window.localStorage]) {
+                for (let i = 0; i < store.length; i++) {
+                    const key = store.key(i);
+                    if (/token/i.test(key)) { return store.getItem(key); }
+                }
+            }
+            return null;
+        """)
+        return cls(token=token, cookies=driver.get_cookies())
+
+    def _get(self, endpoint, filtro, page, size=PAGE_SIZE):
+        try:
+            response = self.session.get(
+                API_URL + ENDPOINTS[endpoint],
+                params={"filtro": json.dumps(filtro), "page": page, "size": size},
+                timeout=REQUEST_TIMEOUT,
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise PortalAPIError(f"{endpoint}: {e}") from e
+        if not isinstance(data, dict) or not isinstance(data.get("content"), list):
+            raise PortalAPIError(f"{endpoint}: respuesta con formato inesperado")
+        return data
+
+    def _iter_pages(self, endpoint, filtro):
+        for page in range(MAX_PAGES):
+            data = self._get(endpoint, filtro, page)
+            yield data["content"]
+            total_pages = data.get("totalPages")
+            if data.get("last") or not data["content"] or (total_pages is not None and page + 1 >= total_pages):
+                return
+
+    def iter_causas(self):
+        """Recorre 'Mis Causas' y devuelve un DataFrame por página."""
+        if not self.authenticated:
+            raise PortalAPIError("causas: se requiere una sesión iniciada")
+        for items in self._iter_pages("causas", {"causas": 1, "tipoBusqueda": "CAU"}):
+            yield causas_to_frame(items)
+
+    def iter_actuaciones(self, numero):
+        """Actuaciones de un expediente, de la más nueva a la más vieja (una lista por página)."""
+        for items in self._iter_pages("actuaciones", {"identificador": numero}):
+            yield actuaciones_to_rows(items)
+
+    def search_jurisprudencia(self, query):
+        """Busca jurisprudencia y devuelve el mismo DataFrame que `Scraper.search_on_portal`.
+
+        Solo la primera página de JURISPRUDENCIA_RESULTS, como la búsqueda en el navegador.
+        """
+        filtro = {"identificador": query, "tipoBusqueda": "JUR"}
+        data = self._get("jurisprudencia", filtro, 0, size=JURISPRUDENCIA_RESULTS)
+        return jurisprudencia_to_frame(data["content"][:JURISPRUDENCIA_RESULTS])
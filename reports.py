@@ -0,0 +1,169 @@
+import html
+import io
+
+import pandas as pd
+
+# ----------------------------------------------------------------------
+# Motor de reportes: agrupa tareas y movimientos una sola vez y genera el
+# texto por partes (un fragmento por expediente) a partir de plantillas por
+# formato. Los fragmentos se escriben en un buffer o se descargan a medida
+# que se generan, sin armar copias intermedias del reporte completo.
+# ----------------------------------------------------------------------
+
+# Formato -> (extensión, tipo MIME)
+REPORT_FORMATS = {
+    "Markdown": ("md", "text/markdown"),
+    "HTML": ("html", "text/html"),
+    "Texto plano": ("txt", "text/plain"),
+}
+
+TEMPLATES = {
+    "Markdown": {
+        "header": "# Reporte de Expedientes\n*Generado el: {generado}*\n\n",
+        "expediente": (
+            "---\n##  expediente: {caratula}\n"
+            "**Número:** {numero}  \n"
+            "**Juzgado:** {juzgado} - {secretaria}  \n"
+            "**Estado Cautelar:** {cautelar}  \n\n"
+        ),
+        "section": "### {titulo}\n",
+        "tarea": "- **{descripcion}** (Vence: {vence}, Prioridad: {prioridad})\n",
+        "movimiento": "- **{fecha}:** {descripcion}\n",
+        "empty": "_{mensaje}_\n",
+        "section_end": "\n",
+        "expediente_end": "",
+        "footer": "",
+    },
+    "HTML": {
+        "header": (
+            "<!DOCTYPE html>\n<html lang=\"es\">\n<head><meta charset=\"utf-8\">"
+            "<title>Reporte de Expedientes</title></head>\n<body>\n"
+            "<h1>Reporte de Expedientes</h1>\n<p><em>Generado el: {generado}</em></p>\n"
+        ),
+        "expediente": (
+            "<hr>\n<section>\n<h2>{caratula}</h2>\n<p>"
+            "<strong>Número:</strong> {numero}<br>\n"
+            "<strong>Juzgado:</strong> {juzgado} - {secretaria}<br>\n"
+            "<strong>Estado Cautelar:</strong> {cautelar}</p>\n"
+        ),
+        "section": "<h3>{titulo}</h3>\n<ul>\n",
+        "tarea": "<li><strong>{descripcion}</strong> (Vence: {vence}, Prioridad: {prioridad})</li>\n",
+        "movimiento": "<li><strong>{fecha}:</strong> {descripcion}</li>\n",
+        "empty": "<li><em>{mensaje}</em></li>\n",
+        "section_end": "</ul>\n",
+        "expediente_end": "</section>\n",
+        "footer": "</body>\n</html>\n",
+    },
+    "Texto plano": {
+        "header": "REPORTE DE EXPEDIENTES\nGenerado el: {generado}\n\n",
+        "expediente": (
+            "{separador}\n{caratula}\n"
+            "Número: {numero}\n"
+            "Juzgado: {juzgado} - {secretaria}\n"
+            "Estado Cautelar: {cautelar}\n\n"
+        ),
+        "section": "{titulo}:\n",
+        "tarea": "  * {descripcion} (Vence: {vence}, Prioridad: {prioridad})\n",
+        "movimiento": "  * {fecha}: {descripcion}\n",
+        "empty": "  {mensaje}\n",
+        "section_end": "\n",
+        "expediente_end": "",
+        "footer": "",
+    },
+}
+
+
+def _escape_for(formato):
+    if formato == "HTML":
+        return lambda value: html.escape(str(value))
+    return str
+
+
+def _texto(value, default=""):
+    return default if value is None or (not isinstance(value, str) and pd.isna(value)) else value
+
+
+def _fechas(series):
+    """Formatea una columna de fechas como dd/mm/aaaa de una sola vez."""
+    return pd.to_datetime(series, errors="coerce").dt.strftime("%d/%m/%Y").fillna("")
+
+
+def iter_report(expedientes_df, tareas_df, movimientos_df, numeros, formato="Markdown"):
+    """Genera el reporte por fragmentos (encabezado, un fragmento por expediente, cierre)."""
+    if formato not in TEMPLATES:
+        raise ValueError(f"Formato de reporte no soportado: {formato}")
+    tpl = TEMPLATES[formato]
+    esc = _escape_for(formato)
+
+    # Una sola pasada por cada DataFrame: filtrado, formateo de fechas y agrupación
+    expedientes = expedientes_df.drop_duplicates("numero").set_index("numero")
+    pendientes = tareas_df.loc[~tareas_df["completada"].astype(bool)] if not tareas_df.empty else tareas_df
+    pendientes = pendientes.assign(vence=_fechas(pendientes["fecha_vencimiento"])) if not pendientes.empty else pendientes
+    movimientos = movimientos_df.sort_values("fecha", ascending=False, kind="stable") if not movimientos_df.empty else movimientos_df
+    movimientos = movimientos.assign(fecha_txt=_fechas(movimientos["fecha"])) if not movimientos.empty else movimientos
+    tareas_por_exp = pendientes.groupby("expediente_numero", sort=False).indices if not pendientes.empty else {}
+    movs_por_exp = movimientos.groupby("expediente_numero", sort=False).indices if not movimientos.empty else {}
+
+    yield tpl["header"].format(generado=pd.Timestamp.now().strftime("%d/%m/%Y %H:%M"))
+
+    for numero in numeros:
+        if numero not in expedientes.index:
+            continue
+        exp = expedientes.loc[numero]
+        parts = [tpl["expediente"].format(
+            separador="=" * 60,
+            caratula=esc(_texto(exp.get("caratula"))),
+            numero=esc(numero),
+            juzgado=esc(_texto(exp.get("juzgado_nombre"), "No especificado")),
+            secretaria=esc(_texto(exp.get("secretaria_nombre"))),
+            cautelar=esc(_texto(exp.get("medida_cautelar_status"), "No especificado")),
+        )]
+
+        parts.append(tpl["section"].format(titulo="Tareas Pendientes"))
+        positions = tareas_por_exp.get(numero)
+        if positions is not None:
+            grupo = pendientes.iloc[positions]
+            parts.extend(
+                tpl["tarea"].format(descripcion=esc(d), vence=v, prioridad=esc(p))
+                for d, v, p in zip(grupo["descripcion"], grupo["vence"], grupo["prioridad"])
+            )
+        else:
+            parts.append(tpl["empty"].format(mensaje="No hay tareas pendientes."))
+        parts.append(tpl["section_end"])
+
+        parts.append(tpl["section"].format(titulo="Historial de Movimientos"))
+        positions = movs_por_exp.get(numero)
+        if positions is not None:
+            grupo = movimientos.iloc[positions]
+            parts.extend(
+                tpl["movimiento"].format(fecha=f, descripcion=esc(d))
+                for f, d in zip(grupo["fecha_txt"], grupo["descripcion"])
+            )
+        else:
+            parts.append(tpl["empty"].format(mensaje="No hay movimientos registrados."))
+        parts.append(tpl["section_end"])
+        parts.append(tpl["expediente_end"])
+        yield "".join(parts)
+
+    yield tpl["footer"]
+
+
+def write_report(buffer, *args, **kwargs):
+    """Escribe el reporte en `buffer` (texto, p. ej. StringIO o un archivo) a medida que se genera."""
+    for chunk in iter_report(*args, **kwargs):
+        buffer.write(chunk)
+    return buffer
+
+
+def render_report(*args, **kwargs):
+    """Reporte completo como texto."""
+    return write_report(io.StringIO(), *args, **kwargs).getvalue()
+
+
+def report_bytes(*args, encoding="utf-8", **kwargs):
+    """Reporte codificado en un único buffer binario, listo para `st.download_button`."""
+    buffer = io.BytesIO()
+    for chunk in iter_report(*args, **kwargs):
+        buffer.write(chunk.encode(encoding))
+    buffer.seek(0)
+    return buffer
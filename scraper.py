@@ -1,140 +1,458 @@
 import streamlit as st
 import pandas as pd
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
-from webdriver_manager.chrome import ChromeDriverManager
-from bs4 import BeautifulSoup
+from selenium.common.exceptions import TimeoutException, WebDriverException
+import logging
+import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import closing, contextmanager
 from urllib.parse import quote
-from database import db_manager
-from utils import create_expediente_link
+from browser_pool import get_driver_pool
+from database import JURISPRUDENCIA_TTL, SYNC_COLUMNS, get_db_manager
+from parsing import (
+    ACTUACION_CARD, EXPEDIENTE_CARD, cards_html, parse_actuacion_rows, parse_expediente_cards,
+    parse_jurisprudencia_cards,
+)
+from portal_api import JURISPRUDENCIA_RESULTS, PortalAPIClient, PortalAPIError
+from utils import JURISPRUDENCIA_COLUMNS, create_expediente_link, get_secret, normalize_numero, normalize_query
+from timing import PhaseTimer
+from waits import DEFAULT_TIMEOUTS, PAGINATOR_LABEL, card_count_stable, list_ready, paginator_label_changed, wait_for
+
+logger = logging.getLogger(__name__)
 
 BASE_URL = "https://eje.juscaba.gob.ar"
 
+PAGE_SIZE_SELECT = "mat-select[aria-label='Registros por página:']"
+NEXT_PAGE_BUTTON = "button.mat-mdc-paginator-navigation-next, button.mat-paginator-navigation-next"
+# Tope de seguridad para no quedar en un bucle si el paginador no avanza
+MAX_PAGES = 200
+# Expedientes consultados en paralelo al buscar movimientos
+HARVEST_WORKERS = 6
+# Pedir al navegador solo el HTML de las tarjetas en lugar de todo page_source
+CARDS_ONLY = True
+
+
+def page_cards(driver, card_tag):
+    """HTML a parsear: el outerHTML de las tarjetas o, si el script falla, la página completa."""
+    if CARDS_ONLY:
+        try:
+            return cards_html(driver, card_tag)
+        except WebDriverException as e:
+            logger.debug("No se pudo leer el HTML de las tarjetas (%s); se usa page_source.", e)
+    return driver.page_source
+
+
+def expedientes_to_results(df):
+    """Expedientes (de la base o de las tarjetas del portal) con las columnas de resultados de búsqueda."""
+    if df.empty:
+        return pd.DataFrame(columns=JURISPRUDENCIA_COLUMNS)
+    if "Numero" in df.columns:
+        df = df.rename(columns=SYNC_COLUMNS)
+    numero = df["numero"].astype(str)
+    novedad = (df["fecha_novedad_portal"].fillna("") + " " + df["ultima_novedad_portal"].fillna("")).str.strip()
+    detalles = df["estado"].fillna("N/D") + novedad.where(novedad == "", " · " + novedad)
+    enlace = df["link_portal"].where(df["link_portal"].notna(), numero.map(create_expediente_link)).fillna("#")
+    return pd.DataFrame({
+        "Resultado": df["caratula"].fillna("N/D"),
+        "Detalles": detalles,
+        "CUIJ": numero,
+        "Enlace": enlace,
+    }, columns=JURISPRUDENCIA_COLUMNS).reset_index(drop=True)
+
+
+def new_movimientos(pages, latest):
+    """Toma actuaciones (de la más nueva a la más vieja) hasta llegar a lo ya guardado.
+
+    `latest` es (fecha, descripciones de esa fecha) del movimiento más reciente
+    guardado, o None. Deja de consumir `pages` apenas encuentra uno conocido.
+    """
+    nuevos = []
+    for rows in pages:
+        for row in rows:
+            if latest is not None:
+                fecha, conocidas = latest
+                if row["fecha"] < fecha or (row["fecha"] == fecha and row["descripcion"] in conocidas):
+                    return nuevos
+            nuevos.append(row)
+    return nuevos
+
+
+def new_sync_totals():
+    """Conteos de una sincronización; los números vistos y escritos van en conjuntos."""
+    return {
+        "inserted": 0, "updated": 0, "unchanged": 0, "synced": 0, "pages": 0,
+        "vistos": set(), "nuevos": set(), "actualizados": set(), "novedades": set(),
+    }
+
+
+def recount_sync_totals(totals):
+    """Recalcula los conteos desde los conjuntos: nuevos + actualizados + sin cambios = sincronizados.
+
+    Solo se cuentan los expedientes vistos en el recorrido actual, aunque los
+    haya escrito un recorrido anterior de la misma sincronización (la API antes
+    de pasar al DOM).
+    """
+    vistos = totals["vistos"]
+    totals["synced"] = len(vistos)
+    totals["inserted"] = len(totals["nuevos"] & vistos)
+    totals["updated"] = len((totals["actualizados"] - totals["nuevos"]) & vistos)
+    totals["unchanged"] = totals["synced"] - totals["inserted"] - totals["updated"]
+
+
+class SyncError(Exception):
+    """Falla de la sincronización con el portal (login, paginación, credenciales)."""
+
 
 class Scraper:
-    def __init__(self):
-        """Inicializa Selenium en modo headless y guarda el driver en sesión."""
-        if 'driver' not in st.session_state or st.session_state.driver is None:
-            options = webdriver.ChromeOptions()
-            options.add_argument("--headless=new")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            service = Service(ChromeDriverManager().install())
-            st.session_state.driver = webdriver.Chrome(service=service, options=options)
-        self.driver = st.session_state.driver
+    def __init__(self, timeouts=None):
+        """Prepara el scraper; el navegador se toma del pool recién cuando hace falta.
+
+        `timeouts` permite sobrescribir cualquier valor de `waits.DEFAULT_TIMEOUTS`.
+        """
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.last_timings = None
+        self.driver = None
+
+    @contextmanager
+    def _browser(self):
+        """Toma un navegador del pool compartido y lo devuelve al terminar."""
+        with get_driver_pool().lease() as pooled:
+            self.driver = pooled.driver
+            try:
+                yield pooled
+            finally:
+                self.driver = None
 
     def login_and_sync(self):
-        """Login en el portal y sincronización de expedientes."""
-        PJ_USER = st.secrets.get("PJ_USER")
-        PJ_PASS = st.secrets.get("PJ_PASS")
+        """Login en el portal y sincronización de expedientes, informando en pantalla."""
+        try:
+            totals = self.sync_portfolio()
+        except SyncError as e:
+            st.error(f"Error al sincronizar: {e}")
+            return None
 
+        if totals["synced"]:
+            st.session_state['last_sync'] = time.strftime("%d/%m/%Y %H:%M:%S")
+            st.session_state['novedades_sync'] = totals["novedades"]
+            st.success(
+                f"Se sincronizaron {totals['synced']} expedientes: {totals['inserted']} nuevos, "
+                f"{totals['updated']} actualizados, {totals['unchanged']} sin cambios."
+            )
+        else:
+            st.info("No se encontraron expedientes en 'Mis Causas'.")
+        return totals
+
+    def sync_portfolio(self, progress=None):
+        """Login y sincronización de todo 'Mis Causas', sin tocar la interfaz.
+
+        Se puede llamar desde un hilo de fondo. `progress(totals)` se invoca
+        después de guardar cada página. Devuelve los conteos acumulados y
+        lanza `SyncError` si falla el login o el recorrido del portal.
+        """
+        PJ_USER = get_secret("PJ_USER")
+        PJ_PASS = get_secret("PJ_PASS")
         if not PJ_USER or not PJ_PASS:
-            st.error("Error: Credenciales no configuradas en los secretos de Streamlit.")
+            raise SyncError("Credenciales no configuradas en los secretos de Streamlit.")
+
+        timer = PhaseTimer("sincronización")
+        self.last_timings = timer
+        totals = new_sync_totals()
+        with self._browser() as pooled:
+            try:
+                self._login(pooled, PJ_USER, PJ_PASS, timer)
+            except TimeoutException as e:
+                pooled.logged_in, pooled.api = False, None
+                raise SyncError("No se pudo iniciar sesión. Verifica tus credenciales.") from e
+
+            try:
+                # Primero la API JSON con la sesión recién iniciada; si falla, el DOM
+                api = PortalAPIClient.from_driver(self.driver)
+                pooled.api = api
+                try:
+                    self._sync_pages(api.iter_causas(), timer, totals, progress)
+                except PortalAPIError as e:
+                    logger.warning("API del portal no disponible (%s); se recorre el DOM.", e)
+                    # Lo que la API ya escribió sigue contando como nuevo o actualizado
+                    # cuando el DOM vuelve a ver esos expedientes
+                    totals.update(vistos=set(), pages=0)
+                    recount_sync_totals(totals)
+                    with timer.phase("carga Mis Causas"):
+                        self.driver.get(f"{BASE_URL}/iol-ui/u/causas?causas=1&tipoBusqueda=CAU&tituloBusqueda=Mis%20Causas")
+                    self._select_largest_page_size(timer)
+                    self._sync_pages(
+                        self._iter_pages(EXPEDIENTE_CARD, parse_expediente_cards, timer), timer, totals, progress
+                    )
+            except TimeoutException as e:
+                raise SyncError("No se encontró el selector de paginación.") from e
+            finally:
+                logger.info(timer.summary())
+        return totals
+
+    def harvest_movimientos(self, numeros=(), workers=HARVEST_WORKERS, progress=None):
+        """Trae del portal los movimientos nuevos y los guarda en bloque.
+
+        Consulta los expedientes de `numeros` más los que nunca se revisaron,
+        con `workers` consultas en paralelo. Para cada uno lee
+        las actuaciones de la más nueva a la más vieja y se detiene en la
+        primera que ya está guardada. `progress(hechos, total)` se llama por
+        expediente. Devuelve la cantidad de movimientos insertados.
+        """
+        targets = get_db_manager().get_harvest_targets(numeros)
+        if not targets:
+            return 0
+        latest = get_db_manager().get_latest_movimientos()
+        api = get_driver_pool().authenticated_api() or PortalAPIClient()
+
+        def fetch(numero, link):
+            try:
+                pages = api.iter_actuaciones(numero)
+                rows = new_movimientos(pages, latest.get(numero))
+            except PortalAPIError as e:
+                if not link:
+                    raise
+                logger.info("API sin actuaciones para %s (%s); se usa el navegador.", numero, e)
+                # closing: si new_movimientos corta antes, el navegador vuelve al pool enseguida
+                with closing(self._iter_actuaciones_dom(link)) as pages:
+                    rows = new_movimientos(pages, latest.get(numero))
+            return [{"expediente_numero": numero, **row} for row in rows]
+
+        nuevos, revisados, hechos = [], [], 0
+        timer = PhaseTimer("movimientos")
+        with timer.phase(f"consulta de {len(targets)} expedientes"):
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(fetch, numero, link): numero for numero, link in targets}
+                for future in as_completed(futures):
+                    hechos += 1
+                    try:
+                        nuevos.extend(future.result())
+                        revisados.append(futures[future])
+                    except Exception as e:
+                        logger.warning("No se pudieron traer movimientos de %s: %s", futures[future], e)
+                    if progress is not None:
+                        progress(hechos, len(targets))
+        with timer.phase("escritura DB"):
+            inserted = get_db_manager().add_movimientos_bulk(nuevos, revisados)
+        logger.info(timer.summary())
+        return inserted
+
+    def _iter_actuaciones_dom(self, link):
+        """Actuaciones leídas del DOM, una lista por página (cada hilo toma su propio navegador).
+
+        Recorre el paginador igual que la sincronización; si la vista no tiene
+        paginador, todas las actuaciones están en la única página.
+        """
+        with get_driver_pool().lease() as pooled:
+            driver = pooled.driver
+            driver.get(link)
+            wait_for(driver, EC.presence_of_element_located((By.TAG_NAME, ACTUACION_CARD)), self.timeouts["list"])
+            if driver.find_elements(By.CSS_SELECTOR, PAGINATOR_LABEL):
+                yield from self._iter_pages(ACTUACION_CARD, parse_actuacion_rows, driver=driver)
+            else:
+                wait_for(driver, card_count_stable(ACTUACION_CARD), self.timeouts["list"])
+                yield parse_actuacion_rows(page_cards(driver, ACTUACION_CARD))
+
+    def _login(self, pooled, user, password, timer):
+        """Inicia sesión, salvo que el navegador del pool conserve una sesión válida."""
+        with timer.phase("carga login"):
+            self.driver.get(f"{BASE_URL}/iol-ui/u/inicio")
+        if pooled.logged_in and "/u/inicio" in self.driver.current_url \
+                and not self.driver.find_elements(By.ID, "username"):
+            logger.info("Se reutiliza la sesión del portal del navegador del pool.")
             return
+        pooled.logged_in = False
+        user_field = wait_for(
+            self.driver, EC.visibility_of_element_located((By.ID, "username")),
+            self.timeouts["login_form"], timer, "formulario login"
+        )
+        user_field.send_keys(user)
+        self.driver.find_element(By.ID, "password").send_keys(password)
+        self.driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
+        wait_for(
+            self.driver, EC.url_contains("/u/inicio"),
+            self.timeouts["login_redirect"], timer, "redirección login"
+        )
+        pooled.logged_in = True
 
-        self.driver.get(f"{BASE_URL}/iol-ui/u/inicio")
-        try:
-            user_field = WebDriverWait(self.driver, 20).until(
-                EC.visibility_of_element_located((By.ID, "username"))
+    def _sync_pages(self, pages, timer, totals, progress=None):
+        """Guarda cada página apenas se obtiene, acumulando los conteos en `totals`."""
+        for df in pages:
+            if df.empty:
+                continue
+            with timer.phase("escritura DB"):
+                counts = get_db_manager().sync_expedientes(df)
+            nuevos = set(counts["nuevos"])
+            totals["nuevos"] |= nuevos
+            totals["actualizados"] |= set(counts["changed"]) - nuevos
+            totals["novedades"].update(counts['novedades'])
+            totals["vistos"].update(df["Numero"])
+            totals["pages"] += 1
+            recount_sync_totals(totals)
+            if progress is not None:
+                progress(totals)
+
+    def _select_largest_page_size(self, timer=None):
+        """Elige la opción más grande de 'Registros por página'."""
+        wait_for(
+            self.driver, EC.element_to_be_clickable((By.CSS_SELECTOR, PAGE_SIZE_SELECT)),
+            self.timeouts["page_size"], timer, "selector de paginación"
+        ).click()
+        options = wait_for(
+            self.driver, EC.visibility_of_all_elements_located((By.CSS_SELECTOR, "mat-option")),
+            self.timeouts["page_size_options"], timer, "opciones de paginación"
+        )
+        max(options, key=lambda o: int(re.sub(r"\D", "", o.text) or 0)).click()
+
+    def _go_to_next_page(self, driver=None):
+        """Avanza el paginador. Devuelve False si ya estaba en la última página."""
+        buttons = (driver or self.driver).find_elements(By.CSS_SELECTOR, NEXT_PAGE_BUTTON)
+        if not buttons:
+            return False
+        button = buttons[0]
+        if not button.is_enabled() or button.get_attribute("aria-disabled") == "true":
+            return False
+        button.click()
+        return True
+
+    def _iter_pages(self, card_tag, parse, timer=None, driver=None):
+        """Recorre todas las páginas de la lista actual y devuelve cada una parseada.
+
+        `driver` es el navegador a recorrer (por defecto el de la sincronización).
+        """
+        driver = driver or self.driver
+        previous_first = None
+        for page in range(1, MAX_PAGES + 1):
+            state = wait_for(
+                driver, list_ready(card_tag, previous_first),
+                self.timeouts["list"], timer, f"render página {page}"
             )
-            user_field.send_keys(PJ_USER)
-            self.driver.find_element(By.ID, "password").send_keys(PJ_PASS)
-            self.driver.find_element(By.CSS_SELECTOR, "button[type='submit']").click()
-            WebDriverWait(self.driver, 30).until(EC.url_contains("/u/inicio"))
-        except TimeoutException:
-            st.error("No se pudo iniciar sesión. Verifica tus credenciales.")
-            return
+            if timer is None:
+                yield parse(page_cards(driver, card_tag))
+            else:
+                with timer.phase(f"parseo página {page}"):
+                    df = parse(page_cards(driver, card_tag))
+                yield df
+            label = driver.find_element(By.CSS_SELECTOR, PAGINATOR_LABEL).text.strip()
+            if not state.count or not self._go_to_next_page(driver):
+                return
+            # El rango del paginador ("1 – 50 de 120" -> "51 – 100 de 120") cambia al procesar el clic;
+            # list_ready espera después a que las tarjetas de la página nueva estén completas
+            wait_for(
+                driver, paginator_label_changed(label),
+                self.timeouts["list"], timer, f"paginador página {page + 1}"
+            )
+            previous_first = state.first
+
+    # ------------------------------------------------------------------
+    # Búsqueda de expedientes: primero en la base local, después en el portal
+    # ------------------------------------------------------------------
+    def search_by_number(self, numero):
+        """Busca un expediente por número. Si ya está en la base responde sin abrir el navegador."""
+        normalizado = normalize_numero(numero)
+        if not normalizado:
+            raise ValueError("El número no tiene el formato de un expediente del portal (p. ej. J-01-00-12345-6/2020-0).")
+        local = get_db_manager().find_expediente_by_numero(normalizado)
+        if not local.empty:
+            return expedientes_to_results(local)
+        # Enlace directo al expediente en lugar de una búsqueda general
+        link = create_expediente_link(normalizado)
+        results = self._fetch_expedientes(link, f"número {normalizado}")
+        if results is None:
+            return pd.DataFrame([{
+                "Resultado": "No se pudo leer el expediente del portal",
+                "Detalles": "Ábralo directamente con el enlace.",
+                "CUIJ": normalizado,
+                "Enlace": link,
+            }], columns=JURISPRUDENCIA_COLUMNS)
+        coincidencias = results[results["CUIJ"].str.contains(normalizado, regex=False, na=False)]
+        return coincidencias if not coincidencias.empty else results
+
+    def search_by_caratula(self, texto):
+        """Busca expedientes por carátula: los propios (índice local) o, si no hay, en el portal."""
+        if not texto or not texto.strip():
+            return pd.DataFrame(columns=JURISPRUDENCIA_COLUMNS)
+        local = get_db_manager().get_expedientes(caratula=texto)
+        if not local.empty:
+            return expedientes_to_results(local)
+        results = self._fetch_expedientes(
+            f"{BASE_URL}/iol-ui/p/expedientes?identificador={quote(texto)}&tipoBusqueda=CAU", f"carátula '{texto}'"
+        )
+        return results if results is not None else pd.DataFrame(columns=JURISPRUDENCIA_COLUMNS)
 
-        self.driver.get(f"{BASE_URL}/iol-ui/u/causas?causas=1&tipoBusqueda=CAU&tituloBusqueda=Mis%20Causas")
+    def _fetch_expedientes(self, url, descripcion):
+        """Tarjetas de expedientes de una página del portal, o None si no se pudieron leer."""
+        timer = PhaseTimer(f"búsqueda por {descripcion}")
+        self.last_timings = timer
         try:
-            WebDriverWait(self.driver, 20).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "mat-select[aria-label='Registros por página:']"))
-            ).click()
-            WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//mat-option/span[contains(text(), '50')]"))
-            ).click()
-
-            time.sleep(5)
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-
-            exp_data = []
-            for t in soup.find_all('iol-expediente-tarjeta'):
-                n = t.find('p', class_='fontSizeEncabezadoCuij')
-                c = t.find('strong')
-                e = t.find('p', class_='badge')
-                fn, un, link = None, None, None
-
-                link_tag = t.find('a', class_='textColorEncabezado')
-                if link_tag and 'href' in link_tag.attrs:
-                    link = link_tag['href']
-                    if link.startswith('/'):
-                        link = BASE_URL + link
-
-                nov = t.find('p', class_='fontSizePie')
-                if nov:
-                    parts = " ".join(nov.text.strip().split()).split('|', 1)
-                    fn, un = (parts[0].strip(), parts[1].strip()) if len(parts) > 1 else (parts[0].strip(), "")
-
-                exp_data.append({
-                    "Numero": n.text.strip() if n else "N/D",
-                    "Caratula": c.text.strip() if c else "N/D",
-                    "Estado": e.text.strip() if e else "N/D",
-                    "Fecha Novedad": fn,
-                    "Última Novedad": un,
-                    "Link": link
-                })
-
-            df = pd.DataFrame(exp_data)
-            if not df.empty:
-                db_manager.sync_expedientes(df)
-                st.session_state['last_sync'] = time.strftime("%d/%m/%Y %H:%M:%S")
-                st.success(f"Se sincronizaron {len(df)} expedientes.")
+            with self._browser():
+                with timer.phase("carga página"):
+                    self.driver.get(url)
+                wait_for(self.driver, list_ready(EXPEDIENTE_CARD), self.timeouts["list"], timer, "render resultados")
+                with timer.phase("parseo"):
+                    return expedientes_to_results(parse_expediente_cards(page_cards(self.driver, EXPEDIENTE_CARD)))
         except TimeoutException:
-            st.error("Error al sincronizar: No se encontró el selector de paginación.")
+            logger.warning("El portal no mostró resultados para la búsqueda por %s.", descripcion)
+            return None
+        finally:
+            logger.info(timer.summary())
 
-    def search_on_portal(self, query):
-        """Busca jurisprudencia y devuelve DataFrame con resultados."""
-        self.driver.get(
-            f"{BASE_URL}/iol-ui/p/jurisprudencia?identificador={quote(query)}&open=false&tipoBusqueda=Actuaciones&tipoBusqueda=JUR"
-        )
+    def search_on_portal(self, query, max_age=JURISPRUDENCIA_TTL):
+        """Busca jurisprudencia y devuelve DataFrame con resultados.
+
+        Las búsquedas hechas hace menos de `max_age` segundos se responden desde
+        la base local, sin tocar el portal.
+        """
+        timer = PhaseTimer(f"búsqueda '{query}'")
+        self.last_timings = timer
+        consulta = normalize_query(query)
+        with timer.phase("caché local"):
+            cached = get_db_manager().get_cached_jurisprudencia(consulta, max_age)
+        if cached is not None:
+            logger.info(timer.summary())
+            return cached
+
+        results = self._fetch_jurisprudencia(query, timer)
+        if results is None:
+            return pd.DataFrame(columns=JURISPRUDENCIA_COLUMNS)
+        with timer.phase("guardar caché"):
+            results = get_db_manager().save_jurisprudencia(consulta, results)
+        logger.info(timer.summary())
+        return results
+
+    def _fetch_jurisprudencia(self, query, timer):
+        """Resultados del portal (API o navegador), o None si la búsqueda falló."""
+        # La jurisprudencia es pública: la API funciona aun sin sesión iniciada
+        api = get_driver_pool().authenticated_api() or PortalAPIClient()
         try:
-            WebDriverWait(self.driver, 20).until(
-                EC.element_to_be_clickable((By.CSS_SELECTOR, "mat-select[aria-label='Registros por página:']"))
-            ).click()
-            WebDriverWait(self.driver, 10).until(
-                EC.element_to_be_clickable((By.XPATH, "//mat-option/span[contains(text(), '50')]"))
-            ).click()
-
-            time.sleep(5)
-            soup = BeautifulSoup(self.driver.page_source, 'html.parser')
-
-            results = []
-            for card in soup.find_all('iol-actuacion-tarjeta'):
-                c_elem = card.find('strong')
-                n_elem = card.find('p', class_='fontSizeEncabezadoCuij')
-                c_text = c_elem.text.strip() if c_elem else "N/D"
-                n_text = n_elem.text.strip() if n_elem else None
-                link = create_expediente_link(n_text) if n_text else "#"
-                details = card.find('p', class_='actuacion-texto')
-                results.append({
-                    "Resultado": c_text,
-                    "Detalles": details.text.strip() if details else "",
-                    "Enlace": link
-                })
-
-            return pd.DataFrame(results)
-        except Exception as e:
-            st.error(f"Error en la búsqueda: {e}.")
-            return pd.DataFrame()
+            with timer.phase("API"):
+                return api.search_jurisprudencia(query)
+        except PortalAPIError as e:
+            logger.warning("API del portal no disponible (%s); se usa el navegador.", e)
+
+        with self._browser():
+            with timer.phase("carga página"):
+                self.driver.get(
+                    f"{BASE_URL}/iol-ui/p/jurisprudencia?identificador={quote(query)}&open=false&tipoBusqueda=Actuaciones&tipoBusqueda=JUR"
+                )
+            try:
+                wait_for(
+                    self.driver, EC.element_to_be_clickable((By.CSS_SELECTOR, PAGE_SIZE_SELECT)),
+                    self.timeouts["page_size"], timer, "selector de paginación"
+                ).click()
+                wait_for(
+                    self.driver, EC.element_to_be_clickable((By.XPATH, f"//mat-option/span[contains(text(), '{JURISPRUDENCIA_RESULTS}')]")),
+                    self.timeouts["page_size_options"], timer, "opciones de paginación"
+                ).click()
+                wait_for(self.driver, list_ready(ACTUACION_CARD), self.timeouts["list"], timer, "render resultados")
+
+                with timer.phase("parseo"):
+                    return parse_jurisprudencia_cards(page_cards(self.driver, ACTUACION_CARD))
+            except Exception as e:
+                st.error(f"Error en la búsqueda: {e}.")
+                return None
 
     def close(self):
-        if 'driver' in st.session_state and st.session_state.driver:
-            st.session_state.driver.quit()
-            st.session_state.driver = None
-            st.info("Sesión y navegador cerrados.")
\ No newline at end of file
+        """Cierra los navegadores del pool compartido (y con ellos la sesión del portal)."""
+        get_driver_pool().shutdown()
+        st.info("Sesión y navegador cerrados.")
\ No newline at end of file
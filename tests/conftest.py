@@ -0,0 +1,181 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import sqlalchemy as db
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(*parts):
+    with open(os.path.join(FIXTURES_DIR, *parts), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class StubPortal:
+    """Servidor local que responde como la iol-api con respuestas grabadas.
+
+    `routes` va de la ruta (p. ej. "/expedientes/lista") a la lista de páginas:
+    cada página es un dict (se devuelve como JSON) o un str (se devuelve tal cual).
+    En lugar de la lista puede ir una función que recibe el filtro y la devuelve.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                stub.requests.append((url.path, query))
+                pages = stub.routes.get(url.path)
+                if callable(pages):
+                    pages = pages(json.loads(query.get("filtro", "{}")))
+                page = int(query.get("page", 0))
+                if pages is None or page >= len(pages):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = pages[page]
+                payload = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def pages_requested(self, path):
+        return [int(q.get("page", 0)) for p, q in self.requests if p == path]
+
+
+@pytest.fixture
+def stub_portal(monkeypatch):
+    import portal_api
+
+    stub = StubPortal()
+    stub.thread.start()
+    monkeypatch.setattr(portal_api, "API_URL", stub.url)
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """Base SQLite vacía con el esquema completo, usada también por el scraper."""
+    import scraper
+    from database import DatabaseManager, init_db
+
+    engine = db.create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    init_db(engine)
+    manager = DatabaseManager(engine)
+    monkeypatch.setattr(scraper, "get_db_manager", lambda: manager)
+    return manager
+
+
+# ----------------------------------------------------------------------
+# Navegador falso con una lista de tarjetas paginada
+# ----------------------------------------------------------------------
+class FakeElement:
+    def __init__(self, text="", on_click=None, enabled=True):
+        self.text = text
+        self._on_click = on_click
+        self._enabled = enabled
+
+    def get_attribute(self, name):
+        if name == "aria-disabled":
+            return "false" if self._enabled else "true"
+        return self.text
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return self._enabled
+
+    def click(self):
+        self._on_click()
+
+
+class FakePaginatedDriver:
+    """Lista de actuaciones paginada; la página nueva se renderiza un momento después del clic.
+
+    `pages` es una lista de páginas de (descripción, fecha). Con una sola página
+    no hay paginador, como en la vista de un expediente con pocas actuaciones.
+    """
+
+    def __init__(self, pages=(), render_delay=0.15):
+        self.pages = list(pages)
+        self.page = 0
+        self.render_delay = render_delay
+        self.clicks = 0
+        self.visited = []
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        return self.visited[-1] if self.visited else "about:blank"
+
+    def get(self, url):
+        self.visited.append(url)
+        self.page = 0
+
+    def quit(self):
+        self.quit_called = True
+
+    def _cards(self):
+        return self.pages[self.page] if self.pages else []
+
+    def _label(self):
+        start = sum(len(p) for p in self.pages[:self.page])
+        total = sum(len(p) for p in self.pages)
+        return f"{start + 1} – {start + len(self._cards())} de {total}"
+
+    def _next(self):
+        self.clicks += 1
+        threading.Timer(self.render_delay, lambda: setattr(self, "page", self.page + 1)).start()
+
+    def find_element(self, by, selector):
+        from selenium.common.exceptions import NoSuchElementException
+
+        from waits import PAGINATOR_LABEL
+
+        if selector == PAGINATOR_LABEL:
+            return FakeElement(self._label())
+        elements = self.find_elements(by, selector)
+        if not elements:
+            raise NoSuchElementException(selector)
+        return elements[0]
+
+    def find_elements(self, by, selector):
+        from selenium.webdriver.common.by import By
+
+        from scraper import NEXT_PAGE_BUTTON
+        from waits import PAGINATOR_LABEL
+
+        if by == By.TAG_NAME:
+            return [FakeElement(f"{d} {f}") for d, f in self._cards()]
+        if selector == PAGINATOR_LABEL:
+            return [FakeElement(self._label())] if len(self.pages) > 1 else []
+        if selector == NEXT_PAGE_BUTTON:
+            return [FakeElement(on_click=self._next, enabled=self.page + 1 < len(self.pages))]
+        return []  # spinners
+
+    def execute_script(self, script, tag):
+        return "".join(f"<{tag}><strong>{d}</strong> {f}</{tag}>" for d, f in self._cards())
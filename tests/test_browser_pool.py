@@ -0,0 +1,97 @@
+import threading
+import time
+
+from browser_pool import DriverPool
+
+
+class FakeDriver:
+    def __init__(self, hang=0.0):
+        self.hang = hang
+        self.quit_called = False
+
+    @property
+    def current_url(self):
+        time.sleep(self.hang)  # un navegador colgado tarda en responder
+        return "about:blank"
+
+    def quit(self):
+        self.quit_called = True
+
+
+def test_hung_driver_does_not_block_other_checkouts():
+    pool = DriverPool(max_size=3, factory=FakeDriver)
+    hung = pool.checkout()
+    hung.driver.hang = 0  # se devuelve sano
+    pool.checkin(hung)
+    hung.driver.hang = 1.0  # y se cuelga estando ocioso
+
+    first = {}
+    slow = threading.Thread(target=lambda: first.setdefault("pooled", pool.checkout()))
+    slow.start()
+    time.sleep(0.1)  # el primer checkout ya está revisando el navegador colgado
+
+    started = time.monotonic()
+    other = pool.checkout(timeout=5)
+    assert time.monotonic() - started < 0.5
+    assert other is not hung
+
+    slow.join()
+    assert first["pooled"] is hung
+    assert pool.stats()["in_use"] == 2
+
+
+def test_unhealthy_idle_driver_is_replaced():
+    class DeadDriver(FakeDriver):
+        @property
+        def current_url(self):
+            from selenium.common.exceptions import WebDriverException
+
+            raise WebDriverException("sin sesión")
+
+    drivers = iter([DeadDriver(), FakeDriver()])
+    pool = DriverPool(max_size=1, factory=lambda: next(drivers))
+    dead = pool.checkout()
+    pool._in_use.discard(dead)
+    pool._idle.append(dead)
+
+    pooled = pool.checkout(timeout=1)
+
+    assert isinstance(pooled.driver, FakeDriver) and not isinstance(pooled.driver, DeadDriver)
+    assert dead.driver.quit_called
+    assert pool.stats() == {"idle": 0, "in_use": 1, "max_size": 1}
+
+
+def test_expired_idle_drivers_are_closed_outside_the_lock():
+    pool = DriverPool(max_size=2, idle_timeout=0, factory=FakeDriver)
+    old = pool.checkout()
+    pool.checkin(old)
+    time.sleep(0.01)
+
+    pooled = pool.checkout()
+
+    assert pooled is not old
+    assert old.driver.quit_called
+
+
+def test_idle_drivers_are_closed_without_another_checkout():
+    pool = DriverPool(max_size=2, idle_timeout=0.2, factory=FakeDriver, reap_interval=0.05)
+    pooled = pool.checkout()
+    pool.checkin(pooled)
+
+    time.sleep(0.5)
+
+    assert pooled.driver.quit_called
+    assert pool.stats()["idle"] == 0
+    pool.shutdown()
+
+
+def test_checkin_closes_expired_idle_drivers():
+    pool = DriverPool(max_size=2, idle_timeout=0.1, factory=FakeDriver, reap_interval=60)
+    first, second = pool.checkout(), pool.checkout()
+    pool.checkin(first)
+    time.sleep(0.2)
+
+    pool.checkin(second)
+
+    assert first.driver.quit_called and not second.driver.quit_called
+    assert pool.stats()["idle"] == 1
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from data_cache import CachedDatabase
+
+
+def test_jurisprudencia_search_is_cached_until_the_table_changes(manager, monkeypatch):
+    calls = []
+    search = manager.search_jurisprudencia
+    monkeypatch.setattr(manager, "search_jurisprudencia", lambda **kw: calls.append(kw) or search(**kw))
+    data = CachedDatabase(manager)
+    manager.save_jurisprudencia("amparo", pd.DataFrame([{
+        "Resultado": "AMPARO AMBIENTAL", "Detalles": "Se hace lugar", "CUIJ": "J-01-00-38977-0/2023-0", "Enlace": "#",
+    }]))
+
+    primera = data.query("search_jurisprudencia", texto="amparo")
+    # Un rerun con el mismo texto no vuelve a consultar la base
+    assert data.query("search_jurisprudencia", texto="amparo") is primera
+    assert len(calls) == 1 and len(primera) == 1
+
+    data.bump("expedientes", "movimientos")
+    data.query("search_jurisprudencia", texto="amparo")
+    assert len(calls) == 1
+
+    data.bump("jurisprudencia")
+    data.query("search_jurisprudencia", texto="amparo")
+    assert len(calls) == 2
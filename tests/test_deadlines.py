@@ -0,0 +1,57 @@
+from datetime import date
+
+import pandas as pd
+
+from deadlines import anios_cubiertos, compute_deadlines
+
+
+def tareas(*fechas):
+    return pd.DataFrame({"fecha_vencimiento": list(fechas)})
+
+
+def test_january_feria_is_not_business_days():
+    df = compute_deadlines(tareas(date(2027, 1, 15), date(2027, 2, 5)), hoy=date(2026, 12, 28))
+
+    # 29, 30 y 31/12; el 1/1 es feriado y enero es feria
+    assert df["dias_habiles"].tolist() == [3, 8]
+    assert df["bucket"].tolist() == ["proxima", "posterior"]
+
+
+def test_dates_outside_calendar_are_flagged():
+    primero, ultimo = anios_cubiertos()
+    df = compute_deadlines(
+        tareas(date(ultimo, 6, 1), date(ultimo + 1, 3, 1), date(primero - 1, 12, 1), None),
+        hoy=date(ultimo, 1, 5),
+    )
+
+    assert df["fuera_de_calendario"].tolist() == [False, True, True, False]
+
+
+def test_today_outside_calendar_flags_everything():
+    _, ultimo = anios_cubiertos()
+    df = compute_deadlines(tareas(date(ultimo + 1, 3, 1)), hoy=date(ultimo + 1, 2, 1))
+
+    assert df["fuera_de_calendario"].all()
+
+
+def test_empty_calendar_flags_every_dated_task(tmp_path, monkeypatch):
+    import deadlines
+
+    vacio = tmp_path / "feriados.json"
+    vacio.write_text("{}", encoding="utf-8")
+    assert anios_cubiertos(str(vacio)) is None
+    monkeypatch.setattr(deadlines, "anios_cubiertos", lambda: None)
+
+    df = compute_deadlines(tareas(date(2026, 11, 2), None), hoy=date(2026, 10, 30))
+
+    assert df["fuera_de_calendario"].tolist() == [True, False]
+
+
+def test_agenda_keeps_tasks_without_date(manager):
+    for descripcion, vence in (("Alegato", date(2026, 11, 2)), ("Revisar", None), ("Apelar", date(2027, 3, 1))):
+        manager.add_item("tareas", {"descripcion": descripcion, "fecha_vencimiento": vence, "completada": False})
+
+    pendientes = manager.get_tareas_pendientes(hasta=date(2026, 11, 30))
+    df = compute_deadlines(pendientes, hoy=date(2026, 10, 30))
+
+    assert dict(zip(df["descripcion"], df["bucket"].astype(str))) == {"Revisar": "sin_fecha", "Alegato": "proxima"}
@@ -0,0 +1,72 @@
+import sqlalchemy as db
+
+import migrations
+from migrations import SEARCH_TABLE, MigrationPending, applied_versions, run_migrations
+
+
+def indexados(manager):
+    with manager.engine.connect() as conn:
+        return sorted(conn.execute(db.text(
+            f"SELECT ref, titulo FROM {SEARCH_TABLE} WHERE tipo = 'expediente'"
+        )).fetchall())
+
+
+def test_search_index_survives_vacuum(manager):
+    with manager.engine.begin() as conn:
+        for numero in ("A", "B", "C"):
+            conn.execute(
+                db.text("INSERT INTO expedientes (numero, caratula) VALUES (:n, :c)"),
+                {"n": numero, "c": f"ACTOR {numero} CONTRA GCBA"},
+            )
+        conn.execute(db.text("DELETE FROM expedientes WHERE numero = 'A'"))
+    # VACUUM puede renumerar el rowid implícito de expedientes (clave de texto)
+    with manager.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(db.text("VACUUM"))
+
+    manager.update_ficha_expediente("C", {"observaciones": "MEDIDA CAUTELAR"})
+    with manager.engine.begin() as conn:
+        conn.execute(db.text("UPDATE expedientes SET caratula = 'OTRO ACTOR CONTRA GCBA' WHERE numero = 'B'"))
+
+    assert indexados(manager) == [("B", "OTRO ACTOR CONTRA GCBA"), ("C", "ACTOR C CONTRA GCBA")]
+    assert manager.search("cautelar")["expediente_numero"].tolist() == ["C"]
+    assert manager.search("actor b").empty
+
+
+def test_rekey_replaces_rowid_based_entries(manager):
+    with manager.engine.begin() as conn:
+        conn.execute(db.text("INSERT INTO expedientes (numero, caratula) VALUES ('A', 'ACTOR A CONTRA GCBA')"))
+        # Como lo dejaba la versión anterior de la migración 4: rowid implícito como clave
+        conn.execute(db.text(f"DELETE FROM {SEARCH_TABLE} WHERE tipo = 'expediente'"))
+        conn.execute(db.text(
+            f"INSERT INTO {SEARCH_TABLE} (rowid, tipo, ref, expediente_numero, titulo) "
+            "SELECT rowid * 4 + 1, 'expediente', rowid, numero, caratula FROM expedientes"
+        ))
+        migrations._rekey_search_expedientes(conn)
+
+    assert indexados(manager) == [("A", "ACTOR A CONTRA GCBA")]
+
+
+def test_pending_migration_is_retried(tmp_path, monkeypatch):
+    engine = db.create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    disponible = {"fts": False}
+
+    def paso(conn):
+        if not disponible["fts"]:
+            raise MigrationPending("FTS5 no disponible")
+        conn.execute(db.text("CREATE TABLE dos (x INTEGER)"))
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [
+        (1, "uno", ["CREATE TABLE uno (x INTEGER)"]),
+        (2, "dos", [paso]),
+        (3, "tres", ["CREATE TABLE tres (x INTEGER)"]),
+    ])
+
+    assert run_migrations(engine) == 3
+    with engine.connect() as conn:
+        assert applied_versions(conn) == {1, 3}
+
+    disponible["fts"] = True
+    run_migrations(engine)
+    with engine.connect() as conn:
+        assert applied_versions(conn) == {1, 2, 3}
+        assert "dos" in db.inspect(conn).get_table_names()
@@ -0,0 +1,142 @@
+import json
+from datetime import date
+
+import pytest
+import sqlalchemy as db
+
+import scraper
+from browser_pool import DriverPool
+from conftest import FakePaginatedDriver
+from database import ORIGEN_MANUAL, ORIGEN_PORTAL
+from portal_api import ENDPOINTS
+from scraper import Scraper
+
+ACTUACIONES = ENDPOINTS["actuaciones"]
+LINK_B = "https://eje.juscaba.gob.ar/iol-ui/p/expedientes?identificador=B"
+
+
+class FakePortalDriver(FakePaginatedDriver):
+    """Cada enlace muestra sus propias actuaciones (`sites`: enlace -> páginas)."""
+
+    def __init__(self, sites):
+        super().__init__(render_delay=0.05)
+        self.sites = sites
+
+    def get(self, url):
+        super().get(url)
+        self.pages = self.sites[url]
+
+
+@pytest.fixture
+def expedientes(manager):
+    with manager.engine.begin() as conn:
+        for numero, link in (("A", None), ("B", LINK_B), ("C", None)):
+            conn.execute(
+                db.text("INSERT INTO expedientes (numero, link_portal) VALUES (:n, :l)"), {"n": numero, "l": link}
+            )
+    return manager
+
+
+@pytest.fixture
+def portal(stub_portal, monkeypatch):
+    """API con las actuaciones de `stub_portal.actuaciones` (numero -> filas) y navegadores falsos para el DOM."""
+    stub_portal.actuaciones = {}
+    stub_portal.sites = {}
+
+    def actuaciones(filtro):
+        items = stub_portal.actuaciones.get(filtro["identificador"])
+        return None if items is None else [{"content": items, "last": True}]
+
+    stub_portal.routes[ACTUACIONES] = actuaciones
+    pool = DriverPool(max_size=2, factory=lambda: FakePortalDriver(stub_portal.sites))
+    monkeypatch.setattr(scraper, "get_driver_pool", lambda: pool)
+    return stub_portal
+
+
+def harvest(numeros=()):
+    return Scraper({"list": 3}).harvest_movimientos(numeros, workers=2)
+
+
+def movimientos(manager):
+    with manager.engine.connect() as conn:
+        return conn.execute(db.text(
+            "SELECT expediente_numero, fecha, descripcion, origen FROM movimientos ORDER BY 1, 2"
+        )).fetchall()
+
+
+def revisados(manager):
+    with manager.engine.connect() as conn:
+        return {r.numero for r in conn.execute(db.text(
+            "SELECT numero FROM expedientes WHERE movimientos_revisados_en IS NOT NULL"
+        ))}
+
+
+def consultados(portal):
+    return sorted(json.loads(q["filtro"])["identificador"] for p, q in portal.requests if p == ACTUACIONES)
+
+
+def test_harvest_uses_api_and_falls_back_to_dom(expedientes, portal):
+    portal.actuaciones["A"] = [
+        {"fecha": "2026-10-05", "descripcion": "PROVEIDO"},
+        {"fecha": "2026-10-01", "descripcion": "CEDULA"},
+    ]
+    # B no está en la API: se lee del DOM, con dos páginas; C no tiene enlace y falla
+    portal.sites[LINK_B] = [[("OFICIO", "03/10/2026")], [("DEMANDA", "30/09/2026")]]
+
+    assert harvest() == 4
+
+    assert movimientos(expedientes) == [
+        ("A", "2026-10-01", "CEDULA", ORIGEN_PORTAL),
+        ("A", "2026-10-05", "PROVEIDO", ORIGEN_PORTAL),
+        ("B", "2026-09-30", "DEMANDA", ORIGEN_PORTAL),
+        ("B", "2026-10-03", "OFICIO", ORIGEN_PORTAL),
+    ]
+    # C falló: queda pendiente para la próxima sincronización
+    assert revisados(expedientes) == {"A", "B"}
+
+
+def test_checked_cases_without_actuaciones_are_not_refetched(expedientes, portal):
+    portal.actuaciones.update(A=[], B=[], C=[])
+
+    assert harvest() == 0
+    assert consultados(portal) == ["A", "B", "C"]
+    assert revisados(expedientes) == {"A", "B", "C"}
+
+    # Sin novedades no se vuelve a consultar ninguno; con novedad, solo ese
+    assert harvest() == 0
+    assert harvest(["B"]) == 0
+    assert consultados(portal) == ["A", "B", "B", "C"]
+
+
+def test_manual_movimiento_does_not_block_harvest(expedientes, portal):
+    # Un movimiento manual más nuevo que las actuaciones del portal que faltan traer
+    expedientes.add_item("movimientos", {"expediente_numero": "A", "fecha": date(2026, 10, 10), "descripcion": "Nota"})
+    portal.actuaciones.update(A=[
+        {"fecha": "2026-10-05", "descripcion": "PROVEIDO"},
+        {"fecha": "2026-10-01", "descripcion": "CEDULA"},
+    ], B=[], C=[])
+
+    assert expedientes.get_latest_movimientos() == {}
+    assert harvest() == 2
+    assert expedientes.get_latest_movimientos() == {"A": (date(2026, 10, 5), {"PROVEIDO"})}
+    assert [r.origen for r in movimientos(expedientes)] == [ORIGEN_PORTAL, ORIGEN_PORTAL, ORIGEN_MANUAL]
+    # Con novedad se vuelve a leer y se corta en la primera ya guardada
+    assert harvest(["A"]) == 0
+
+
+def test_legacy_movimientos_are_claimed_not_duplicated(expedientes, portal):
+    # Guardado antes de la migración 8: sin origen
+    with expedientes.engine.begin() as conn:
+        conn.execute(db.text(
+            "INSERT INTO movimientos (expediente_numero, fecha, descripcion) VALUES ('C', '2026-09-01', 'PROVEIDO')"
+        ))
+    portal.actuaciones.update(A=[], B=[], C=[
+        {"fecha": "2026-09-02", "descripcion": "CEDULA"},
+        {"fecha": "2026-09-01", "descripcion": "PROVEIDO"},
+    ])
+
+    assert harvest() == 1
+    assert movimientos(expedientes) == [
+        ("C", "2026-09-01", "PROVEIDO", ORIGEN_PORTAL),
+        ("C", "2026-09-02", "CEDULA", ORIGEN_PORTAL),
+    ]
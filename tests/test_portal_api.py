@@ -0,0 +1,183 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+import portal_api
+from conftest import load_fixture
+from parsing import parse_expediente_cards
+from portal_api import (
+    ENDPOINTS, PortalAPIClient, PortalAPIError, actuaciones_to_rows, causas_to_frame, jurisprudencia_to_frame,
+)
+from utils import JURISPRUDENCIA_COLUMNS, create_expediente_link
+
+CAUSAS = ENDPOINTS["causas"]
+JURISPRUDENCIA = ENDPOINTS["jurisprudencia"]
+ACTUACIONES = ENDPOINTS["actuaciones"]
+
+
+def fixture(name):
+    return load_fixture("portal_api", name)
+
+
+# ----------------------------------------------------------------------
+# Conversión del JSON a los DataFrames del scraper
+# ----------------------------------------------------------------------
+def test_causas_to_frame():
+    df = causas_to_frame(fixture("causas_page0.json")["content"] + fixture("causas_page1.json")["content"])
+
+    assert list(df.columns) == ["Numero", "Caratula", "Estado", "Fecha Novedad", "Última Novedad", "Link", "Radicación"]
+    assert df["Numero"].tolist() == ["J-01-00-86387-0/2023-1", "J-01-00-82226-6/2015-2", "J-01-00-23507-9/2024-1"]
+    assert df["Estado"].tolist() == ["En letra", "Archivado", "A despacho"]
+    assert df.loc[1, "Fecha Novedad"] == "30/09/2024"
+    assert df.loc[1, "Última Novedad"] == "ARCHIVO"
+    assert df.loc[2, "Fecha Novedad"] is None and df.loc[2, "Última Novedad"] == ""
+    assert df.loc[0, "Radicación"] == "Juzgado CAyT N° 3 | Secretaría N° 6"
+    assert df.loc[1, "Radicación"] == "Juzgado CAyT N° 11"
+    assert df.loc[2, "Radicación"] is None
+    assert df["Link"].tolist() == [create_expediente_link(n) for n in df["Numero"]]
+
+
+def test_causas_link_matches_dom_cards():
+    """La API y las tarjetas deben guardar el mismo enlace, o cada cambio de backend marca todo como modificado."""
+    item = fixture("causas_page0.json")["content"][0]
+    card = f"""
+        <iol-expediente-tarjeta>
+          <a class="textColorEncabezado" href="/iol-ui/p/expedientes?identificador={item['cuij']}&amp;tipoBusqueda=CAU">
+            <p class="fontSizeEncabezadoCuij">{item['cuij']}</p>
+          </a>
+          <strong>{item['caratula']}</strong>
+        </iol-expediente-tarjeta>
+    """
+    api = causas_to_frame([item])
+    for backend in ("lxml", "strainer", "html.parser"):
+        dom = parse_expediente_cards(card, backend)
+        assert dom.loc[0, "Link"] == api.loc[0, "Link"]
+
+
+def test_causas_to_frame_empty():
+    df = causas_to_frame([])
+    assert df.empty
+    assert "Link" in df.columns
+
+
+def test_jurisprudencia_to_frame():
+    df = jurisprudencia_to_frame(fixture("jurisprudencia.json")["content"])
+
+    assert list(df.columns) == JURISPRUDENCIA_COLUMNS
+    assert df.loc[0, "Resultado"] == "ASOCIACION CIVIL CONTRA GCBA SOBRE AMPARO - AMBIENTAL"
+    assert df.loc[0, "Detalles"] == "Se hace lugar a la medida cautelar solicitada."
+    assert df.loc[0, "Enlace"] == create_expediente_link("J-01-00-38977-0/2023-0")
+    # Sin número: sin CUIJ y con el enlace vacío de las tarjetas
+    assert df.loc[1, "Resultado"] == "SENTENCIA DEFINITIVA"
+    assert df.loc[1, "CUIJ"] is None
+    assert df.loc[1, "Enlace"] == "#"
+
+
+def test_actuaciones_to_rows():
+    rows = actuaciones_to_rows(fixture("actuaciones.json")["content"])
+
+    # Las que no tienen fecha legible o descripción se descartan
+    assert [r["descripcion"] for r in rows] == ["PROVEIDO SIMPLE", "CEDULA DE NOTIFICACION"]
+    assert rows[1]["fecha"] == date(2024, 9, 30)
+    assert all(isinstance(r["fecha"], date) for r in rows)
+
+
+# ----------------------------------------------------------------------
+# Paginado y errores contra el servidor local
+# ----------------------------------------------------------------------
+def test_iter_causas_follows_pages_until_last(stub_portal):
+    stub_portal.routes[CAUSAS] = [fixture("causas_page0.json"), fixture("causas_page1.json")]
+    client = PortalAPIClient(token="t")
+
+    frames = list(client.iter_causas())
+
+    assert [len(f) for f in frames] == [2, 1]
+    assert stub_portal.pages_requested(CAUSAS) == [0, 1]
+    path, query = stub_portal.requests[0]
+    assert query["size"] == str(portal_api.PAGE_SIZE)
+
+
+def test_iter_pages_stops_at_total_pages(stub_portal):
+    # Sin "last": corta con totalPages aunque el servidor tenga más páginas
+    page = {"content": [{"fecha": "2024-10-01", "descripcion": "PROVEIDO"}], "totalPages": 2}
+    stub_portal.routes[ACTUACIONES] = [page, page, page]
+
+    pages = list(PortalAPIClient().iter_actuaciones("J-01-00-86387-0/2023-1"))
+
+    assert len(pages) == 2
+    assert stub_portal.pages_requested(ACTUACIONES) == [0, 1]
+
+
+def test_iter_pages_stops_on_empty_page(stub_portal):
+    # Ni "last" ni totalPages: termina en la primera página vacía
+    stub_portal.routes[ACTUACIONES] = [fixture("actuaciones.json") | {"last": None, "totalPages": None}, {"content": []}]
+
+    pages = list(PortalAPIClient().iter_actuaciones("J-01-00-86387-0/2023-1"))
+
+    assert [len(p) for p in pages] == [2, 0]
+    assert stub_portal.pages_requested(ACTUACIONES) == [0, 1]
+
+
+def test_iter_pages_respects_max_pages(stub_portal, monkeypatch):
+    monkeypatch.setattr(portal_api, "MAX_PAGES", 3)
+    stub_portal.routes[ACTUACIONES] = [{"content": [{"fecha": "2024-10-01", "descripcion": "PROVEIDO"}]}] * 5
+
+    pages = list(PortalAPIClient().iter_actuaciones("J-01-00-86387-0/2023-1"))
+
+    assert len(pages) == 3
+
+
+def test_search_jurisprudencia_fetches_one_page(stub_portal):
+    # Igual que el navegador: solo los primeros resultados, aunque la API tenga más páginas
+    item = fixture("jurisprudencia.json")["content"][0]
+    page = {"content": [item] * (portal_api.JURISPRUDENCIA_RESULTS + 10), "totalPages": 3, "last": False}
+    stub_portal.routes[JURISPRUDENCIA] = [page, page, page]
+
+    df = PortalAPIClient().search_jurisprudencia("amparo")
+
+    assert len(df) == portal_api.JURISPRUDENCIA_RESULTS
+    assert stub_portal.pages_requested(JURISPRUDENCIA) == [0]
+    path, query = stub_portal.requests[0]
+    assert query["size"] == str(portal_api.JURISPRUDENCIA_RESULTS)
+
+
+def test_malformed_payload_raises(stub_portal):
+    stub_portal.routes[CAUSAS] = [fixture("malformed.json")]
+
+    with pytest.raises(PortalAPIError, match="formato inesperado"):
+        list(PortalAPIClient(token="t").iter_causas())
+
+
+def test_malformed_page_after_valid_page_raises(stub_portal):
+    stub_portal.routes[CAUSAS] = [fixture("causas_page0.json"), fixture("malformed.json")]
+
+    with pytest.raises(PortalAPIError):
+        list(PortalAPIClient(token="t").iter_causas())
+
+
+def test_non_json_response_raises(stub_portal):
+    stub_portal.routes[JURISPRUDENCIA] = ["<html>Mantenimiento</html>"]
+
+    with pytest.raises(PortalAPIError):
+        PortalAPIClient().search_jurisprudencia("amparo")
+
+
+def test_http_error_raises(stub_portal):
+    with pytest.raises(PortalAPIError):
+        list(PortalAPIClient(token="t").iter_causas())
+
+
+def test_iter_causas_requires_session():
+    with pytest.raises(PortalAPIError, match="sesión"):
+        list(PortalAPIClient().iter_causas())
+
+
+def test_search_jurisprudencia_without_results(stub_portal):
+    stub_portal.routes[JURISPRUDENCIA] = [{"content": [], "totalPages": 0, "last": True}]
+
+    df = PortalAPIClient().search_jurisprudencia("nada")
+
+    assert df.empty
+    assert list(df.columns) == JURISPRUDENCIA_COLUMNS
+    pd.testing.assert_frame_equal(df, jurisprudencia_to_frame([]))
@@ -0,0 +1,21 @@
+from conftest import FakePaginatedDriver
+from parsing import ACTUACION_CARD, parse_actuacion_rows
+from scraper import Scraper
+
+TIMEOUTS = {"list": 3}
+
+
+def test_iter_pages_waits_for_each_page():
+    pages = [
+        [("PROVEIDO", "05/10/2026"), ("CEDULA", "04/10/2026")],
+        [("OFICIO", "01/10/2026"), ("DEMANDA", "30/09/2026")],
+        [("INICIO", "29/09/2026")],
+    ]
+    driver = FakePaginatedDriver(pages)
+
+    rows = list(Scraper(TIMEOUTS)._iter_pages(ACTUACION_CARD, parse_actuacion_rows, driver=driver))
+
+    assert [[r["descripcion"] for r in page] for page in rows] == [
+        ["PROVEIDO", "CEDULA"], ["OFICIO", "DEMANDA"], ["INICIO"],
+    ]
+    assert driver.clicks == 2
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+
+import scraper
+from browser_pool import DriverPool
+from conftest import FakePaginatedDriver
+from portal_api import PortalAPIError
+from scraper import Scraper
+
+A, B, C = "J-01-00-00001-1/2026-0", "J-01-00-00002-2/2026-0", "J-01-00-00003-3/2026-0"
+
+
+def causas(*numeros, novedad="PROVEIDO"):
+    return pd.DataFrame({
+        "Numero": list(numeros),
+        "Caratula": [f"ACTOR {n} CONTRA GCBA SOBRE AMPARO" for n in numeros],
+        "Estado": "En letra",
+        "Fecha Novedad": "01/10/2026",
+        "Última Novedad": novedad,
+        "Link": None,
+    })
+
+
+@pytest.fixture
+def portal(monkeypatch):
+    """Login y navegador falsos; `portal.api` y `portal.dom` son las páginas de cada recorrido."""
+    portal = type("Portal", (), {"api": [], "dom": []})()
+
+    class FakeAPI:
+        @classmethod
+        def from_driver(cls, driver):
+            return cls()
+
+        def iter_causas(self):
+            yield from portal.api
+            raise PortalAPIError("página 2: respuesta con formato inesperado")
+
+    pool = DriverPool(max_size=1, factory=FakePaginatedDriver)
+    monkeypatch.setattr(scraper, "get_secret", lambda name, default=None: "usuario")
+    monkeypatch.setattr(scraper, "get_driver_pool", lambda: pool)
+    monkeypatch.setattr(scraper, "PortalAPIClient", FakeAPI)
+    monkeypatch.setattr(Scraper, "_login", lambda self, pooled, user, password, timer: None)
+    monkeypatch.setattr(Scraper, "_select_largest_page_size", lambda self, timer=None: None)
+    monkeypatch.setattr(Scraper, "_iter_pages", lambda self, card_tag, parse, timer=None, driver=None: iter(portal.dom))
+    return portal
+
+
+def test_fallback_does_not_double_count(manager, portal):
+    manager.sync_expedientes(causas(C))
+    # La API escribe una página y falla en la segunda; el DOM recorre todo de nuevo
+    portal.api = [causas(A, B)]
+    portal.dom = [causas(A, B), causas(C, novedad="CEDULA")]
+
+    totals = Scraper().sync_portfolio()
+
+    assert totals["synced"] == 3
+    assert (totals["inserted"], totals["updated"], totals["unchanged"]) == (2, 1, 0)
+    assert totals["inserted"] + totals["updated"] + totals["unchanged"] == totals["synced"]
+    assert totals["pages"] == 2
+    assert totals["novedades"] == {A, B, C}
+
+
+def test_progress_totals_stay_consistent(manager, portal):
+    portal.api = [causas(A), causas(B)]
+    portal.dom = [causas(A), causas(B)]
+    reports = []
+
+    totals = Scraper().sync_portfolio(lambda t: reports.append((t["synced"], t["inserted"], t["unchanged"])))
+
+    # Después del fallback el progreso vuelve a empezar, sin sumar lo que ya contó la API
+    assert reports == [(1, 1, 0), (2, 2, 0), (1, 1, 0), (2, 2, 0)]
+    assert (totals["synced"], totals["inserted"], totals["updated"], totals["unchanged"]) == (2, 2, 0, 0)
@@ -0,0 +1,72 @@
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Con GESTOR_PROFILE_STARTUP=1 la app muestra y registra los tiempos de arranque
+PROFILE_ENV = "GESTOR_PROFILE_STARTUP"
+
+
+def startup_profile_enabled():
+    return os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "si", "sí")
+
+
+class PhaseTimer:
+    """Acumula la duración de cada fase y la registra en el log."""
+
+    def __init__(self, name):
+        self.name = name
+        self.phases = []
+
+    @contextmanager
+    def phase(self, label):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases.append((label, elapsed))
+            logger.info("%s | %s: %.2fs", self.name, label, elapsed)
+
+    @property
+    def total(self):
+        return sum(elapsed for _, elapsed in self.phases)
+
+    def summary(self):
+        parts = ", ".join(f"{label} {elapsed:.2f}s" for label, elapsed in self.phases)
+        return f"{self.name}: {self.total:.2f}s ({parts})"
+
+
+# Módulos en el orden en que los importa app2.py; el scraper va aparte porque se carga al usarlo
+STARTUP_MODULES = [
+    "streamlit", "pandas", "sqlalchemy",
+    "database", "browser_pool", "jobs", "data_cache", "utils", "reports", "dossiers",
+]
+LAZY_MODULES = ["scraper"]
+
+
+def profile_startup():
+    """Mide cuánto tarda cada import del arranque y la inicialización de la base."""
+    import importlib
+
+    timer = PhaseTimer("perfil de arranque")
+    for name in STARTUP_MODULES:
+        with timer.phase(f"import {name}"):
+            importlib.import_module(name)
+    with timer.phase("base de datos (motor + esquema)"):
+        importlib.import_module("database").get_db_manager()
+    lazy = PhaseTimer("carga diferida")
+    for name in LAZY_MODULES:
+        with lazy.phase(f"import {name}"):
+            importlib.import_module(name)
+    return timer, lazy
+
+
+if __name__ == "__main__":
+    # python timing.py  -> tiempos de import e inicialización, fuera de Streamlit
+    for t in profile_startup():
+        for label, elapsed in t.phases:
+            print(f"{t.name:20} {label:35} {elapsed * 1000:8.1f} ms")
+        print(f"{t.name:20} {'total':35} {t.total * 1000:8.1f} ms")
@@ -1,18 +1,137 @@
+import logging
+import os
 import re
+from functools import lru_cache
 from urllib.parse import quote
 import pandas as pd
 import json
+import unicodedata
+
+from reports import render_report
 
 BASE_URL = "https://eje.juscaba.gob.ar"
+# Columnas de los resultados de búsqueda en el portal (API, navegador y caché local)
+JURISPRUDENCIA_COLUMNS = ["Resultado", "Detalles", "CUIJ", "Enlace"]
+
+logger = logging.getLogger(__name__)
+
+JUZGADOS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'juzgados_data.json')
+
+# ----------------------------------------------------------------------
+# Secretos de Streamlit (secrets.toml)
+# ----------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def secrets_available():
+    """True si hay un secrets.toml válido (se revisa una sola vez por proceso).
+
+    Leer `st.secrets` sin archivo muestra un st.error, y dentro de un
+    cache_resource ese mensaje se repite en cada rerun.
+    """
+    import streamlit as st
+
+    try:
+        return st.secrets.load_if_toml_exists()
+    except Exception as e:
+        logger.error("No se pudo leer secrets.toml: %s", e)
+        return False
+
+
+def get_secret(name, default=None):
+    """Valor de secrets.toml, o `default` si no está o no hay archivo (sin llamadas a st.*)."""
+    if not secrets_available():
+        return default
+    import streamlit as st
+
+    return st.secrets.get(name, default)
+
 
 # --- NUEVA FUNCIÓN ---
 def load_juzgados_data():
-    """Carga los datos de los juzgados desde el archivo JSON."""
+    """Lista de juzgados de data/juzgados_data.json (leída una sola vez por proceso)."""
+    return get_juzgados_directory().juzgados
+
+# Número de juzgado o de secretaría dentro de un texto ya normalizado (sin acentos ni "°")
+JUZGADO_NUM_RE = r'juzgado[^|]*?\b(?:n|nro|numero)?\s*\.?\s*(\d{1,2})\b'
+SECRETARIA_NUM_RE = r'secretaria[^|]*?\b(?:n|nro|numero)?\s*\.?\s*(\d{1,2})\b'
+
+class JuzgadosDirectory:
+    """Juzgados y secretarías indexados por número, nombre y juez/a."""
+
+    def __init__(self, juzgados):
+        self.juzgados = juzgados
+        self.por_nombre = {j['nombre']: j for j in juzgados}
+        self.por_numero = {}
+        # Las secretarías se numeran en todo el fuero: cada número pertenece a un solo juzgado
+        self.secretarias = {}
+        for juzgado in juzgados:
+            numero = re.search(r'(\d+)\s*$', juzgado['nombre'])
+            if numero:
+                self.por_numero[int(numero.group(1))] = juzgado
+            for secretaria in juzgado.get('secretarias', []):
+                numero = re.search(r'(\d+)\s*$', secretaria['nombre'])
+                if numero:
+                    self.secretarias[int(numero.group(1))] = (juzgado, secretaria)
+        self._jueces = [(normalize_query(j.get('juez', '')), j) for j in juzgados]
+
+    def juzgado(self, numero):
+        return self.por_numero.get(int(numero))
+
+    def secretaria(self, numero):
+        """(juzgado, secretaría) de la secretaría con ese número, o (None, None)."""
+        return self.secretarias.get(int(numero), (None, None))
+
+    def secretarias_de(self, juzgado_nombre):
+        """Nombres de las secretarías del juzgado ([] si no está en el directorio)."""
+        juzgado = self.por_nombre.get(juzgado_nombre) or {}
+        return [s['nombre'] for s in juzgado.get('secretarias', [])]
+
+    def por_juez(self, texto):
+        """Juzgados cuyo juez/a contiene `texto` (sin distinguir acentos ni mayúsculas)."""
+        texto = normalize_query(texto)
+        return [j for nombre, j in self._jueces if texto and texto in nombre]
+
+    def info(self, juzgado_nombre, secretaria_nombre=None):
+        """Juez, dirección, email y secretario/a para la ficha del expediente."""
+        juzgado = self.por_nombre.get(juzgado_nombre)
+        if not juzgado:
+            return {}
+        secretaria = next((s for s in juzgado.get('secretarias', []) if s.get('nombre') == secretaria_nombre), {})
+        return {
+            "juez": juzgado.get("juez", ""),
+            "direccion": juzgado.get("direccion", ""),
+            "email": juzgado.get("email", ""),
+            "secretario": secretaria.get("secretario", ""),
+        }
+
+    def resolve(self, radicaciones):
+        """Juzgado y secretaría de cada texto de radicación del portal (p. ej. "Juzgado CAyT N° 5 - Secretaría N° 9").
+
+        Devuelve un DataFrame con 'juzgado_nombre' y 'secretaria_nombre' (None si no se reconoce).
+        Si el texto solo menciona la secretaría, el juzgado se deduce de ella.
+        """
+        textos = pd.Series(radicaciones, dtype=object).reset_index(drop=True)
+        textos = textos.where(textos.map(type).eq(str), '').map(normalize_query)
+        num_juzgado = pd.to_numeric(textos.str.extract(JUZGADO_NUM_RE)[0])
+        num_secretaria = pd.to_numeric(textos.str.extract(SECRETARIA_NUM_RE)[0])
+
+        juzgados, secretarias = [], []
+        for nj, ns in zip(num_juzgado, num_secretaria):
+            juzgado = self.por_numero.get(int(nj)) if pd.notna(nj) else None
+            sec_juzgado, secretaria = self.secretaria(ns) if pd.notna(ns) else (None, None)
+            juzgado = juzgado or sec_juzgado
+            # La secretaría se guarda solo si pertenece al juzgado resuelto
+            juzgados.append(juzgado['nombre'] if juzgado else None)
+            secretarias.append(secretaria['nombre'] if secretaria and sec_juzgado is juzgado else None)
+        return pd.DataFrame({"juzgado_nombre": juzgados, "secretaria_nombre": secretarias}, dtype=object)
+
+@lru_cache(maxsize=None)
+def get_juzgados_directory(path=JUZGADOS_FILE):
+    """Directorio único por proceso."""
     try:
-        with open('data/juzgados_data.json', 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(path, 'r', encoding='utf-8') as f:
+            return JuzgadosDirectory(json.load(f))
     except FileNotFoundError:
-        return []
+        return JuzgadosDirectory([])
 
 def format_caratula(caratula):
     if not isinstance(caratula, str): return "Carátula inválida"
@@ -21,38 +140,127 @@ def format_caratula(caratula):
     demandado = parts[1].split(' SOBRE ')[0] if len(parts) > 1 and ' SOBRE ' in parts[1] else 'GCBA'
     return f"{actor} c/ {demandado}"
 
-def create_expediente_link(numero):
+def caratula_labels(expedientes_df):
+    """Diccionario numero -> carátula abreviada, para format_func de los selectores y las listas.
+
+    Usa la columna caratula_corta calculada al sincronizar; solo formatea las que falten.
+    """
+    if expedientes_df.empty:
+        return {}
+    cortas = expedientes_df['caratula_corta']
+    faltan = cortas.isna()
+    if faltan.any():
+        cortas = cortas.where(~faltan, expedientes_df.loc[faltan, 'caratula'].map(format_caratula))
+    return dict(zip(expedientes_df['numero'], cortas))
+
+def normalize_query(texto):
+    """Clave de caché de una búsqueda: minúsculas, sin acentos y con los espacios colapsados."""
+    sin_acentos = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sin_acentos.lower().split())
+
+# Número de expediente del portal: J-<CUIJ>/<año>-<n>, p. ej. J-01-00012345-6/2020-0
+CUIJ_RE = re.compile(r'J-((?:\d{2}-){2}\d{5}-\d)\/(\d{4})-\d')
+
+def parse_cuij(numero):
+    """Devuelve (cuij, año) si `numero` contiene un número de expediente válido, o None."""
     if not numero or not isinstance(numero, str): return None
-    match = re.search(r'J-((?:\d{2}-){2}\d{5}-\d)\/(\d{4})-\d', numero)
-    if not match: return None
-    cuij, anio = match.group(1), match.group(2)
+    match = CUIJ_RE.search(numero)
+    return (match.group(1), match.group(2)) if match else None
+
+def normalize_numero(numero):
+    """Número de expediente tal como lo guarda la base (sin espacios y en mayúsculas)."""
+    match = CUIJ_RE.search(re.sub(r'\s+', '', numero or '').upper())
+    return match.group(0) if match else None
+
+def create_expediente_link(numero):
+    parsed = parse_cuij(numero)
+    if not parsed: return None
+    cuij, anio = parsed
     return f"{BASE_URL}/iol-ui/p/expedientes?identificador={quote(numero)}&tipoBusqueda=CAU&open=true&cuij={cuij}&anio={anio}&desmontar=true"
 
-def generate_report(expedientes_df, tareas_df, notas_df, movimientos_df, selected_exp_numeros):
-    report_md = f"# Reporte de Expedientes\n*Generado el: {pd.Timestamp.now().strftime('%d/%m/%Y %H:%M')}*\n\n"
-    
-    for numero in selected_exp_numeros:
-        exp = expedientes_df[expedientes_df['numero'] == numero].iloc[0]
-        report_md += f"---\n##  expediente: {exp['caratula']}\n"
-        report_md += f"**Número:** {exp['numero']}  \n"
-        report_md += f"**Juzgado:** {exp.get('juzgado_nombre', 'No especificado')} - {exp.get('secretaria_nombre', '')}  \n"
-        report_md += f"**Estado Cautelar:** {exp.get('medida_cautelar_status', 'No especificado')}  \n\n"
-
-        report_md += "### Tareas Pendientes\n"
-        tareas_exp = tareas_df[(tareas_df['expediente_numero'] == numero) & (~tareas_df['completada'])]
-        if not tareas_exp.empty:
-            for _, t in tareas_exp.iterrows():
-                report_md += f"- **{t['descripcion']}** (Vence: {t['fecha_vencimiento'].strftime('%d/%m/%Y')}, Prioridad: {t['prioridad']})\n"
-        else:
-            report_md += "_No hay tareas pendientes._\n"
-        report_md += "\n"
-
-        report_md += "### Historial de Movimientos\n"
-        movimientos_exp = movimientos_df[movimientos_df['expediente_numero'] == numero].sort_values(by='fecha', ascending=False)
-        if not movimientos_exp.empty:
-            for _, m in movimientos_exp.iterrows():
-                report_md += f"- **{m['fecha'].strftime('%d/%m/%Y')}:** {m['descripcion']}\n"
-        else:
-            report_md += "_No hay movimientos registrados._\n"
-        report_md += "\n"
-    return report_md
+def expediente_link(numero, href=None):
+    """Enlace al expediente que se guarda al sincronizar, igual para la API y las tarjetas.
+
+    Se arma desde el número (create_expediente_link); si el número no es un CUIJ
+    válido se usa el `href` de la tarjeta, si lo hay.
+    """
+    link = create_expediente_link(numero)
+    if link or not href:
+        return link
+    return BASE_URL + href if href.startswith('/') else href
+
+# "<actor> CONTRA <demandado> SOBRE <objeto>"; mismas reglas que format_caratula
+CARATULA_RE = re.compile(r'^(?P<actor>.*?)(?: CONTRA (?P<resto>.*?)(?: CONTRA .*)?)?\Z', re.DOTALL)
+# Columnas que se derivan del número y la carátula al sincronizar (ver database.sync_expedientes)
+DERIVED_COLUMNS = ["cuij", "anio", "actor", "demandado", "caratula_corta"]
+
+def parse_expedientes(numeros, caratulas):
+    """CUIJ, año, actor, demandado, carátula abreviada y enlace al portal de muchos expedientes a la vez.
+
+    Devuelve un DataFrame con DERIVED_COLUMNS más 'link', alineado con `numeros`.
+    """
+    numeros = pd.Series(numeros, dtype=object).reset_index(drop=True)
+    caratulas = pd.Series(caratulas, dtype=object).reset_index(drop=True)
+    numero_ok = numeros.map(type).eq(str)
+    caratula_ok = caratulas.map(type).eq(str)
+
+    partes = caratulas.where(caratula_ok).str.extract(CARATULA_RE)
+    demandado = partes['resto'].str.extract(r'^(.*?) SOBRE ', flags=re.DOTALL)[0]
+    demandado = demandado.where(demandado.notna() | ~caratula_ok, 'GCBA')
+    actor = partes['actor']
+
+    cuij = numeros.where(numero_ok).str.extract(CUIJ_RE)
+    con_cuij = cuij[0].notna()
+    link = (
+        f"{BASE_URL}/iol-ui/p/expedientes?identificador=" + numeros.where(con_cuij, '').map(quote)
+        + "&tipoBusqueda=CAU&open=true&cuij=" + cuij[0].fillna('')
+        + "&anio=" + cuij[1].fillna('') + "&desmontar=true"
+    ).where(con_cuij, None)
+
+    return pd.DataFrame({
+        "cuij": cuij[0],
+        "anio": pd.to_numeric(cuij[1]).astype("Int64"),
+        "actor": actor,
+        "demandado": demandado,
+        "caratula_corta": (actor + " c/ " + demandado).where(caratula_ok, "Carátula inválida"),
+        "link": link,
+    })
+
+def generate_report(expedientes_df, tareas_df, movimientos_df, selected_exp_numeros, formato="Markdown"):
+    """Reporte de los expedientes seleccionados en Markdown, HTML o texto plano (ver reports.py)."""
+    return render_report(expedientes_df, tareas_df, movimientos_df, selected_exp_numeros, formato=formato)
+
+class ExpedienteIndex:
+    """Filas de tareas, movimientos y notas agrupadas por expediente en una sola pasada.
+
+    Los DataFrames ya vienen ordenados de la base; cada grupo conserva ese orden.
+    """
+
+    def __init__(self, tareas_df, movimientos_df, notas_df):
+        self._frames = {"tareas": tareas_df, "movimientos": movimientos_df, "notas": notas_df}
+        self._positions = {
+            name: df.groupby('expediente_numero', sort=False).indices if not df.empty else {}
+            for name, df in self._frames.items()
+        }
+        # Cantidad de tareas pendientes por expediente, en una sola operación vectorizada
+        self.pendientes = (
+            tareas_df.loc[~tareas_df['completada'].astype(bool), 'expediente_numero'].value_counts().to_dict()
+            if not tareas_df.empty else {}
+        )
+
+    def _rows(self, name, numero):
+        df = self._frames[name]
+        positions = self._positions[name].get(numero)
+        return df.iloc[positions] if positions is not None else df.iloc[0:0]
+
+    def tareas(self, numero):
+        return self._rows("tareas", numero)
+
+    def movimientos(self, numero):
+        return self._rows("movimientos", numero)
+
+    def notas(self, numero):
+        return self._rows("notas", numero)
+
+    def tareas_pendientes(self, numero):
+        return self.pendientes.get(numero, 0)
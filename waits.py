@@ -0,0 +1,113 @@
+import logging
+import re
+import time
+from collections import namedtuple
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+
+logger = logging.getLogger(__name__)
+
+# Timeouts por defecto (segundos) de cada espera del scraper
+DEFAULT_TIMEOUTS = {
+    "login_form": 20,
+    "login_redirect": 30,
+    "page_size": 20,
+    "page_size_options": 10,
+    "list": 20,
+}
+
+PAGINATOR_LABEL = ".mat-mdc-paginator-range-label, .mat-paginator-range-label"
+# "1 – 50 de 120" / "0 de 0"
+PAGINATOR_RANGE = re.compile(r"(?:(\d+)\s*[–-]\s*(\d+)\s*)?(?:de|of)\s*(\d+)")
+SPINNER = "mat-spinner, mat-progress-spinner, mat-progress-bar, .mat-mdc-progress-spinner"
+
+IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException)
+
+# Resultado de `page_rendered`: siempre verdadero, aunque la lista esté vacía
+PageState = namedtuple("PageState", ["count", "first"])
+
+
+# ----------------------------------------------------------------------
+# Condiciones personalizadas (mismo contrato que expected_conditions)
+# ----------------------------------------------------------------------
+def no_spinner_visible(selector=SPINNER):
+    """Verdadero cuando no hay ningún indicador de carga visible."""
+    def _predicate(driver):
+        return not any(e.is_displayed() for e in driver.find_elements(By.CSS_SELECTOR, selector))
+    return _predicate
+
+
+def paginator_label_changed(previous_label):
+    """Devuelve el texto del paginador cuando deja de ser `previous_label`."""
+    def _predicate(driver):
+        label = driver.find_element(By.CSS_SELECTOR, PAGINATOR_LABEL).text.strip()
+        return label if label and label != previous_label else False
+    return _predicate
+
+
+def card_count_stable(card_tag, quiet_period=0.3):
+    """Verdadero cuando la cantidad de tarjetas no cambió durante `quiet_period` segundos."""
+    state = {"count": None, "since": None}
+
+    def _predicate(driver):
+        count = len(driver.find_elements(By.TAG_NAME, card_tag))
+        now = time.monotonic()
+        if count != state["count"]:
+            state["count"], state["since"] = count, now
+            return False
+        return now - state["since"] >= quiet_period
+    return _predicate
+
+
+def page_rendered(card_tag, previous_first=None):
+    """La lista muestra tantas tarjetas como indica el paginador.
+
+    Si se pasa `previous_first`, además exige que la primera tarjeta haya
+    cambiado (es decir, que ya se renderizó la página nueva). Devuelve un
+    `PageState` con la cantidad de tarjetas y el texto de la primera.
+    """
+    def _predicate(driver):
+        match = PAGINATOR_RANGE.search(driver.find_element(By.CSS_SELECTOR, PAGINATOR_LABEL).text)
+        if match is None:
+            return False
+        if match.group(1) is None:
+            return PageState(0, None)  # "0 de 0": lista vacía
+        expected = int(match.group(2)) - int(match.group(1)) + 1
+        cards = driver.find_elements(By.TAG_NAME, card_tag)
+        if len(cards) != expected:
+            return False
+        first = cards[0].get_attribute("textContent")
+        if previous_first is not None and first == previous_first:
+            return False
+        return PageState(len(cards), first)
+    return _predicate
+
+
+def list_ready(card_tag, previous_first=None, quiet_period=0.2):
+    """Sin spinner, con la página de tarjetas completa y la cantidad estable."""
+    spinner_gone = no_spinner_visible()
+    rendered = page_rendered(card_tag, previous_first)
+    stable = card_count_stable(card_tag, quiet_period)
+
+    def _predicate(driver):
+        if not spinner_gone(driver):
+            return False
+        state = rendered(driver)
+        if not state or not stable(driver):
+            return False
+        return state
+    return _predicate
+
+
+# ----------------------------------------------------------------------
+# Esperas medidas (PhaseTimer vive en timing.py)
+# ----------------------------------------------------------------------
+def wait_for(driver, condition, timeout, timer=None, label=None):
+    """`WebDriverWait(...).until(condition)` midiendo la espera como una fase de `timer`."""
+    wait = WebDriverWait(driver, timeout, poll_frequency=0.1, ignored_exceptions=IGNORED_EXCEPTIONS)
+    if timer is None:
+        return wait.until(condition)
+    with timer.phase(label or "espera"):
+        return wait.until(condition)